@@ -0,0 +1,14 @@
+"""
+Performance benchmarks of the projects stack.
+
+The suite (``benchmarks.suite``) times scene save, scene load, project
+duplication, decay simulation and dose computation on the example scenes
+of ``populate_example_scenes`` and on copies scaled up to many times their
+objects (``benchmarks.scenes``). Every measurement records wall time,
+database queries and peak Python memory. Runs are appended to a JSON
+history, and a run fails when it is slower, heavier or chattier than the
+recent runs in the history by more than the regression thresholds.
+
+Run it with ``python manage.py runbenchmarks``. Everything the suite
+creates is rolled back, so it can run against any database.
+"""
@@ -0,0 +1,86 @@
+"""
+Benchmark scenes.
+
+A benchmark scene is an example scene repeated ``scale`` times on a
+square grid, written as a payload of the complete project endpoint. Each
+copy gets its own geometries and volumes, so object and source counts
+grow with the scale. One sensor faces each column of the grid, which
+keeps transport work growing as scale^1.5 rather than with the square of
+the scale. The copies
+share the compositions of the example scene and one Co-60 and Cs-137
+spectrum, which the source volumes emit by isotope when decay data is
+imported and by lines otherwise.
+"""
+import math
+
+from elements.decay import load_decay_data
+
+ISOTOPES = [{'isotope': 'Co-60', 'activity': 1e6}, {'isotope': 'Cs-137', 'activity': 1e6}]
+LINES = [
+    {'energy': 1173.2, 'intensity': 1e6}, {'energy': 1332.5, 'intensity': 1e6},
+    {'energy': 661.7, 'intensity': 0.851e6},
+]
+# Grid pitch in units of the largest dimension of the example scene
+PITCH = 3.0
+SIZE_PARAMETERS = {'width': 1.0, 'height': 1.0, 'depth': 1.0, 'radius': 2.0, 'radiusTop': 2.0, 'radiusBottom': 2.0}
+
+
+def scene_size(example_scene):
+    """Largest extent (cm) of the geometries of an example scene"""
+    return max((
+        float(value) * SIZE_PARAMETERS[name]
+        for geometry in example_scene.geometries.all()
+        for name, value in geometry.geometry_parameters.items() if name in SIZE_PARAMETERS
+    ), default=100.0)
+
+
+def by_isotope():
+    """Whether the imported decay data covers the benchmark isotopes"""
+    data = load_decay_data()
+    return all(entry['isotope'] in data for entry in ISOTOPES)
+
+
+def scene_payload(example_scene, scale=1, isotopes=None):
+    """Complete project payload of ``example_scene`` repeated ``scale`` times"""
+    isotopes = by_isotope() if isotopes is None else isotopes
+    geometries = list(example_scene.geometries.order_by('order', 'pk'))
+    volumes = list(example_scene.volumes.order_by('pk'))
+    pitch = PITCH * scene_size(example_scene)
+    columns = math.ceil(math.sqrt(scale))
+
+    payload = {
+        'name': f'{example_scene.name} x{scale}',
+        'description': f'Benchmark scene: {example_scene.name} repeated {scale} times',
+        'compositions': [
+            {'id': f'c{c.pk}', 'name': c.name, 'density': c.density, 'color': c.color, 'elements': c.elements}
+            for c in example_scene.compositions.order_by('pk')
+        ],
+        'spectra': [{
+            'id': 'source', 'name': 'Co-60 + Cs-137', 'type': 'line',
+            'multiplier': 1.0, 'lines': LINES, 'isotopes': ISOTOPES,
+        }],
+        'geometries': [], 'volumes': [], 'sensors': [],
+    }
+    for copy in range(scale):
+        shift = {'x': (copy % columns) * pitch, 'y': 0.0, 'z': (copy // columns) * pitch}
+        for geometry in geometries:
+            payload['geometries'].append({
+                'id': f'g{geometry.pk}-{copy}', 'name': f'{geometry.name} {copy}', 'type': geometry.geometry_type,
+                'position': {axis: float(geometry.position.get(axis, 0)) + shift[axis] for axis in 'xyz'},
+                'rotation': geometry.rotation, 'scale': geometry.scale, 'color': geometry.color,
+                'parameters': geometry.geometry_parameters,
+            })
+        for volume in volumes:
+            payload['volumes'].append({
+                'geometry_id': f'g{volume.geometry_id}-{copy}',
+                'composition_id': f'c{volume.composition_id}' if volume.composition_id else None,
+                'spectrum_id': 'source' if volume.is_source else None,
+                'name': f'{volume.volume_name} {copy}', 'type': volume.volume_type,
+                'real_density': volume.real_density, 'is_source': volume.is_source,
+                'gamma_selection_mode': 'by-isotope' if isotopes and volume.is_source else 'by-lines',
+            })
+    for column in range(columns):
+        payload['sensors'].append({
+            'id': f's{column}', 'name': f'D{column}', 'coordinates': {'x': column * pitch, 'y': 0.0, 'z': -pitch / 2},
+        })
+    return payload
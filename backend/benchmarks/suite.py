@@ -0,0 +1,223 @@
+"""
+The benchmark suite and its history.
+
+Every operation runs ``repeat`` times for the best wall time, then once
+more under ``tracemalloc`` and a query capture for the peak Python memory
+and the number of database queries, so tracing never inflates the
+timings. Scene save and load go through the complete project and complete
+scene views as a client would reach them; load drops the stored snapshots
+first, so it measures the serialization a scene change forces.
+
+A run is compared with the median of its ``baseline_runs`` latest passed
+runs in the history, measurement by measurement: it regresses when a wall
+time or a peak memory grows by more than its relative tolerance, or when
+it makes more queries than the baseline plus the query tolerance. Time
+differences under ``TIME_NOISE_FLOOR`` are scheduler noise and never
+regress, however large relative to a fast operation.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from projects.cloning import clone_project
+from projects.computation import run_computation
+from projects.models import ComputationConfiguration, ExampleScene, Project
+from projects.physics.scene import load_scene
+from projects.physics.time_dependent import dose_time_series
+from projects.snapshots import invalidate_snapshots
+from projects.views import CompleteProjectCreateView, LoadCompleteSceneView
+from .scenes import scene_payload
+
+OPERATIONS = ('save', 'load', 'duplicate', 'decay', 'dose')
+SCALES = (1, 10, 100)
+DECAY_TIMES = np.geomspace(3600.0, 30 * 3.15576e7, 20)  # s
+POINTS_PER_SOURCE = 200
+
+# Regression thresholds: relative growth of time and memory, extra queries
+TIME_TOLERANCE = 0.5
+TIME_NOISE_FLOOR = 0.05  # s
+MEMORY_TOLERANCE = 0.25
+QUERY_TOLERANCE = 0
+BASELINE_RUNS = 5
+REPEAT = 3
+MAX_HISTORY = 200
+
+
+@dataclass
+class Measurement:
+    scene: str
+    scale: int
+    operation: str
+    seconds: float  # best wall time
+    queries: int
+    peak_memory: int  # bytes
+
+    @property
+    def key(self):
+        return f'{self.scene} x{self.scale} {self.operation}'
+
+
+def measure(function, repeat=1):
+    """Result, best wall time, query count and peak traced memory of ``function()``"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, min(times), len(queries), peak
+
+
+class SceneBenchmark:
+    """The operations of the suite on one benchmark scene"""
+
+    def __init__(self, user, payload):
+        self.user = user
+        self.payload = payload
+        self.factory = APIRequestFactory()
+        self.project = None
+
+    def save(self):
+        request = self.factory.post('/api/projects/complete/', self.payload, format='json')
+        force_authenticate(request, user=self.user)
+        response = CompleteProjectCreateView.as_view()(request)
+        if response.status_code != 201:
+            raise ValueError(f'Saving {self.payload["name"]} failed: {response.data}')
+        self.project = Project.objects.get(pk=response.data['id'])
+        return self.project
+
+    def load(self):
+        invalidate_snapshots(self.project.pk)
+        request = self.factory.get(f'/api/projects/{self.project.uuid}/load-complete-scene/')
+        force_authenticate(request, user=self.user)
+        response = LoadCompleteSceneView.as_view()(request, project_id=self.project.uuid)
+        if response.status_code != 200:
+            raise ValueError(f'Loading {self.payload["name"]} failed with status {response.status_code}')
+        return response
+
+    def duplicate(self):
+        return clone_project(self.project, user=self.user, name=f'{self.project.name} (Copy)')
+
+    def decay(self):
+        return dose_time_series(load_scene(self.project), DECAY_TIMES, points_per_source=POINTS_PER_SOURCE)
+
+    def dose(self):
+        configuration, _ = ComputationConfiguration.objects.get_or_create(
+            project=self.project, config_type='nominal',
+            defaults={'name': 'Benchmark', 'particles_per_sample': POINTS_PER_SOURCE},
+        )
+        results = run_computation(self.project, configuration, reuse=False)
+        errors = [result.log_data['steps'][-1] for result in results if result.status == 'error']
+        if errors:
+            raise ValueError(f'Dose computation of {self.payload["name"]} failed: {errors[0]}')
+        return results
+
+
+def run_suite(names=None, scales=SCALES, operations=OPERATIONS, repeat=REPEAT, progress=None):
+    """Measurements of ``operations`` on the example scenes ``names`` (all when None) at ``scales``.
+
+    Example scenes are populated when missing. Everything the suite writes
+    is rolled back. ``progress(measurement)`` is called after each one.
+    """
+    measurements = []
+    with transaction.atomic():
+        if not ExampleScene.objects.exists():
+            call_command('populate_example_scenes', stdout=StringIO())
+        scenes = ExampleScene.objects.filter(is_active=True).order_by('name')
+        if names:
+            missing = set(names) - set(scenes.filter(name__in=names).values_list('name', flat=True))
+            if missing:
+                raise ValueError(f'Unknown example scenes: {", ".join(sorted(missing))}')
+            scenes = scenes.filter(name__in=names)
+        user = get_user_model().objects.create_user(
+            email=f'benchmark-{uuid.uuid4().hex}@example.com', username=f'benchmark-{uuid.uuid4().hex}'
+        )
+
+        for example_scene in scenes:
+            for scale in scales:
+                benchmark = SceneBenchmark(user, scene_payload(example_scene, scale))
+                if 'save' not in operations:
+                    benchmark.save()
+                for operation in OPERATIONS:
+                    if operation not in operations:
+                        continue
+                    _, seconds, queries, peak = measure(getattr(benchmark, operation), repeat)
+                    measurement = Measurement(example_scene.name, scale, operation, seconds, queries, peak)
+                    measurements.append(measurement)
+                    if progress:
+                        progress(measurement)
+        transaction.set_rollback(True)
+    return measurements
+
+
+def load_history(path):
+    """The runs recorded in a history file, oldest first"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())['runs']
+
+
+def record_run(path, measurements, regressions):
+    """Append a run to a history file, keeping its ``MAX_HISTORY`` latest runs"""
+    path = Path(path)
+    runs = load_history(path) + [{
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'passed': not regressions,
+        'regressions': regressions,
+        'measurements': [asdict(m) for m in measurements],
+    }]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'runs': runs[-MAX_HISTORY:]}, indent=2))
+
+
+def baselines(runs, baseline_runs=BASELINE_RUNS):
+    """Median seconds, queries and peak memory by measurement key over the latest passed runs"""
+    samples = {}
+    for run in reversed([run for run in runs if run['passed']]):
+        for values in run['measurements']:
+            key = Measurement(**values).key
+            if len(samples.setdefault(key, [])) < baseline_runs:
+                samples[key].append(values)
+    return {
+        key: {field: statistics.median(v[field] for v in values) for field in ('seconds', 'queries', 'peak_memory')}
+        for key, values in samples.items()
+    }
+
+
+def regressions(measurements, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+                query_tolerance=QUERY_TOLERANCE, time_noise_floor=TIME_NOISE_FLOOR):
+    """Descriptions of the measurements beyond the thresholds of their baselines"""
+    found = []
+    for m in measurements:
+        reference = baseline.get(m.key)
+        if reference is None:
+            continue
+        slower = m.seconds - reference['seconds']
+        if m.seconds > reference['seconds'] * (1 + time_tolerance) and slower >= time_noise_floor:
+            found.append(f'{m.key}: {m.seconds:.3f} s against {reference["seconds"]:.3f} s')
+        if m.queries > reference['queries'] + query_tolerance:
+            found.append(f'{m.key}: {m.queries} queries against {reference["queries"]:g}')
+        if m.peak_memory > reference['peak_memory'] * (1 + memory_tolerance):
+            found.append(f'{m.key}: {m.peak_memory / 2**20:.1f} MiB against {reference["peak_memory"] / 2**20:.1f} MiB')
+    return found
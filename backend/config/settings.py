@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -169,3 +170,25 @@ if DEBUG:
 
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
+
+# Worker processes for Monte-Carlo samples (1 runs them in the request process)
+COMPUTATION_WORKERS = int(os.environ.get('COMPUTATION_WORKERS', 1))
+
+# Seconds without a worker heartbeat after which a running computation job is failed
+COMPUTATION_JOB_TIMEOUT = int(os.environ.get('COMPUTATION_JOB_TIMEOUT', 600))
+# Seconds a job event stream ticket stays valid
+STREAM_TICKET_LIFETIME = 30
+
+# Photon group boundaries (keV) of sources computed by groups
+SOURCE_GROUP_BOUNDARIES = [
+    10, 20, 30, 45, 60, 80, 100, 150, 200, 300, 400, 500, 600, 800,
+    1000, 1330, 1660, 2000, 2500, 3000, 4000, 5000, 6500, 8000, 10000,
+]
+# Add the shorter-lived daughters of source isotopes in equilibrium
+SOURCE_DAUGHTERS_IN_EQUILIBRIUM = True
+
+# Cells per axis of the Monte-Carlo importance grid over the material volumes
+IMPORTANCE_MESH_CELLS = 16
+
+# History file of the runbenchmarks command
+BENCHMARK_HISTORY = Path(os.environ.get('BENCHMARK_HISTORY', BASE_DIR / 'benchmarks' / 'history.json'))
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Element, Isotope, NeutronCrossSection, DecayPath, NeutronReaction,
-    GammaSpectrum, ElementComposition, IsotopeSource
+    GammaSpectrum, ElementComposition, IsotopeSource, PhotonCrossSection
 )
 
 
@@ -45,6 +45,14 @@ class NeutronReactionAdmin(admin.ModelAdmin):
     ordering = ['target_isotope__element__atomic_number', 'target_isotope__mass_number']
 
 
+@admin.register(PhotonCrossSection)
+class PhotonCrossSectionAdmin(admin.ModelAdmin):
+    list_display = ['element', 'energy', 'edge', 'photoelectric', 'incoherent', 'total', 'origin']
+    list_filter = ['element', 'origin']
+    search_fields = ['element__symbol']
+    ordering = ['element__atomic_number', 'energy']
+
+
 @admin.register(GammaSpectrum)
 class GammaSpectrumAdmin(admin.ModelAdmin):
     list_display = ['isotope', 'energy', 'intensity', 'multipolarity', 'origin']
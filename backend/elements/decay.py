@@ -0,0 +1,221 @@
+"""
+Nuclear decay data.
+
+Isotopes with their ``DecayPath`` branches and ``GammaSpectrum`` lines
+are loaded into a ``DecayData`` snapshot keyed by nuclide ('Co-60'),
+rebuilt only when the rows change, like the photon table. Half-lives are
+parsed from the free-text ``half_life`` field ('30.08 y', '5.27 years',
+'1.2e3 s'); bare numbers are seconds, and empty or 'stable' values mean
+a stable nuclide.
+
+Inventories decay with daughter ingrowth by the depletion equation
+dN/dt = A N, where A holds -λ on its diagonal and λ times the branching
+ratio from parent to daughter. Its solution N(t) = exp(A t) N(0) is
+evaluated with the scaling-and-squaring Padé approximant of the matrix
+exponential, which handles chains of any length, branching and
+degenerate half-lives alike.
+"""
+import math
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.db.models import Count, Max
+
+from .models import DecayPath, GammaSpectrum, Isotope
+
+SECONDS = {
+    'ns': 1e-9, 'nanosecond': 1e-9, 'us': 1e-6, 'μs': 1e-6, 'µs': 1e-6, 'microsecond': 1e-6,
+    'ms': 1e-3, 'millisecond': 1e-3, 's': 1.0, 'sec': 1.0, 'second': 1.0,
+    'm': 60.0, 'min': 60.0, 'minute': 60.0, 'h': 3600.0, 'hr': 3600.0, 'hour': 3600.0,
+    'd': 86400.0, 'day': 86400.0, 'y': 3.15576e7, 'yr': 3.15576e7, 'a': 3.15576e7, 'year': 3.15576e7,
+}
+HALF_LIFE = re.compile(r'^\s*([0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?)\s*([a-zA-Zμµ]*)\s*$')
+NUCLIDE = re.compile(r'^\s*([A-Za-z]{1,2})\s*-?\s*([0-9]+)(m?)\s*$')
+
+
+def half_life_seconds(text):
+    """Half-life in seconds of a ``half_life`` value, inf for stable nuclides"""
+    if text is None or str(text).strip().lower() in ('', 'stable', 'inf', 'infinity', '∞'):
+        return math.inf
+    match = HALF_LIFE.match(str(text))
+    if not match:
+        raise ValueError(f'Cannot read half-life {text!r}')
+    unit = match.group(2).lower()
+    if unit not in SECONDS and unit.endswith('s'):
+        unit = unit[:-1]
+    if unit and unit not in SECONDS:
+        raise ValueError(f'Unknown half-life unit in {text!r}')
+    return float(match.group(1)) * SECONDS.get(unit, 1.0)
+
+
+def nuclide_key(symbol):
+    """Canonical 'Co-60' key of a nuclide symbol such as 'Co60', 'co-60' or 'Tc-99m'"""
+    match = NUCLIDE.match(str(symbol))
+    if not match:
+        raise ValueError(f'Cannot read nuclide {symbol!r}')
+    return f'{match.group(1).capitalize()}-{match.group(2)}{match.group(3)}'
+
+
+@dataclass
+class Nuclide:
+    key: str
+    decay_constant: float  # 1/s, 0 for stable nuclides
+    energies: np.ndarray  # keV
+    intensities: np.ndarray  # photons per decay
+    daughters: list = field(default_factory=list)  # [(nuclide key, branching ratio)]
+
+
+class DecayData:
+    """Decay constants, daughters and gamma lines of every nuclide"""
+
+    def __init__(self, nuclides, version='empty'):
+        self.version = version
+        self.nuclides = nuclides
+
+    def __getitem__(self, symbol):
+        key = nuclide_key(symbol)
+        if key not in self.nuclides:
+            raise ValueError(f'No decay data for {key}')
+        return self.nuclides[key]
+
+    def __contains__(self, symbol):
+        try:
+            return nuclide_key(symbol) in self.nuclides
+        except ValueError:
+            return False
+
+    def descendants(self, symbols):
+        """Keys of nuclides ``symbols`` and of every nuclide they decay into, parents first"""
+        keys = [self[symbol].key for symbol in symbols]
+        seen = set(keys)
+        for key in keys:
+            for daughter, _ in self.nuclides[key].daughters:
+                if daughter in self.nuclides and daughter not in seen:
+                    seen.add(daughter)
+                    keys.append(daughter)
+        return keys
+
+    def decay_matrix(self, keys):
+        """Depletion matrix A (n, n) of nuclides ``keys``: dN/dt = A N"""
+        index = {key: i for i, key in enumerate(keys)}
+        matrix = np.zeros((len(keys), len(keys)))
+        for i, key in enumerate(keys):
+            nuclide = self.nuclides[key]
+            matrix[i, i] -= nuclide.decay_constant
+            for daughter, branching in nuclide.daughters:
+                if daughter in index:
+                    matrix[index[daughter], i] += branching * nuclide.decay_constant
+        return matrix
+
+    def decay(self, activities, times):
+        """Activities (Bq) of nuclides decayed from initial ``activities`` {nuclide: Bq} at ``times`` (s).
+
+        Returns the nuclide keys, parents first, and activities (times, nuclides).
+        """
+        keys = self.descendants(list(activities))
+        constants = np.array([self.nuclides[key].decay_constant for key in keys])
+        atoms = np.zeros(len(keys))
+        for symbol, activity in activities.items():
+            i = keys.index(self[symbol].key)
+            if constants[i] > 0:
+                atoms[i] += activity / constants[i]
+        matrix = self.decay_matrix(keys)
+        inventories = np.array([expm(matrix * float(t)) @ atoms for t in times]).reshape(len(times), len(keys))
+        return keys, np.maximum(inventories, 0.0) * constants
+
+    def equilibrium_chain(self, symbol):
+        """(nuclide, activity per parent activity) of a nuclide and its shorter-lived descendants
+        in equilibrium, the parent first.
+
+        A daughter of decay constant λd under a parent of λp carries
+        λd / (λd - λp) times the parent activity per unit branching ratio
+        (secular equilibrium when λd >> λp). Stable or longer-lived
+        daughters end a chain.
+        """
+        parent = self[symbol]
+        members, pending = {parent.key: parent}, [parent]
+        while pending:
+            nuclide = pending.pop()
+            for key, _ in nuclide.daughters:
+                daughter = self.nuclides.get(key)
+                if daughter is not None and daughter.decay_constant > nuclide.decay_constant and key not in members:
+                    members[key] = daughter
+                    pending.append(daughter)
+
+        # Descendants decay faster than their ancestors, so this order visits parents first
+        chain = sorted(members.values(), key=lambda n: n.decay_constant)
+        ratios = {parent.key: 1.0}
+        for nuclide in chain:
+            for key, branching in nuclide.daughters:
+                daughter = members.get(key)
+                if daughter is not None and daughter.decay_constant > nuclide.decay_constant:
+                    ratios[key] = ratios.get(key, 0.0) + ratios.get(nuclide.key, 0.0) * branching * (
+                        daughter.decay_constant / (daughter.decay_constant - nuclide.decay_constant)
+                    )
+        return [(nuclide, ratios.get(nuclide.key, 0.0)) for nuclide in chain]
+
+
+# Padé coefficients and 1-norm bound of the degree 13 approximant (Higham 2005)
+PADE_13 = (
+    64764752532480000.0, 32382376266240000.0, 7771770303897600.0, 1187353796428800.0, 129060195264000.0,
+    10559470521600.0, 670442572800.0, 33522128640.0, 1323241920.0, 40840800.0, 960960.0, 16380.0, 182.0, 1.0,
+)
+THETA_13 = 5.371920351148152
+
+
+def expm(matrix):
+    """Matrix exponential by scaling and squaring of the degree 13 Padé approximant"""
+    norm = np.linalg.norm(matrix, 1)
+    squarings = max(int(np.ceil(np.log2(norm / THETA_13))), 0) if norm > 0 else 0
+    a = matrix / 2.0 ** squarings
+    b = PADE_13
+    identity = np.eye(len(a))
+    a2 = a @ a
+    a4 = a2 @ a2
+    a6 = a4 @ a2
+    u = a @ (a6 @ (b[13] * a6 + b[11] * a4 + b[9] * a2) + b[7] * a6 + b[5] * a4 + b[3] * a2 + b[1] * identity)
+    v = a6 @ (b[12] * a6 + b[10] * a4 + b[8] * a2) + b[6] * a6 + b[4] * a4 + b[2] * a2 + b[0] * identity
+    result = np.linalg.solve(v - u, v + u)
+    for _ in range(squarings):
+        result = result @ result
+    return result
+
+
+_LOADED = {}
+
+
+def load_decay_data():
+    """Decay data of the imported isotopes, rebuilt only when the rows change"""
+    stats = [
+        model.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+        for model in (Isotope, DecayPath, GammaSpectrum)
+    ]
+    version = ';'.join(f"{s['count']}:{s['updated'].isoformat() if s['updated'] else ''}" for s in stats)
+    if _LOADED.get('version') != version:
+        keys, nuclides = {}, {}
+        for pk, symbol, mass_number, half_life in Isotope.objects.values_list(
+            'pk', 'element__symbol', 'mass_number', 'half_life'
+        ):
+            try:
+                seconds = half_life_seconds(half_life)
+            except ValueError:
+                seconds = math.inf
+            if not seconds > 0:
+                seconds = math.inf
+            keys[pk] = f'{symbol}-{mass_number}'
+            nuclides[pk] = Nuclide(keys[pk], math.log(2) / seconds, [], [])
+        for isotope, energy, intensity in GammaSpectrum.objects.order_by('energy').values_list(
+            'isotope_id', 'energy', 'intensity'
+        ):
+            if intensity and intensity > 0:
+                nuclides[isotope].energies.append(energy)
+                nuclides[isotope].intensities.append(intensity / 100.0)  # % -> per decay
+        for parent, daughter, branching in DecayPath.objects.values_list(
+            'parent_isotope_id', 'daughter_isotope_id', 'branching_ratio'
+        ):
+            nuclides[parent].daughters.append((keys[daughter], branching))
+        for nuclide in nuclides.values():
+            nuclide.energies, nuclide.intensities = np.array(nuclide.energies), np.array(nuclide.intensities)
+        _LOADED.update(version=version, data=DecayData({n.key: n for n in nuclides.values()}, version=version))
+    return _LOADED['data']
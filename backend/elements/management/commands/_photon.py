@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...photon import (
+    PROCESSES, element_for, import_photon_rows,
+    parse_energy_absorption_table, parse_xcom_table
+)
+
+
+class PhotonTableCommand(BaseCommand):
+    """Import photon coefficients from a directory of per-element tables.
+
+    Table files are named after the element symbol or atomic number
+    (``Fe.txt``, ``26.txt`` or ``z26.txt``). Subclasses choose the table
+    layout and the coefficient columns they store.
+    """
+    help = "Import photon coefficients from XCOM-style tables"
+    table_format = "xcom"  # xcom, energy_absorption
+    processes = PROCESSES
+    edge_shells = None  # e.g. "KL" to import only the rows at those absorption edges
+    default_origin = "XCOM"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory of per-element table files")
+        parser.add_argument("--elements", nargs="*", help="Only import these element symbols")
+        parser.add_argument("--pattern", default="*.txt", help="Glob pattern of the table files")
+        parser.add_argument("--origin", default=self.default_origin, help="Data source stored with the rows")
+
+    def parse(self, text):
+        if self.table_format == "energy_absorption":
+            return parse_energy_absorption_table(text)
+        return parse_xcom_table(text)
+
+    def select(self, rows):
+        if not self.edge_shells:
+            return rows
+        # Both sides of each selected edge
+        edge_energies = {row["energy"] for row in rows if row["edge"] and row["edge"][0] in self.edge_shells}
+        return [row for row in rows if row["energy"] in edge_energies]
+
+    def handle(self, *args, **options):
+        directory = Path(options["directory"])
+        if not directory.is_dir():
+            raise CommandError(f"Not a directory: {directory}")
+        wanted = {symbol.lower() for symbol in options["elements"] or []}
+
+        imported = 0
+        for path in sorted(directory.glob(options["pattern"])):
+            name = path.stem[1:] if path.stem[:1] in "zZ" and path.stem[1:].isdigit() else path.stem
+            try:
+                element = element_for(name)
+            except ValueError:
+                self.stdout.write(self.style.WARNING(f"Skipping {path.name}: unknown element"))
+                continue
+            if wanted and element.symbol.lower() not in wanted:
+                continue
+
+            rows = self.select(self.parse(path.read_text()))
+            if not rows:
+                self.stdout.write(self.style.WARNING(f"Skipping {path.name}: no data rows"))
+                continue
+            count = import_photon_rows(element, rows, self.processes, origin=options["origin"])
+            imported += count
+            self.stdout.write(f"{element.symbol}: {count} rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} photon coefficient rows."))
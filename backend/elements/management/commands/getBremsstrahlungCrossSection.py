@@ -0,0 +1,11 @@
+from ._photon import PhotonTableCommand
+
+
+class Command(PhotonTableCommand):
+    # Bremsstrahlung of the secondary electrons is what separates the energy
+    # transferred to a material from the energy it absorbs; it enters the
+    # photon data through the mass energy-absorption coefficient μen/ρ
+    help = "Import mass energy-absorption coefficients (bremsstrahlung-corrected) from NIST μ/ρ, μen/ρ tables"
+    table_format = "energy_absorption"
+    processes = ("energy_absorption",)
+    default_origin = "NIST"
@@ -0,0 +1,6 @@
+from ._photon import PhotonTableCommand
+
+
+class Command(PhotonTableCommand):
+    help = "Import coherent (Rayleigh) scattering coefficients from XCOM tables"
+    processes = ("coherent",)
@@ -0,0 +1,8 @@
+from ._photon import PhotonTableCommand
+
+
+class Command(PhotonTableCommand):
+    # K and L fluorescence follows photoabsorption above the shell edges; the
+    # edge rows fix the photoelectric jump at each of them
+    help = "Import the coefficients at the K and L absorption edges from XCOM tables"
+    edge_shells = "KL"
@@ -0,0 +1,6 @@
+from ._photon import PhotonTableCommand
+
+
+class Command(PhotonTableCommand):
+    help = "Import nuclear and electron field pair production coefficients from XCOM tables"
+    processes = ("pair_nuclear", "pair_electron")
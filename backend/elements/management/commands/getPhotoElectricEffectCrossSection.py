@@ -0,0 +1,6 @@
+from ._photon import PhotonTableCommand
+
+
+class Command(PhotonTableCommand):
+    help = "Import photoelectric absorption coefficients from XCOM tables"
+    processes = ("photoelectric",)
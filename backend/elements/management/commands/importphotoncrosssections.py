@@ -0,0 +1,6 @@
+from ._photon import PhotonTableCommand
+
+
+class Command(PhotonTableCommand):
+    help = "Import all photon interaction coefficients from XCOM tables"
+    processes = ("coherent", "incoherent", "photoelectric", "pair_nuclear", "pair_electron", "total")
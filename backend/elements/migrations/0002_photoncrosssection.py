@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elements', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotonCrossSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('energy', models.FloatField(help_text='Photon energy in MeV')),
+                ('edge', models.CharField(blank=True, default='', help_text='Absorption edge label (K, L1, ...) of edge rows', max_length=4)),
+                ('coherent', models.FloatField(blank=True, help_text='Coherent (Rayleigh) scattering', null=True)),
+                ('incoherent', models.FloatField(blank=True, help_text='Incoherent (Compton) scattering', null=True)),
+                ('photoelectric', models.FloatField(blank=True, help_text='Photoelectric absorption', null=True)),
+                ('pair_nuclear', models.FloatField(blank=True, help_text='Pair production in the nuclear field', null=True)),
+                ('pair_electron', models.FloatField(blank=True, help_text='Pair production in the electron field', null=True)),
+                ('total', models.FloatField(blank=True, help_text='Total attenuation with coherent scattering', null=True)),
+                ('energy_absorption', models.FloatField(blank=True, help_text='Mass energy-absorption coefficient μen/ρ', null=True)),
+                ('origin', models.CharField(blank=True, default='', help_text='Data source', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('element', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photon_cross_sections', to='elements.element')),
+            ],
+            options={
+                'ordering': ['element__atomic_number', 'energy', 'id'],
+                'indexes': [models.Index(fields=['element', 'energy'], name='elements_ph_element_435b49_idx')],
+                'unique_together': {('element', 'energy', 'edge')},
+            },
+        ),
+    ]
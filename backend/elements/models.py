@@ -183,6 +183,36 @@ class NeutronCrossSection(models.Model):
         return f"{self.isotope} | {self.energy} eV | {self.cross_section} b"
 
 
+class PhotonCrossSection(models.Model):
+    """Photon interaction coefficients of an element at one energy (XCOM layout)"""
+    element = models.ForeignKey(Element, on_delete=models.CASCADE, related_name="photon_cross_sections")
+    energy = models.FloatField(help_text="Photon energy in MeV")
+    edge = models.CharField(max_length=4, blank=True, default="", help_text="Absorption edge label (K, L1, ...) of edge rows")
+    
+    # Mass attenuation coefficients by process, in cm²/g
+    coherent = models.FloatField(null=True, blank=True, help_text="Coherent (Rayleigh) scattering")
+    incoherent = models.FloatField(null=True, blank=True, help_text="Incoherent (Compton) scattering")
+    photoelectric = models.FloatField(null=True, blank=True, help_text="Photoelectric absorption")
+    pair_nuclear = models.FloatField(null=True, blank=True, help_text="Pair production in the nuclear field")
+    pair_electron = models.FloatField(null=True, blank=True, help_text="Pair production in the electron field")
+    total = models.FloatField(null=True, blank=True, help_text="Total attenuation with coherent scattering")
+    energy_absorption = models.FloatField(null=True, blank=True, help_text="Mass energy-absorption coefficient μen/ρ")
+    origin = models.CharField(max_length=64, blank=True, default="", help_text="Data source")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['element__atomic_number', 'energy', 'id']
+        unique_together = ("element", "energy", "edge")
+        indexes = [
+            models.Index(fields=['element', 'energy']),
+        ]
+
+    def __str__(self):
+        return f"{self.element.symbol} | {self.energy} MeV | {self.total} cm²/g"
+
+
 class GammaSpectrum(models.Model):
     """Gamma ray spectra for isotopes"""
     isotope = models.ForeignKey(Isotope, on_delete=models.CASCADE, related_name="gamma_spectra")
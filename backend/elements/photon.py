@@ -0,0 +1,323 @@
+"""
+Photon interaction data.
+
+Per-element mass attenuation coefficients by process, as imported into
+``PhotonCrossSection`` from XCOM-style tables, are loaded into a
+``PhotonTable``: log(μ/ρ) arrays on one energy grid shared by all
+elements, so lookups are vectorized over (element, energy). Elements
+without imported data fall back to a bundled table of total coefficients,
+and elements missing from both are interpolated in log(μ/ρ) between the
+nearest atomic numbers.
+"""
+import re
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Element, PhotonCrossSection
+
+PROCESSES = (
+    'coherent', 'incoherent', 'photoelectric', 'pair_nuclear', 'pair_electron',
+    'total', 'energy_absorption',
+)
+COMPONENTS = ('coherent', 'incoherent', 'photoelectric', 'pair_nuclear', 'pair_electron')
+
+# Columns of an XCOM table after the energy; the last one (total without
+# coherent scattering) is not stored
+XCOM_COLUMNS = COMPONENTS + ('total', None)
+
+# The above-edge copy of an edge energy is moved up by this relative amount
+# so every element has a strictly increasing energy grid
+EDGE_OFFSET = 1e-6
+
+# Coefficients that are zero (e.g. pair production below threshold) are
+# stored at this floor so their logarithm stays finite
+FLOOR = 1e-30
+
+EDGE_LABEL = re.compile(r'^(K|L[1-3]|M[1-5]|N[1-7])$')
+
+# Atomic number and standard atomic weight (g/mol) by symbol
+ELEMENTS = {
+    'H': (1, 1.008), 'He': (2, 4.0026), 'Li': (3, 6.94), 'Be': (4, 9.0122),
+    'B': (5, 10.81), 'C': (6, 12.011), 'N': (7, 14.007), 'O': (8, 15.999),
+    'F': (9, 18.998), 'Ne': (10, 20.180), 'Na': (11, 22.990), 'Mg': (12, 24.305),
+    'Al': (13, 26.982), 'Si': (14, 28.085), 'P': (15, 30.974), 'S': (16, 32.06),
+    'Cl': (17, 35.45), 'Ar': (18, 39.948), 'K': (19, 39.098), 'Ca': (20, 40.078),
+    'Sc': (21, 44.956), 'Ti': (22, 47.867), 'V': (23, 50.942), 'Cr': (24, 51.996),
+    'Mn': (25, 54.938), 'Fe': (26, 55.845), 'Co': (27, 58.933), 'Ni': (28, 58.693),
+    'Cu': (29, 63.546), 'Zn': (30, 65.38), 'Ga': (31, 69.723), 'Ge': (32, 72.630),
+    'As': (33, 74.922), 'Se': (34, 78.971), 'Br': (35, 79.904), 'Kr': (36, 83.798),
+    'Rb': (37, 85.468), 'Sr': (38, 87.62), 'Y': (39, 88.906), 'Zr': (40, 91.224),
+    'Nb': (41, 92.906), 'Mo': (42, 95.95), 'Tc': (43, 98.0), 'Ru': (44, 101.07),
+    'Rh': (45, 102.91), 'Pd': (46, 106.42), 'Ag': (47, 107.87), 'Cd': (48, 112.41),
+    'In': (49, 114.82), 'Sn': (50, 118.71), 'Sb': (51, 121.76), 'Te': (52, 127.60),
+    'I': (53, 126.90), 'Xe': (54, 131.29), 'Cs': (55, 132.91), 'Ba': (56, 137.33),
+    'La': (57, 138.91), 'Ce': (58, 140.12), 'Pr': (59, 140.91), 'Nd': (60, 144.24),
+    'Pm': (61, 145.0), 'Sm': (62, 150.36), 'Eu': (63, 151.96), 'Gd': (64, 157.25),
+    'Tb': (65, 158.93), 'Dy': (66, 162.50), 'Ho': (67, 164.93), 'Er': (68, 167.26),
+    'Tm': (69, 168.93), 'Yb': (70, 173.05), 'Lu': (71, 174.97), 'Hf': (72, 178.49),
+    'Ta': (73, 180.95), 'W': (74, 183.84), 'Re': (75, 186.21), 'Os': (76, 190.23),
+    'Ir': (77, 192.22), 'Pt': (78, 195.08), 'Au': (79, 196.97), 'Hg': (80, 200.59),
+    'Tl': (81, 204.38), 'Pb': (82, 207.2), 'Bi': (83, 208.98), 'Po': (84, 209.0),
+    'At': (85, 210.0), 'Rn': (86, 222.0), 'Fr': (87, 223.0), 'Ra': (88, 226.0),
+    'Ac': (89, 227.0), 'Th': (90, 232.04), 'Pa': (91, 231.04), 'U': (92, 238.03),
+    'Np': (93, 237.0), 'Pu': (94, 244.0),
+}
+
+_ENERGIES = [
+    0.01, 0.015, 0.02, 0.03, 0.04, 0.05, 0.06, 0.08, 0.1, 0.15, 0.2, 0.3, 0.4,
+    0.5, 0.6, 0.8, 1.0, 1.25, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0,
+]
+
+# Bundled total μ/ρ in cm²/g on _ENERGIES (MeV), by atomic number, after the
+# NIST XCOM/Hubbell-Seltzer tables; used for elements without imported data
+_MASS_ATTENUATION = {
+    1: [0.3854, 0.3764, 0.3695, 0.3570, 0.3458, 0.3355, 0.3260, 0.3091, 0.2944, 0.2651, 0.2429, 0.2112, 0.1893,
+        0.1729, 0.1599, 0.1405, 0.1263, 0.1129, 0.1027, 0.08769, 0.06921, 0.05806, 0.05049, 0.04498, 0.03746, 0.03254],
+    6: [2.373, 0.8071, 0.4420, 0.2562, 0.2076, 0.1871, 0.1753, 0.1610, 0.1514, 0.1347, 0.1229, 0.1066, 0.09546,
+        0.08715, 0.08058, 0.07076, 0.06361, 0.05690, 0.05179, 0.04442, 0.03562, 0.03047, 0.02708, 0.02469, 0.02154, 0.01959],
+    7: [3.831, 1.222, 0.6179, 0.3066, 0.2288, 0.1980, 0.1817, 0.1639, 0.1529, 0.1353, 0.1233, 0.1068, 0.09557,
+        0.08719, 0.08063, 0.07081, 0.06364, 0.05693, 0.05180, 0.04450, 0.03579, 0.03073, 0.02742, 0.02511, 0.02209, 0.02024],
+    8: [5.952, 1.836, 0.8651, 0.3779, 0.2585, 0.2132, 0.1907, 0.1678, 0.1551, 0.1361, 0.1237, 0.1070, 0.09566,
+        0.08729, 0.08070, 0.07087, 0.06372, 0.05697, 0.05185, 0.04459, 0.03597, 0.03100, 0.02777, 0.02552, 0.02263, 0.02089],
+    13: [26.23, 7.955, 3.441, 1.128, 0.5685, 0.3681, 0.2778, 0.2018, 0.1704, 0.1378, 0.1223, 0.1042, 0.09276,
+         0.08445, 0.07802, 0.06841, 0.06146, 0.05496, 0.05006, 0.04324, 0.03541, 0.03106, 0.02836, 0.02655, 0.02437, 0.02318],
+    14: [33.89, 10.34, 4.464, 1.436, 0.7012, 0.4385, 0.3207, 0.2228, 0.1835, 0.1448, 0.1275, 0.1082, 0.09614,
+         0.08748, 0.08077, 0.07082, 0.06361, 0.05688, 0.05183, 0.04480, 0.03678, 0.03240, 0.02967, 0.02788, 0.02574, 0.02462],
+    20: [95.87, 30.95, 13.95, 4.454, 2.018, 1.113, 0.7149, 0.3886, 0.2727, 0.1767, 0.1445, 0.1175, 0.1030,
+         0.09316, 0.08584, 0.07506, 0.06734, 0.06016, 0.05480, 0.04754, 0.03949, 0.03532, 0.03290, 0.03142, 0.02985, 0.02922],
+    26: [170.6, 57.08, 25.68, 8.176, 3.629, 1.958, 1.205, 0.5952, 0.3717, 0.1964, 0.1460, 0.1099, 0.09400,
+         0.08414, 0.07704, 0.06699, 0.05995, 0.05350, 0.04883, 0.04265, 0.03621, 0.03312, 0.03146, 0.03057, 0.02991, 0.02994],
+    29: [215.9, 74.05, 33.79, 10.92, 4.862, 2.613, 1.593, 0.7630, 0.4584, 0.2217, 0.1559, 0.1119, 0.09413,
+         0.08363, 0.07625, 0.06605, 0.05901, 0.05261, 0.04803, 0.04205, 0.03599, 0.03318, 0.03177, 0.03108, 0.03074, 0.03103],
+    82: [130.6, 111.6, 86.36, 30.32, 14.36, 8.041, 5.021, 2.419, 5.549, 2.014, 0.9985, 0.4031, 0.2323,
+         0.1614, 0.1248, 0.08870, 0.07102, 0.05876, 0.05222, 0.04606, 0.04234, 0.04197, 0.04272, 0.04391, 0.04675, 0.04972],
+}
+
+# Absorption edges inside the bundled range: (Z, energy, μ/ρ below, μ/ρ above)
+_EDGES = [(82, 0.088, 1.910, 7.683)]
+
+
+class PhotonTable:
+    """Element coefficients on a shared log-energy grid.
+
+    ``data`` maps atomic numbers to ``{'energy': [...], 'edge': [...],
+    process: [...]}`` rows as stored in ``PhotonCrossSection``; processes
+    an element has no values for are NaN.
+    """
+
+    def __init__(self, data, version='bundled'):
+        self.version = version
+        self.z = np.array(sorted(data))
+        per_element = {z: self._strictly_increasing(data[z]) for z in self.z}
+        self.energies = np.unique(np.concatenate([energies for energies, _ in per_element.values()]))
+        self.log_energies = np.log(self.energies)
+
+        self.log_tables = {}
+        for process in PROCESSES:
+            table = np.full((len(self.z), len(self.energies)), np.nan)
+            for row, z in enumerate(self.z):
+                energies, values = per_element[z]
+                column = values.get(process)
+                if column is not None:
+                    table[row] = np.interp(self.log_energies, np.log(energies), np.log(np.maximum(column, FLOOR)))
+            self.log_tables[process] = table
+
+    @staticmethod
+    def _strictly_increasing(rows):
+        """Element energies with edge duplicates split, and its process columns"""
+        energies = np.asarray(rows['energy'], dtype=float)
+        edges = np.asarray(rows.get('edge') or [''] * len(energies))
+        # The labelled row of an edge is the above-edge value
+        order = np.lexsort((edges != '', energies))
+        energies = energies[order]
+        above = np.zeros(len(energies), dtype=bool)
+        above[1:] = energies[1:] == energies[:-1]
+        energies = np.where(above, energies * (1 + EDGE_OFFSET), energies)
+
+        values = {}
+        for process in PROCESSES:
+            column = rows.get(process)
+            if column is None or any(v is None for v in column):
+                continue
+            values[process] = np.asarray(column, dtype=float)[order]
+        return energies, values
+
+    def _rows(self, z, process):
+        """log(μ/ρ) rows of atomic numbers ``z``, interpolated in Z where needed"""
+        table = self.log_tables[process]
+        if len(self.z) == 1:
+            return np.repeat(table, len(z), axis=0)
+        z = np.clip(np.asarray(z, dtype=float), self.z[0], self.z[-1])
+        upper = np.clip(np.searchsorted(self.z, z), 1, len(self.z) - 1)
+        lower = upper - 1
+        weight = ((z - self.z[lower]) / (self.z[upper] - self.z[lower]))[:, None]
+        # Tabulated elements use their own row, even if a neighbour lacks the process
+        with np.errstate(invalid='ignore'):
+            mixed = (1 - weight) * table[lower] + weight * table[upper]
+        return np.where(weight == 0, table[lower], np.where(weight == 1, table[upper], mixed))
+
+    def mass_attenuation(self, z, energies, process='total'):
+        """μ/ρ (cm²/g) of atomic numbers ``z`` at ``energies`` (MeV), shape (len(z), len(energies))"""
+        rows = self._rows(np.atleast_1d(z), process)
+        if np.isnan(rows).any():
+            raise ValueError(f'No {process} data for some of the elements {list(np.atleast_1d(z))}')
+        x = np.log(np.clip(np.atleast_1d(np.asarray(energies, dtype=float)), self.energies[0], self.energies[-1]))
+        i = np.clip(np.searchsorted(self.log_energies, x) - 1, 0, len(self.energies) - 2)
+        weight = (x - self.log_energies[i]) / (self.log_energies[i + 1] - self.log_energies[i])
+        return np.exp(rows[:, i] * (1 - weight) + rows[:, i + 1] * weight)
+
+
+def _bundled_data():
+    data = {}
+    for z, values in _MASS_ATTENUATION.items():
+        energies, totals, edges = list(_ENERGIES), list(values), [''] * len(values)
+        for edge_z, energy, below, above in _EDGES:
+            if edge_z == z:
+                i = int(np.searchsorted(energies, energy))
+                energies[i:i] = [energy, energy]
+                totals[i:i] = [below, above]
+                edges[i:i] = ['', 'K']
+        data[z] = {'energy': energies, 'edge': edges, 'total': totals}
+    return data
+
+
+_BUNDLED = None
+
+
+def bundled_table():
+    """Table of the bundled total coefficients"""
+    global _BUNDLED
+    if _BUNDLED is None:
+        _BUNDLED = PhotonTable(_bundled_data())
+    return _BUNDLED
+
+
+_LOADED = {}
+
+
+def load_photon_table():
+    """Table of the imported coefficients, completed with the bundled ones.
+
+    The table is rebuilt only when the imported rows change.
+    """
+    stats = PhotonCrossSection.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    if not stats['count']:
+        return bundled_table()
+    version = f"{stats['count']}:{stats['updated'].isoformat()}"
+    if _LOADED.get('version') != version:
+        data = _bundled_data()
+        rows = PhotonCrossSection.objects.order_by('element__atomic_number', 'energy', 'edge').values_list(
+            'element__atomic_number', 'energy', 'edge', *PROCESSES
+        )
+        imported = {}
+        for z, energy, edge, *values in rows:
+            element = imported.setdefault(z, {'energy': [], 'edge': [], **{p: [] for p in PROCESSES}})
+            element['energy'].append(energy)
+            element['edge'].append(edge)
+            for process, value in zip(PROCESSES, values):
+                element[process].append(value)
+        # Elements with a complete imported total replace the bundled data
+        data.update({z: rows for z, rows in imported.items() if None not in rows['total']})
+        _LOADED.update(version=version, table=PhotonTable(data, version=version))
+    return _LOADED['table']
+
+
+def _numbers(tokens):
+    values = []
+    for token in tokens:
+        try:
+            values.append(float(token))
+        except ValueError:
+            pass
+    return values
+
+
+def parse_xcom_table(text):
+    """Rows of an XCOM output table (energy and coefficients in MeV, cm²/g).
+
+    Each data line holds the energy followed by the coherent, incoherent,
+    photoelectric, nuclear and electron pair production coefficients and
+    the totals with and without coherent scattering, optionally preceded by
+    an index and an absorption edge label. Other lines are ignored.
+    """
+    rows = []
+    for line in text.splitlines():
+        tokens = line.split()
+        numbers = _numbers(tokens)
+        if len(numbers) < len(XCOM_COLUMNS) + 1:
+            continue
+        numbers = numbers[-(len(XCOM_COLUMNS) + 1):]
+        row = {'energy': numbers[0], 'edge': next((t for t in tokens if EDGE_LABEL.match(t)), '')}
+        row.update({column: value for column, value in zip(XCOM_COLUMNS, numbers[1:]) if column})
+        rows.append(row)
+    return rows
+
+
+def parse_energy_absorption_table(text):
+    """Rows of a NIST μ/ρ, μen/ρ table (energy in MeV, coefficients in cm²/g)"""
+    rows = []
+    for line in text.splitlines():
+        tokens = line.split()
+        numbers = _numbers(tokens)
+        if len(numbers) < 3:
+            continue
+        energy, total, energy_absorption = numbers[-3:]
+        rows.append({
+            'energy': energy, 'edge': next((t for t in tokens if EDGE_LABEL.match(t)), ''),
+            'total': total, 'energy_absorption': energy_absorption,
+        })
+    return rows
+
+
+def element_for(name):
+    """The ``Element`` of a symbol or atomic number, created from the bundled data if missing"""
+    name = str(name).strip()
+    if name.isdigit():
+        symbol = next((s for s, (z, _) in ELEMENTS.items() if z == int(name)), None)
+    else:
+        symbol = next((s for s in ELEMENTS if s.lower() == name.lower()), None)
+    if symbol is None:
+        raise ValueError(f'Unknown element: {name}')
+    z, mass = ELEMENTS[symbol]
+    element, _ = Element.objects.get_or_create(
+        atomic_number=z, defaults={'symbol': symbol, 'name': symbol, 'atomic_mass': mass}
+    )
+    return element
+
+
+@transaction.atomic
+def import_photon_rows(element, rows, processes, origin=''):
+    """Store the ``processes`` columns of parsed rows for an element.
+
+    Rows are matched on (energy, edge); other columns of existing rows are
+    kept. The total is recomputed from the components when it is not
+    imported itself. Returns the number of rows written.
+    """
+    now = timezone.now()
+    existing = {(r.energy, r.edge): r for r in PhotonCrossSection.objects.filter(element=element)}
+    created, updated = [], []
+    for row in rows:
+        record = existing.get((row['energy'], row['edge']))
+        if record is None:
+            record = PhotonCrossSection(element=element, energy=row['energy'], edge=row['edge'])
+            created.append(record)
+        else:
+            record.updated_at = now
+            updated.append(record)
+        for process in processes:
+            if process in row:
+                setattr(record, process, row[process])
+        if 'total' not in processes:
+            components = [getattr(record, c) for c in COMPONENTS]
+            if None not in components:
+                record.total = sum(components)
+        if origin:
+            record.origin = origin
+
+    PhotonCrossSection.objects.bulk_create(created)
+    if updated:
+        PhotonCrossSection.objects.bulk_update(updated, [*processes, 'total', 'origin', 'updated_at'])
+    return len(created) + len(updated)
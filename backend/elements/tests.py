@@ -1,3 +1,111 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from .decay import DecayData, Nuclide, half_life_seconds, nuclide_key
+from .models import PhotonCrossSection
+from .photon import bundled_table, load_photon_table
+
+# Excerpt of an XCOM output table for lead, around the K edge
+LEAD_XCOM = """
+   PHOTON    SCATTERING        PHOTO-   PAIR PRODUCTION    TOTAL ATTENUATION
+   ENERGY   COHERENT INCOHER.  ELECTRIC  IN NUCL.  IN ELECT.  WITH COH.  W/O COH.
+    (MeV)   (cm2/g)  (cm2/g)   (cm2/g)   (cm2/g)   (cm2/g)    (cm2/g)    (cm2/g)
+ 5.000E-02 2.896E-01 8.614E-02 7.665E+00 0.000E+00 0.000E+00 8.041E+00 7.751E+00
+ 8.000E-02 1.316E-01 9.355E-02 2.194E+00 0.000E+00 0.000E+00 2.419E+00 2.288E+00
+ 8.800E-02 1.112E-01 9.440E-02 1.704E+00 0.000E+00 0.000E+00 1.910E+00 1.799E+00
+K 8.800E-02 1.112E-01 9.440E-02 7.477E+00 0.000E+00 0.000E+00 7.683E+00 7.572E+00
+ 1.000E-01 8.950E-02 9.557E-02 5.364E+00 0.000E+00 0.000E+00 5.549E+00 5.460E+00
+ 1.000E+00 1.140E-03 5.104E-02 1.810E-02 0.000E+00 0.000E+00 7.102E-02 6.988E-02
+ 2.000E+00 2.862E-04 3.598E-02 5.586E-03 4.213E-03 0.000E+00 4.606E-02 4.577E-02
+"""
+
+
+class PhotonCrossSectionImportTests(TestCase):
+    """XCOM tables are imported per process and served as interpolation arrays"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        Path(self.directory.name, 'Pb.txt').write_text(LEAD_XCOM)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_import_and_vectorized_lookup(self):
+        call_command('importphotoncrosssections', self.directory.name, stdout=StringIO())
+        self.assertEqual(PhotonCrossSection.objects.filter(element__symbol='Pb').count(), 7)
+
+        table = load_photon_table()
+        self.assertNotEqual(table.version, 'bundled')
+        values = table.mass_attenuation([82, 26], [0.05, 0.0879, 0.0881, 1.0])
+        self.assertEqual(values.shape, (2, 4))
+        np.testing.assert_allclose(values[0, [0, 3]], [8.041, 0.07102], rtol=1e-6)
+        # Below and above the K edge
+        self.assertLess(values[0, 1], 2.0)
+        self.assertGreater(values[0, 2], 7.0)
+        # Iron has no imported rows and keeps the bundled data
+        np.testing.assert_allclose(values[1], bundled_table().mass_attenuation([26], [0.05, 0.0879, 0.0881, 1.0])[0])
+        np.testing.assert_allclose(
+            table.mass_attenuation([82], [2.0], process='pair_nuclear'), [[4.213e-03]], rtol=1e-6
+        )
+
+    def test_process_import_updates_only_its_column(self):
+        call_command('importphotoncrosssections', self.directory.name, stdout=StringIO())
+        Path(self.directory.name, 'Pb.txt').write_text(LEAD_XCOM.replace('1.810E-02', '2.810E-02'))
+        call_command('getPhotoElectricEffectCrossSection', self.directory.name, stdout=StringIO())
+
+        row = PhotonCrossSection.objects.get(element__symbol='Pb', energy=1.0)
+        self.assertAlmostEqual(row.photoelectric, 2.810e-02)
+        self.assertAlmostEqual(row.incoherent, 5.104e-02)
+        self.assertAlmostEqual(row.total, 1.140e-03 + 5.104e-02 + 2.810e-02)
+        self.assertAlmostEqual(load_photon_table().mass_attenuation([82], [1.0])[0, 0], row.total)
+
+
+class DecayDataTests(TestCase):
+    """Half-lives are parsed from text and short-lived daughters join their parent in equilibrium"""
+
+    def test_half_lives_and_nuclide_keys(self):
+        self.assertAlmostEqual(half_life_seconds('30.08 y') / 3.15576e7, 30.08)
+        self.assertAlmostEqual(half_life_seconds('5.27 years') / 3.15576e7, 5.27)
+        self.assertEqual(half_life_seconds('17.28 min'), 17.28 * 60)
+        self.assertEqual(half_life_seconds('2.5 ms'), 2.5e-3)
+        self.assertEqual(half_life_seconds('1.2e3'), 1200.0)
+        self.assertEqual(half_life_seconds('stable'), float('inf'))
+        self.assertEqual(nuclide_key('co60'), 'Co-60')
+        self.assertEqual(nuclide_key('Tc-99m'), 'Tc-99m')
+        with self.assertRaises(ValueError):
+            half_life_seconds('about a week')
+
+    def test_equilibrium_chain(self):
+        empty = np.empty(0)
+        data = DecayData({
+            'Ce-144': Nuclide('Ce-144', 2.8e-8, empty, empty, [('Pr-144', 1.0)]),
+            'Pr-144': Nuclide('Pr-144', 6.7e-4, empty, empty, [('Nd-144', 0.99), ('Pr-144m', 0.01)]),
+            'Pr-144m': Nuclide('Pr-144m', 1.6e-3, empty, empty, [('Pr-144', 1.0)]),
+            'Nd-144': Nuclide('Nd-144', 0.0, empty, empty),
+        })
+        ratios = {nuclide.key: ratio for nuclide, ratio in data.equilibrium_chain('ce-144')}
+        self.assertEqual(list(ratios)[0], 'Ce-144')
+        self.assertNotIn('Nd-144', ratios)
+        self.assertAlmostEqual(ratios['Pr-144'], 6.7e-4 / (6.7e-4 - 2.8e-8))
+        self.assertAlmostEqual(ratios['Pr-144m'], 0.01 * ratios['Pr-144'] * 1.6e-3 / (1.6e-3 - 6.7e-4))
+
+    def test_decay_with_ingrowth_matches_bateman(self):
+        empty = np.empty(0)
+        parent, daughter = 2.8e-8, 6.7e-4
+        data = DecayData({
+            'Ce-144': Nuclide('Ce-144', parent, empty, empty, [('Pr-144', 1.0)]),
+            'Pr-144': Nuclide('Pr-144', daughter, empty, empty, [('Nd-144', 1.0)]),
+            'Nd-144': Nuclide('Nd-144', 0.0, empty, empty),
+        })
+        times = np.array([0.0, 600.0, 3.15576e7, 3.15576e9])
+        keys, activities = data.decay({'Ce-144': 1e9}, times)
+        self.assertEqual(keys, ['Ce-144', 'Pr-144', 'Nd-144'])
+        np.testing.assert_allclose(activities[:, 0], 1e9 * np.exp(-parent * times), rtol=1e-9)
+        bateman = 1e9 * daughter / (daughter - parent) * (np.exp(-parent * times) - np.exp(-daughter * times))
+        np.testing.assert_allclose(activities[:, 1], bateman, rtol=1e-8, atol=1e-300)
+        np.testing.assert_array_equal(activities[:, 2], 0.0)
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from .models import (
     Project, SceneConfiguration, Geometry, Composition, 
-    Spectrum, Volume, SceneHistory, CSGOperation, MeshConfiguration,
-    ComputationConfiguration, ComputationResult, ToleranceConfiguration
+    Spectrum, Volume, SceneHistory, CSGOperation, MeshConfiguration, SceneSnapshot,
+    ComputationConfiguration, ComputationRun, ComputationResult, ComputationJob, ToleranceConfiguration, DoseMap
 )
 
 
@@ -62,6 +62,15 @@ class SceneHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ('timestamp',)
 
 
+@admin.register(SceneSnapshot)
+class SceneSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('project', 'kind', 'raw_size', 'etag', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('project__name',)
+    readonly_fields = ('created_at',)
+    exclude = ('data',)
+
+
 @admin.register(CSGOperation)
 class CSGOperationAdmin(admin.ModelAdmin):
     list_display = ('operation_type', 'project', 'created_at')
@@ -86,6 +95,13 @@ class ComputationConfigurationAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(ComputationRun)
+class ComputationRunAdmin(admin.ModelAdmin):
+    list_display = ('configuration', 'scene_hash', 'created_at')
+    search_fields = ('configuration__name', 'project__name', 'scene_hash')
+    readonly_fields = ('created_at',)
+
+
 @admin.register(ComputationResult)
 class ComputationResultAdmin(admin.ModelAdmin):
     list_display = ('configuration', 'dose_rate', 'uncertainty', 'converged', 'status', 'created_at')
@@ -94,9 +110,26 @@ class ComputationResultAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
+@admin.register(ComputationJob)
+class ComputationJobAdmin(admin.ModelAdmin):
+    list_display = ('project', 'status', 'progress', 'uncertainty', 'eta', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('project__name',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'updated_at')
+
+
 @admin.register(ToleranceConfiguration)
 class ToleranceConfigurationAdmin(admin.ModelAdmin):
     list_display = ('volume', 'coordinate', 'plus_delta', 'minus_delta', 'is_active', 'created_at')
     list_filter = ('coordinate', 'is_active', 'created_at')
     search_fields = ('volume__name', 'volume__project__name')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(DoseMap)
+class DoseMapAdmin(admin.ModelAdmin):
+    list_display = ('name', 'project', 'plane', 'response_function', 'status', 'maximum', 'created_at')
+    list_filter = ('plane', 'status', 'created_at')
+    search_fields = ('name', 'project__name')
+    readonly_fields = ('created_at', 'updated_at')
+    exclude = ('data',)
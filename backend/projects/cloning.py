@@ -0,0 +1,153 @@
+"""
+Project clone engine.
+
+Copies a whole project graph with one ``bulk_create`` per model. Rows of
+each model are read with a single query, rebuilt against the new project
+with their foreign keys remapped through old -> new id maps, and inserted
+in bulk, so the number of queries depends on the number of models rather
+than on the number of objects in the scene.
+
+The same row copier instantiates ``ExampleScene`` definitions, whose
+models mirror the project models field for field.
+"""
+from django.db import transaction
+
+from elements.models import ElementComposition, IsotopeSource
+from .models import (
+    Project, SceneConfiguration, Geometry, Composition, Spectrum, Volume,
+    SceneHistory, CSGOperation, Sensor, CompoundObject, CompoundObjectGeometry,
+    CompoundObjectComposition, CompoundObjectSpectrum, CompoundObjectSensor,
+    MeshConfiguration, ComputationConfiguration, ToleranceConfiguration, DoseMap
+)
+
+
+def copy_rows(rows, model, id_maps=None, **overrides):
+    """Insert copies of ``rows`` as ``model`` instances in one bulk insert.
+
+    ``rows`` may be instances of ``model`` or of any model sharing its field
+    names (e.g. ``ExampleSceneGeometry`` for ``Geometry``). Foreign keys
+    named in ``id_maps`` are translated through ``{old_id: new_id}`` maps,
+    ``overrides`` set a field to the same value on every copy, and fields
+    missing on the source row keep the model default.
+
+    Returns the ``{old_id: new_id}`` map of the inserted rows.
+    """
+    id_maps = id_maps or {}
+    rows = list(rows)
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+
+    copies = []
+    for row in rows:
+        values = {}
+        for field in fields:
+            if field.name in overrides:
+                values[field.name] = overrides[field.name]
+            elif field.name in id_maps:
+                old_id = getattr(row, field.attname, None)
+                values[field.attname] = id_maps[field.name].get(old_id)
+            elif hasattr(row, field.attname):
+                values[field.attname] = getattr(row, field.attname)
+        copies.append(model(**values))
+
+    created = model.objects.bulk_create(copies)
+    return {row.pk: copy.pk for row, copy in zip(rows, created)}
+
+
+def _remap_ids(ids, id_map):
+    """Translate a JSON list of object ids, leaving unknown entries untouched"""
+    if not isinstance(ids, list):
+        return ids
+    return [id_map.get(i, i) if isinstance(i, int) else i for i in ids]
+
+
+@transaction.atomic
+def clone_project(source, user, name=None, is_public=False, include_history=False):
+    """Copy ``source`` and its complete scene graph into a new project.
+
+    Copies the scene configuration, compositions, spectra, geometries,
+    volumes, sensors, CSG operations, mesh, tolerance and computation
+    configurations, dose map definitions, compound objects and element
+    compositions/isotope sources. Computation results and computed dose
+    maps are not copied; the undo history only when ``include_history`` is set.
+    """
+    project = Project.objects.create(
+        name=name or source.name,
+        description=source.description,
+        user=user,
+        is_public=is_public,
+    )
+
+    copy_rows(SceneConfiguration.objects.filter(project=source), SceneConfiguration, project=project)
+
+    compositions = copy_rows(Composition.objects.filter(project=source), Composition, project=project)
+    spectra = copy_rows(Spectrum.objects.filter(project=source), Spectrum, project=project)
+    geometries = copy_rows(Geometry.objects.filter(project=source), Geometry, project=project)
+
+    volumes = copy_rows(
+        Volume.objects.filter(project=source), Volume,
+        id_maps={'geometry': geometries, 'composition': compositions, 'spectrum': spectra},
+        project=project,
+    )
+    sensors = copy_rows(
+        Sensor.objects.filter(project=source), Sensor,
+        id_maps={'selected_composition': compositions},
+        project=project,
+    )
+
+    csg_operations = list(CSGOperation.objects.filter(project=source))
+    for operation in csg_operations:
+        operation.source_objects = _remap_ids(operation.source_objects, geometries)
+    copy_rows(csg_operations, CSGOperation, id_maps={'result_object': geometries}, project=project)
+
+    copy_rows(MeshConfiguration.objects.filter(volume__project=source), MeshConfiguration, id_maps={'volume': volumes})
+    copy_rows(ToleranceConfiguration.objects.filter(volume__project=source), ToleranceConfiguration, id_maps={'volume': volumes})
+    copy_rows(ComputationConfiguration.objects.filter(project=source), ComputationConfiguration, project=project)
+    copy_rows(
+        DoseMap.objects.filter(project=source).defer('data'), DoseMap,
+        project=project, status='pending', data=None, maximum=0.0, computation_time=0.0, log_data=None,
+    )
+
+    compound_objects = copy_rows(CompoundObject.objects.filter(project=source), CompoundObject, project=project)
+    for model, original, id_map in [
+        (CompoundObjectGeometry, 'original_geometry', geometries),
+        (CompoundObjectComposition, 'original_composition', compositions),
+        (CompoundObjectSpectrum, 'original_spectrum', spectra),
+        (CompoundObjectSensor, 'original_sensor', sensors),
+    ]:
+        copy_rows(
+            model.objects.filter(compound_object__project=source), model,
+            id_maps={'compound_object': compound_objects, original: id_map},
+        )
+
+    copy_rows(ElementComposition.objects.filter(project=source), ElementComposition, project=project)
+    copy_rows(
+        IsotopeSource.objects.filter(project=source), IsotopeSource,
+        id_maps={'geometry': geometries},
+        project=project,
+    )
+
+    if include_history:
+        copy_rows(SceneHistory.objects.filter(project=source), SceneHistory, project=project)
+
+    return project
+
+
+@transaction.atomic
+def instantiate_example_scene(example_scene, user, name=None):
+    """Create a new project from an ``ExampleScene`` definition"""
+    project = Project.objects.create(
+        name=name or example_scene.name,
+        description=example_scene.description,
+        user=user,
+    )
+    SceneConfiguration.objects.create(project=project)
+
+    compositions = copy_rows(example_scene.compositions.all(), Composition, project=project)
+    spectra = copy_rows(example_scene.spectra.all(), Spectrum, project=project)
+    geometries = copy_rows(example_scene.geometries.all(), Geometry, project=project)
+    copy_rows(
+        example_scene.volumes.all(), Volume,
+        id_maps={'geometry': geometries, 'composition': compositions, 'spectrum': spectra},
+        project=project,
+    )
+    return project
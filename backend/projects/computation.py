@@ -0,0 +1,307 @@
+"""
+Dose computations of a project.
+
+Runs the engine of a ``ComputationConfiguration`` (point kernel or Monte
+Carlo, from ``projects.physics``) and stores one ``ComputationResult`` per
+sensor, in the unit of the sensor's response function. The log of each
+result also lists every other response of the sensor, evaluated from the
+same energy-resolved flux.
+
+Minimum and maximum configurations shift volumes by their active
+``ToleranceConfiguration`` deltas (``physics.tolerance``). Configurations
+computed together with the same engine settings share one run: the
+point-kernel engine evaluates all of them by correlated sampling on the
+same source points, the Monte-Carlo engine runs each perturbed scene on
+the same random number streams, with the weight windows of one importance
+map of the nominal scene (``physics.importance``) unless the
+configuration turns variance reduction off.
+
+Results are reused where the scene has not changed (``result_cache``):
+a configuration rerun on an identical scene returns its stored results,
+and a point-kernel run only recomputes the sensors a change can reach.
+"""
+import time
+from dataclasses import replace
+
+import numpy as np
+from django.conf import settings
+
+from .models import ComputationResult, ToleranceConfiguration
+from .physics.importance import importance_map
+from .physics.monte_carlo import monte_carlo
+from .physics.point_kernel import correlated_point_kernel
+from .physics.response import RESPONSE_UNITS, UNCOLLIDED_RESPONSES, all_responses, response_coefficients
+from .physics.scene import load_scene
+from .physics.tolerance import tolerance_perturbation
+from .result_cache import cached_results, copy_results, record_run, reusable_results, scene_fingerprints
+
+BATCHES = 10
+
+
+def batch_statistics(estimates):
+    """Mean, relative standard error and running relative error of batch estimates"""
+    estimates = np.asarray(estimates, dtype=float)
+    mean = estimates.mean()
+    history = []
+    for n in range(2, len(estimates) + 1):
+        running = estimates[:n].mean()
+        error = estimates[:n].std(ddof=1) / np.sqrt(n)
+        history.append(float(error / running) if running > 0 else 0.0)
+    return float(mean), (history[-1] if history else 0.0), history
+
+
+def figure_of_merit(estimates, seconds):
+    """1 / (R² T) of batch estimates computed in ``seconds``, 0 without an error estimate"""
+    _, error, _ = batch_statistics(estimates)
+    return 1.0 / (error ** 2 * seconds) if error > 0 and seconds > 0 else 0.0
+
+
+def _unsupported(sensor):
+    """Error message of a sensor whose response cannot be computed, or None"""
+    try:
+        response_coefficients(sensor.response_function, [1.0])
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def _scaled(progress, start, share):
+    """Engine progress callback reporting ``progress(fraction, samples, uncertainty)`` over a share of a run"""
+    if progress is None:
+        return None
+    return lambda done, total, uncertainty: progress(start + share * done / total, done, uncertainty)
+
+
+def response_details(energies, flux, uncollided):
+    """Every response of a sensor's mean flux and uncollided flux (E,) with its unit"""
+    return {
+        name: {'value': float(value), 'unit': RESPONSE_UNITS[name]}
+        for name, value in all_responses(energies, flux, uncollided).items()
+    }
+
+
+def _kernel_estimates(scene, kernel, configuration):
+    """Per-batch responses (batches, sensors) and per-sensor log details of a point-kernel result"""
+    estimates = np.zeros((BATCHES, len(scene.sensors)))
+    details = []
+    for i, sensor in enumerate(scene.sensors):
+        batches = kernel.uncollided if sensor.response_function in UNCOLLIDED_RESPONSES else kernel.flux
+        if not _unsupported(sensor):
+            estimates[:, i] = batches[:, i, :] @ response_coefficients(sensor.response_function, kernel.energies)
+        flux, uncollided = kernel.flux[:, i, :].mean(axis=0), kernel.uncollided[:, i, :].mean(axis=0)
+        details.append({
+            'method': 'point_kernel',
+            'source_points': BATCHES * max(configuration.particles_per_sample // BATCHES, 1) * len(scene.sources),
+            'lines': [
+                {'energy': float(e * 1000.0), 'flux': float(f), 'uncollided_flux': float(u)}
+                for e, f, u in zip(kernel.energies, flux, uncollided)
+            ],
+            'responses': response_details(kernel.energies, flux, uncollided),
+        })
+    return estimates, details
+
+
+def point_kernel_estimates(scene, configuration, perturbations, seed, log, progress=None):
+    """Per-batch responses (batches, sensors) and per-sensor log details of each perturbation,
+    all evaluated on the same source points"""
+    log.append('Generating source points...')
+    log.append('Integrating point kernels...')
+    kernels = correlated_point_kernel(
+        scene, perturbations, points_per_source=configuration.particles_per_sample, batches=BATCHES, seed=seed,
+        progress=_scaled(progress, 0.0, 1.0)
+    )
+    nominal, _ = _kernel_estimates(scene, kernels[0], configuration)
+
+    outcomes = []
+    for perturbation, kernel in zip(perturbations, kernels[1:]):
+        estimates, details = _kernel_estimates(scene, kernel, configuration)
+        if perturbation.shifts:
+            differences = estimates - nominal
+            for i, detail in enumerate(details):
+                detail['tolerance'] = {
+                    'nominal': float(nominal[:, i].mean()),
+                    'difference': float(differences[:, i].mean()),
+                    'difference_uncertainty': float(differences[:, i].std(ddof=1) / np.sqrt(BATCHES)),
+                }
+        outcomes.append((estimates, details))
+    return outcomes
+
+
+def monte_carlo_estimates(scene, configuration, perturbations, seed, log, progress=None):
+    """Per-sample responses (samples, sensors) and per-sensor log details of each perturbation,
+    transported on the same random number streams"""
+    supported = np.array([not _unsupported(sensor) for sensor in scene.sensors], dtype=bool)
+    sensors = [s for s, ok in zip(scene.sensors, supported) if ok]
+    importance = None
+    if configuration.variance_reduction and supported.any():
+        log.append('Generating importance map...')
+        importance = importance_map(replace(scene, sensors=sensors), seed=seed)
+    log.append('Transporting photons...')
+    outcomes = []
+    for index, perturbation in enumerate(perturbations):
+        result = None
+        started = time.perf_counter()
+        if supported.any():
+            result = monte_carlo(
+                replace(perturbation.apply(scene), sensors=sensors),
+                particles_per_sample=configuration.particles_per_sample,
+                max_samples=configuration.number_of_samples,
+                convergence_criterion=configuration.convergence_criterion, seed=seed,
+                workers=settings.COMPUTATION_WORKERS,
+                progress=_scaled(progress, index / len(perturbations), 1 / len(perturbations)),
+                importance=importance,
+            )
+        elapsed = time.perf_counter() - started
+
+        samples = result.samples if result else 1
+        estimates = np.zeros((samples, len(scene.sensors)))
+        if result:
+            estimates[:, supported] = result.responses
+        details = [{
+            'method': 'monte_carlo',
+            'samples': samples,
+            'particles': samples * configuration.particles_per_sample,
+            'variance_reduction': importance is not None,
+        } for _ in scene.sensors]
+        if result:
+            tallies = result.tallies.mean(axis=0)
+            for i, (detail, tally) in enumerate(zip((d for d, ok in zip(details, supported) if ok), tallies)):
+                detail['responses'] = response_details(result.energies, tally.sum(axis=0), tally[0])
+                detail['figure_of_merit'] = figure_of_merit(result.responses[:, i], elapsed)
+        outcomes.append((estimates, details))
+    return outcomes
+
+
+ENGINES = {
+    'point_kernel': point_kernel_estimates,
+    'monte_carlo': monte_carlo_estimates,
+}
+
+
+def _error_result(project, configuration, log, started):
+    return ComputationResult.objects.create(
+        project=project, configuration=configuration, dose_rate=0.0, uncertainty=0.0,
+        computation_time=round(time.perf_counter() - started), converged=False,
+        status='error', log_data={'steps': log, 'convergence_history': []}
+    )
+
+
+def _store_results(run, scene, perturbation, estimates, details, sensor_hashes, log, started):
+    """Create the results of one configuration's run from its per-sample sensor responses"""
+    project, configuration = run.project, run.configuration
+    log = log + ['Computing dose rates...']
+    elapsed = round(time.perf_counter() - started)
+    sensors = {sensor.pk: sensor for sensor in project.sensors.all()}
+    shifted = [scene.volumes[index] for index in perturbation.shifts]
+
+    results = []
+    for i, sensor in enumerate(scene.sensors):
+        error = _unsupported(sensor)
+        if error:
+            results.append(ComputationResult(
+                project=project, configuration=configuration, sensor=sensors[sensor.id],
+                run=run, sensor_hash=sensor_hashes[i],
+                dose_rate=0.0, uncertainty=0.0, computation_time=elapsed, converged=False,
+                status='error', log_data={'steps': log + [error], 'convergence_history': []}
+            ))
+            continue
+
+        value, uncertainty, history = batch_statistics(estimates[:, i])
+        if not np.isfinite([value, uncertainty]).all():
+            results.append(ComputationResult(
+                project=project, configuration=configuration, sensor=sensors[sensor.id],
+                run=run, sensor_hash=sensor_hashes[i],
+                dose_rate=0.0, uncertainty=0.0, computation_time=elapsed, converged=False, status='error',
+                log_data={'steps': log + ['The dose rate is not a finite number'], 'convergence_history': []}
+            ))
+            continue
+        converged = uncertainty <= configuration.convergence_criterion
+        detail = details[i]
+        if shifted:
+            detail = {**detail, 'tolerance': {'shifted_volumes': shifted, **detail.get('tolerance', {})}}
+        results.append(ComputationResult(
+            project=project, configuration=configuration, sensor=sensors[sensor.id],
+            run=run, sensor_hash=sensor_hashes[i], dose_rate=value, uncertainty=uncertainty, unit=RESPONSE_UNITS[sensor.response_function],
+            computation_time=elapsed, converged=converged,
+            status='success' if converged else 'warning',
+            log_data={
+                'steps': log + ['Validating convergence...', 'Storing results...'],
+                'convergence_history': history,
+                **detail,
+            }
+        ))
+
+    return ComputationResult.objects.bulk_create(results)
+
+
+def run_computations(project, configurations, seed=0, reuse=True, progress=None):
+    """Compute the sensor responses of ``project`` for each configuration and store them.
+
+    Configurations with the same method and settings share one engine run.
+    With ``reuse``, results stored for the same scene content are returned
+    or copied instead of being recomputed. ``progress(fraction, samples,
+    uncertainty)`` is called after every sample or batch.
+    """
+    started = time.perf_counter()
+    log = ['Initializing geometry...', 'Loading material libraries...']
+
+    try:
+        scene = load_scene(project)
+        tolerances = list(ToleranceConfiguration.objects.filter(volume__project=project, is_active=True))
+        perturbations = [tolerance_perturbation(scene, tolerances, c.config_type) for c in configurations]
+        fingerprints = scene_fingerprints(scene, configurations, perturbations, seed, BATCHES)
+        log.extend(scene.warnings)
+    except ValueError as e:
+        log.append(str(e))
+        return [_error_result(project, configuration, log, started) for configuration in configurations]
+
+    results = []
+    groups = {}
+    for configuration, perturbation, fingerprint in zip(configurations, perturbations, fingerprints):
+        cached = cached_results(configuration, scene, fingerprint) if reuse else None
+        if cached is not None:
+            results.extend(cached)
+            continue
+        reused = {}
+        if reuse and configuration.method == 'point_kernel':
+            reused = reusable_results(configuration, scene, perturbation, fingerprint)
+        key = (
+            configuration.method, configuration.particles_per_sample,
+            configuration.number_of_samples, configuration.convergence_criterion, configuration.variance_reduction,
+        )
+        groups.setdefault(key, []).append((configuration, perturbation, fingerprint, reused))
+
+    for number, members in enumerate(groups.values()):
+        group_log = list(log)
+        # Sensors that some configuration of the group cannot reuse
+        computed = [i for i in range(len(scene.sensors)) if any(i not in reused for *_, reused in members)]
+        subset = replace(scene, sensors=[scene.sensors[i] for i in computed])
+        outcomes = [(None, None)] * len(members)
+        group_progress = progress and (
+            lambda fraction, samples, uncertainty: progress((number + fraction) / len(groups), samples, uncertainty)
+        )
+        if computed:
+            try:
+                outcomes = ENGINES[members[0][0].method](
+                    subset, members[0][0], [m[1] for m in members], seed, group_log, group_progress
+                )
+            except ValueError as e:
+                group_log.append(str(e))
+                results.extend(_error_result(project, configuration, group_log, started) for configuration, *_ in members)
+                continue
+        for (configuration, perturbation, fingerprint, reused), (estimates, details) in zip(members, outcomes):
+            run = record_run(project, configuration, scene, fingerprint)
+            if computed:
+                results.extend(_store_results(
+                    run, subset, perturbation, estimates, details,
+                    [fingerprint.sensors[i] for i in computed], group_log, started
+                ))
+            results.extend(copy_results(run, scene, fingerprint, {
+                i: result for i, result in reused.items() if i not in computed
+            }))
+    return results
+
+
+def run_computation(project, configuration, seed=0, reuse=True):
+    """Compute the sensor responses of ``project`` for one configuration and store them"""
+    return run_computations(project, [configuration], seed, reuse)
@@ -0,0 +1,92 @@
+"""
+Dose-rate maps of a project.
+
+Computes a ``DoseMap`` with the grid evaluation of
+``projects.physics.dose_map`` and stores the responses as a compact
+float32 blob. Maps are served raw (``application/octet-stream`` with the
+shape in a header) or rendered as PNG heatmaps on a logarithmic scale.
+"""
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from .physics.dose_map import grid_points, map_responses
+from .physics.point_kernel import source_points
+from .physics.response import RESPONSE_UNITS
+from .physics.scene import load_scene
+
+DTYPE = np.dtype('<f4')
+# Orders of magnitude below the maximum shown by heatmaps
+DECADES = 6
+# Heatmap colour stops from low to high response
+COLORS = np.array([
+    [0, 0, 4], [87, 16, 110], [188, 55, 84], [249, 142, 9], [252, 255, 164],
+], dtype=float)
+
+
+def run_dose_map(dose_map, seed=0):
+    """Compute the responses of ``dose_map`` and store them"""
+    started = time.perf_counter()
+    log = ['Initializing geometry...', 'Loading material libraries...']
+    try:
+        grid = grid_points(dose_map.plane, dose_map.extents, dose_map.offset, dose_map.resolution)
+        scene = load_scene(dose_map.project)
+        log.extend(scene.warnings)
+        if not scene.sources:
+            raise ValueError('The project has no source volume with a line spectrum')
+        points, weights = source_points(
+            scene, np.random.default_rng(seed), max(dose_map.points_per_source, 1), scene.energies
+        )
+        log.append('Evaluating grid points...')
+        responses, refined = map_responses(scene, np.concatenate(points), weights, grid, dose_map.response_function)
+        if not np.isfinite(responses).all():
+            raise ValueError('The map has responses that are not finite numbers')
+    except ValueError as e:
+        log.append(str(e))
+        dose_map.status, dose_map.data, dose_map.maximum = 'error', None, 0.0
+        dose_map.log_data = {'steps': log}
+    else:
+        dose_map.status = 'success'
+        dose_map.data = responses.astype(DTYPE).tobytes()
+        dose_map.maximum = float(responses.max())
+        dose_map.log_data = {'steps': log, 'points': int(responses.size), 'refined_fraction': refined}
+    dose_map.unit = RESPONSE_UNITS.get(dose_map.response_function, dose_map.unit)
+    dose_map.computation_time = time.perf_counter() - started
+    dose_map.save()
+    return dose_map
+
+
+def map_array(dose_map):
+    """Stored responses of a computed map, shaped by its resolution"""
+    if dose_map.data is None:
+        return None
+    return np.frombuffer(bytes(dose_map.data), dtype=DTYPE).reshape([int(n) for n in dose_map.resolution])
+
+
+def heatmap_png(array, index=None):
+    """PNG bytes of a 2D map, or of slice ``index`` along the last axis of a 3D map.
+
+    The first plane axis runs left to right and the second bottom to top.
+    """
+    if array.ndim == 3:
+        index = array.shape[2] // 2 if index is None else index
+        if not 0 <= index < array.shape[2]:
+            raise ValueError(f'Slice must be between 0 and {array.shape[2] - 1}')
+        array = array[:, :, index]
+    image = np.flipud(np.asarray(array, dtype=float).T)
+
+    peak = image.max()
+    if peak > 0:
+        scaled = np.clip(np.log10(np.maximum(image, peak * 10.0 ** -DECADES) / peak) / DECADES + 1, 0, 1)
+    else:
+        scaled = np.zeros_like(image)
+    position = scaled * (len(COLORS) - 1)
+    lower = np.minimum(position.astype(int), len(COLORS) - 2)
+    fraction = (position - lower)[..., None]
+    rgb = COLORS[lower] * (1 - fraction) + COLORS[lower + 1] * fraction
+
+    buffer = io.BytesIO()
+    Image.fromarray(rgb.round().astype(np.uint8), 'RGB').save(buffer, format='PNG')
+    return buffer.getvalue()
@@ -0,0 +1,165 @@
+"""
+Delta-compressed scene history.
+
+Instead of a full scene snapshot per undo step, ``SceneHistory`` rows store
+a JSON patch (RFC 6902 add/remove/replace operations) against the previous
+step. Every ``KEYFRAME_INTERVAL``-th step stores the complete state, so a
+state is rebuilt from the nearest keyframe with a bounded number of
+patches. Each project keeps at most ``SCENE_HISTORY_RETENTION`` steps; when
+the limit is exceeded the oldest retained step is turned into a keyframe
+and everything before it is dropped.
+"""
+import copy
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Project, SceneHistory
+
+KEYFRAME_INTERVAL = getattr(settings, 'SCENE_HISTORY_KEYFRAME_INTERVAL', 20)
+RETENTION = getattr(settings, 'SCENE_HISTORY_RETENTION', 200)
+
+
+def _escape(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old, new, path=''):
+    """Return the JSON patch operations turning ``old`` into ``new``"""
+    if type(old) is not type(new):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f'{path}/{_escape(key)}'})
+        for key, value in new.items():
+            child = f'{path}/{_escape(key)}'
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list):
+        # Trim the common prefix and suffix so that inserting or deleting
+        # one scene object only patches the affected slice of the list
+        start = 0
+        while start < len(old) and start < len(new) and old[start] == new[start]:
+            start += 1
+        old_end, new_end = len(old), len(new)
+        while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+
+        ops = []
+        common = min(old_end, new_end) - start
+        for i in range(start, start + common):
+            ops.extend(make_patch(old[i], new[i], f'{path}/{i}'))
+        # Removals run back to front so indices stay valid
+        for i in range(old_end - 1, start + common - 1, -1):
+            ops.append({'op': 'remove', 'path': f'{path}/{i}'})
+        for i in range(start + common, new_end):
+            ops.append({'op': 'add', 'path': f'{path}/{i}', 'value': new[i]})
+        return ops
+
+    if old != new:
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    return []
+
+
+def apply_patch(document, patch):
+    """Apply JSON patch operations to a copy of ``document``"""
+    return _apply_in_place(copy.deepcopy(document), patch)
+
+
+def _apply_in_place(document, patch):
+    """Apply JSON patch operations to ``document`` itself and return the result"""
+    for op in patch:
+        if op['path'] == '':
+            document = copy.deepcopy(op.get('value'))
+            continue
+
+        tokens = [_unescape(t) for t in op['path'].split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            index = len(parent) if last == '-' else int(last)
+            if op['op'] == 'add':
+                parent.insert(index, copy.deepcopy(op['value']))
+            elif op['op'] == 'remove':
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op['value'])
+        else:
+            if op['op'] == 'remove':
+                del parent[last]
+            else:
+                parent[last] = copy.deepcopy(op['value'])
+    return document
+
+
+def reconstruct_state(entry):
+    """Rebuild the complete scene state stored by a history entry"""
+    if entry.is_keyframe:
+        return entry.scene_state
+
+    keyframe = SceneHistory.objects.filter(
+        project_id=entry.project_id, is_keyframe=True, sequence__lte=entry.sequence
+    ).order_by('-sequence').first()
+    deltas = SceneHistory.objects.filter(
+        project_id=entry.project_id, sequence__gt=keyframe.sequence, sequence__lte=entry.sequence
+    ).order_by('sequence').values_list('delta', flat=True)
+
+    # The keyframe is fresh from the database, so the patches can modify it
+    state = keyframe.scene_state
+    for delta in deltas:
+        state = _apply_in_place(state, delta)
+    return state
+
+
+@transaction.atomic
+def record_history(project, action_name, scene_state):
+    """Append a scene state to the project's history"""
+    # Locking the project serializes records, including the first one
+    Project.objects.select_for_update().only('pk').get(pk=project.pk)
+    previous = SceneHistory.objects.filter(project=project).order_by('-sequence').first()
+    sequence = previous.sequence + 1 if previous else 0
+
+    if previous is None or sequence % KEYFRAME_INTERVAL == 0:
+        entry = SceneHistory.objects.create(
+            project=project, action_name=action_name, sequence=sequence,
+            is_keyframe=True, scene_state=scene_state
+        )
+    else:
+        entry = SceneHistory.objects.create(
+            project=project, action_name=action_name, sequence=sequence,
+            is_keyframe=False, delta=make_patch(reconstruct_state(previous), scene_state)
+        )
+
+    compact_history(project)
+    return entry
+
+
+def compact_history(project, retention=None):
+    """Drop the oldest steps beyond the retention limit"""
+    retention = retention or RETENTION
+    cutoff = SceneHistory.objects.filter(project=project).order_by('-sequence')[retention - 1:retention].first()
+    if cutoff is None or not SceneHistory.objects.filter(project=project, sequence__lt=cutoff.sequence).exists():
+        return
+
+    # The oldest retained step becomes the keyframe the rest is rebuilt from
+    if not cutoff.is_keyframe:
+        cutoff.scene_state = reconstruct_state(cutoff)
+        cutoff.delta = None
+        cutoff.is_keyframe = True
+        cutoff.save(update_fields=['scene_state', 'delta', 'is_keyframe'])
+    SceneHistory.objects.filter(project=project, sequence__lt=cutoff.sequence).delete()
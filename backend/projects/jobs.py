@@ -0,0 +1,249 @@
+"""
+Queue of computation jobs.
+
+``start_computation``, ``compute_dose_map`` and ``dose_time_series_view``
+store a ``ComputationJob`` and return at once; the ``runcomputations`` management command claims
+queued jobs in creation order and runs them, so no request thread runs
+transport. A time series keeps its response in ``output``. The database is the only broker: a job is claimed by
+a conditional update from queued to running, so several workers can share
+one queue without running a job twice.
+
+A thread of the worker touches a running job every
+``HEARTBEAT_INTERVAL`` seconds, whatever phase the run is in. A job whose
+heartbeat stops for ``COMPUTATION_JOB_TIMEOUT`` seconds is taken to have
+crashed: it fails when the next job is claimed or when its event stream
+notices, so streams always end. A run finishing after its job was failed
+that way leaves the job failed, since its streams already closed on it.
+
+While it runs, a job records the completed fraction, the samples of the
+current engine run, the largest running uncertainty over sensors and an
+ETA, at most every ``PROGRESS_INTERVAL`` seconds. ``job_events`` turns
+these rows into a server-sent event stream. Browsers' ``EventSource``
+cannot send the token header the API uses, so an authenticated POST
+issues a ``StreamTicket`` that opens one stream of one job within
+``STREAM_TICKET_LIFETIME`` seconds.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from elements.decay import SECONDS
+from .computation import run_computations
+from .dose_maps import run_dose_map
+from .models import ComputationJob, StreamTicket
+from .physics.response import RESPONSE_UNITS
+from .physics.scene import load_scene
+from .physics.time_dependent import dose_time_series
+
+# Seconds between progress writes of a running job, and between its heartbeats
+PROGRESS_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 30.0
+# Seconds between polls of an event stream, and between keep-alive comments
+EVENT_INTERVAL = 0.5
+KEEPALIVE_INTERVAL = 15.0
+FINISHED = ('success', 'error')
+# Most times one dose time series evaluates
+MAX_TIMES = 1000
+STALE_ERROR = 'The worker running the job stopped responding'
+STATE_FIELDS = ('id', 'status', 'progress', 'samples', 'uncertainty', 'eta', 'error')
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_computation(project, configurations, force=False):
+    """Queue a run of ``configurations``"""
+    job = ComputationJob.objects.create(project=project, force=force)
+    job.configurations.set(configurations)
+    return job
+
+
+def enqueue_dose_map(dose_map):
+    """Queue the computation of ``dose_map``"""
+    return ComputationJob.objects.create(project=dose_map.project, kind='dose_map', dose_map=dose_map)
+
+
+def enqueue_time_series(project, times, time_unit, points_per_source, seed=0):
+    """Queue the dose rates of ``project``'s decaying sources at ``times``"""
+    return ComputationJob.objects.create(project=project, kind='time_series', parameters={
+        'times': times, 'time_unit': time_unit, 'points_per_source': points_per_source, 'seed': seed
+    })
+
+
+def time_series_output(project, times, time_unit, points_per_source, seed=0):
+    """Sensor responses and source inventories of ``project`` at ``times``"""
+    scene = load_scene(project)
+    series = dose_time_series(scene, [t * SECONDS[time_unit] for t in times], points_per_source, seed=seed)
+    contributions = series.contributions()
+    return {
+        'times': times,
+        'time_unit': time_unit,
+        'sensors': [{
+            'id': sensor.id,
+            'name': sensor.name,
+            'response_function': sensor.response_function,
+            'unit': RESPONSE_UNITS.get(sensor.response_function),
+            'dose_rates': series.rates[:, i].tolist(),
+            'constant': float(series.constant[i]),
+            'nuclides': {key: values[:, i].tolist() for key, values in contributions.items()},
+        } for i, sensor in enumerate(scene.sensors)],
+        'inventories': [{
+            'name': inventory.name,
+            'activities': {key: inventory.activities[:, j].tolist() for j, key in enumerate(inventory.nuclides)},
+        } for inventory in series.inventories],
+        'warnings': scene.warnings,
+    }
+
+
+def stale_jobs():
+    """Running jobs without progress for ``COMPUTATION_JOB_TIMEOUT`` seconds"""
+    cutoff = timezone.now() - timedelta(seconds=settings.COMPUTATION_JOB_TIMEOUT)
+    return ComputationJob.objects.filter(status='running', updated_at__lt=cutoff)
+
+
+def _stale_failure():
+    now = timezone.now()
+    return {'status': 'error', 'error': STALE_ERROR, 'finished_at': now, 'updated_at': now}
+
+
+def claim_job():
+    """The oldest queued job, marked running, or None when the queue is empty"""
+    stale_jobs().update(**_stale_failure())
+    for pk in ComputationJob.objects.filter(status='queued').values_list('pk', flat=True)[:10]:
+        now = timezone.now()
+        if ComputationJob.objects.filter(pk=pk, status='queued').update(status='running', started_at=now, updated_at=now):
+            return ComputationJob.objects.select_related('project', 'dose_map').get(pk=pk)
+    return None
+
+
+class Heartbeat(threading.Thread):
+    """Thread touching a running job every ``interval`` seconds until stopped"""
+
+    def __init__(self, pk, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.pk, self.interval = pk, interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                ComputationJob.objects.filter(pk=self.pk, status='running').update(updated_at=timezone.now())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job, seed=0):
+    """Run a claimed job, recording its progress and results"""
+    started = time.perf_counter()
+    written = started
+
+    def progress(fraction, samples, uncertainty):
+        nonlocal written
+        now = time.perf_counter()
+        if now - written < PROGRESS_INTERVAL and fraction < 1:
+            return
+        written = now
+        eta = (now - started) * (1 - fraction) / fraction if fraction > 0 else None
+        ComputationJob.objects.filter(pk=job.pk).update(
+            progress=fraction, samples=samples, uncertainty=uncertainty, eta=eta, updated_at=timezone.now()
+        )
+
+    heartbeat = Heartbeat(job.pk)
+    heartbeat.start()
+    results = []
+    output = None
+    try:
+        if job.kind == 'time_series':
+            output = time_series_output(job.project, **job.parameters)
+            errors = []
+        elif job.kind == 'dose_map':
+            dose_map = run_dose_map(job.dose_map, seed)
+            errors = [] if dose_map.status == 'success' else dose_map.log_data['steps'][-1:]
+        else:
+            results = run_computations(
+                job.project, list(job.configurations.order_by('pk')), seed, reuse=not job.force, progress=progress
+            )
+            errors = [] if any(result.status != 'error' for result in results) else [
+                result.log_data['steps'][-1] for result in results
+            ] or ['The run produced no results']
+    except Exception as e:
+        outcome = {'status': 'error', 'error': str(e)}
+    else:
+        outcome = {'status': 'success', 'progress': 1.0, 'eta': 0.0, 'output': output}
+        if errors:
+            outcome = {**outcome, 'status': 'error', 'error': errors[0]}
+    finally:
+        heartbeat.stop()
+
+    now = timezone.now()
+    with transaction.atomic():
+        finished = ComputationJob.objects.filter(pk=job.pk, status='running').update(
+            **outcome, finished_at=now, updated_at=now
+        )
+        if finished:
+            job.results.set(results)
+    if not finished:
+        logger.warning('Computation job %s was failed as stale before its run ended in %s', job.pk, outcome['status'])
+    job.refresh_from_db()
+    return job
+
+
+def issue_stream_ticket(user, job):
+    """A new event stream ticket of ``user`` for ``job``, dropping expired tickets"""
+    StreamTicket.objects.filter(created_at__lt=_ticket_cutoff()).delete()
+    return StreamTicket.objects.create(user=user, job=job)
+
+
+async def redeem_stream_ticket(key, pk):
+    """User of an unexpired ticket for job ``pk``, which is used up, or None"""
+    ticket = await StreamTicket.objects.select_related('user').filter(
+        key=key, job_id=pk, created_at__gte=_ticket_cutoff()
+    ).afirst()
+    if ticket is None or not ticket.user.is_active:
+        return None
+    # Deleting the row claims it, so concurrent requests cannot both use it
+    deleted, _ = await StreamTicket.objects.filter(pk=ticket.pk).adelete()
+    return ticket.user if deleted else None
+
+
+def _ticket_cutoff():
+    return timezone.now() - timedelta(seconds=settings.STREAM_TICKET_LIFETIME)
+
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+async def job_events(pk):
+    """Server-sent events of a job: ``progress`` on every change, then ``done`` with its results"""
+    last, quiet = None, 0.0
+    while True:
+        state = await ComputationJob.objects.filter(pk=pk).values(*STATE_FIELDS).afirst()
+        if state is None:
+            return
+        if state['status'] == 'running' and await stale_jobs().filter(pk=pk).aupdate(**_stale_failure()):
+            continue
+        if state['status'] in FINISHED:
+            state['results'] = [r async for r in ComputationJob.results.through.objects.filter(
+                computationjob_id=pk
+            ).values_list('computationresult_id', flat=True)]
+            yield _event('done', state)
+            return
+        if state != last:
+            last, quiet = state, 0.0
+            yield _event('progress', state)
+        elif quiet >= KEEPALIVE_INTERVAL:
+            quiet = 0.0
+            yield ': keep-alive\n\n'
+        await asyncio.sleep(EVENT_INTERVAL)
+        quiet += EVENT_INTERVAL
@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.synthetic import SIZE_PRESETS, generate_project
+
+COUNTS = ('geometries', 'volumes', 'compositions', 'spectra', 'sensors', 'compound_objects', 'history')
+
+
+class Command(BaseCommand):
+    help = 'Generate reproducible synthetic projects for load and scaling tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Email of the owner of the projects')
+        parser.add_argument('--size', choices=SIZE_PRESETS, default='small', help='Preset object counts')
+        for count in COUNTS:
+            parser.add_argument(f'--{count.replace("_", "-")}', type=int, help=f'Number of {count.replace("_", " ")}, '
+                                'overriding the preset')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the first project')
+        parser.add_argument('--count', type=int, default=1, help='Projects to generate, with consecutive seeds')
+        parser.add_argument('--name', help='Project name (default: from the counts and seed)')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+        counts = {
+            count: options[count] if options[count] is not None else SIZE_PRESETS[options['size']][count]
+            for count in COUNTS
+        }
+        if any(value < 0 for value in counts.values()):
+            raise CommandError('Object counts cannot be negative')
+
+        for i in range(options['count']):
+            seed = options['seed'] + i
+            name = options['name'] and (options['name'] if options['count'] == 1 else f'{options["name"]} {i + 1}')
+            started = time.perf_counter()
+            project = generate_project(user, name=name, seed=seed, **counts)
+            self.stdout.write(self.style.SUCCESS(
+                f'Generated {project.name} ({project.uuid}) in {time.perf_counter() - started:.2f} s'
+            ))
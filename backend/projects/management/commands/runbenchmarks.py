@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.suite import (
+    BASELINE_RUNS, MEMORY_TOLERANCE, OPERATIONS, QUERY_TOLERANCE, REPEAT, SCALES, TIME_NOISE_FLOOR, TIME_TOLERANCE,
+    baselines, load_history, record_run, regressions, run_suite,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark scene save, load, duplication, decay and dose on the example scenes and scaled copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenes', nargs='+', help='Example scene names (default: all)')
+        parser.add_argument('--scales', nargs='+', type=int, default=list(SCALES), help='Copies of each scene')
+        parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+        parser.add_argument('--repeat', type=int, default=REPEAT, help='Timed runs of each operation; the best counts')
+        parser.add_argument('--history', default=settings.BENCHMARK_HISTORY, help='JSON history file')
+        parser.add_argument('--baseline-runs', type=int, default=BASELINE_RUNS,
+                            help='Latest passed runs whose median is the baseline')
+        parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE,
+                            help='Allowed relative growth of wall times')
+        parser.add_argument('--time-noise-floor', type=float, default=TIME_NOISE_FLOOR,
+                            help='Seconds of growth below which wall times never regress')
+        parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE,
+                            help='Allowed relative growth of peak memory')
+        parser.add_argument('--query-tolerance', type=int, default=QUERY_TOLERANCE,
+                            help='Allowed extra queries')
+        parser.add_argument('--no-record', action='store_true', help='Do not append the run to the history')
+
+    def handle(self, *args, **options):
+        def report(m):
+            self.stdout.write(
+                f'{m.key:<40} {m.seconds:9.3f} s {m.queries:7d} queries {m.peak_memory / 2**20:9.1f} MiB'
+            )
+
+        try:
+            measurements = run_suite(
+                options['scenes'], options['scales'], options['operations'], max(options['repeat'], 1), report
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        baseline = baselines(load_history(options['history']), options['baseline_runs'])
+        found = regressions(
+            measurements, baseline, options['time_tolerance'], options['memory_tolerance'], options['query_tolerance'],
+            options['time_noise_floor'],
+        )
+        if not options['no_record']:
+            record_run(options['history'], measurements, found)
+        if found:
+            raise CommandError(f'{len(found)} regressions:\n' + '\n'.join(found))
+        compared = sum(m.key in baseline for m in measurements)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(measurements)} measurements, no regressions against {compared} baselines'
+        ))
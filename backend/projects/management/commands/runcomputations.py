@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.jobs import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued computation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls of an empty queue')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after running this many jobs')
+
+    def handle(self, *args, **options):
+        count = 0
+        while options['max_jobs'] is None or count < options['max_jobs']:
+            job = claim_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f'Running job {job.pk} of {job.project.name}...')
+            job = run_job(job)
+            count += 1
+            if job.status == 'success':
+                if job.kind == 'dose_map':
+                    outcome = 'its dose map'
+                elif job.kind == 'time_series':
+                    outcome = f'{len(job.output["times"])} times'
+                else:
+                    outcome = f'{job.results.count()} results'
+                self.stdout.write(self.style.SUCCESS(f'Job {job.pk} finished with {outcome}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job {job.pk} failed: {job.error}'))
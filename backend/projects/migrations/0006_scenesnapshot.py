@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_project_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SceneSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('scene', 'Complete scene (load-complete-scene)'), ('project', 'Complete project (complete/<id>)')], max_length=20)),
+                ('etag', models.CharField(max_length=64)),
+                ('encoding', models.CharField(default='gzip', max_length=10)),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scene_snapshots', to='projects.project')),
+            ],
+            options={
+                'unique_together': {('project', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:54
+
+from django.db import migrations, models
+
+
+def number_existing_history(apps, schema_editor):
+    """Existing rows are full snapshots: keyframes numbered by timestamp"""
+    SceneHistory = apps.get_model('projects', 'SceneHistory')
+    sequences = {}
+    entries = list(SceneHistory.objects.order_by('project_id', 'timestamp', 'id'))
+    for entry in entries:
+        entry.sequence = sequences.get(entry.project_id, 0)
+        sequences[entry.project_id] = entry.sequence + 1
+    SceneHistory.objects.bulk_update(entries, ['sequence'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_scenesnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='scenehistory',
+            options={'ordering': ['-sequence'], 'verbose_name_plural': 'Scene histories'},
+        ),
+        migrations.AddField(
+            model_name='scenehistory',
+            name='delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scenehistory',
+            name='is_keyframe',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='scenehistory',
+            name='sequence',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='scenehistory',
+            name='scene_state',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='scenehistory',
+            index=models.Index(fields=['project', 'sequence'], name='projects_sc_project_986452_idx'),
+        ),
+        migrations.RunPython(number_existing_history, migrations.RunPython.noop),
+    ]
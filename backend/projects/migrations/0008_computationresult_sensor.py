@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_scenehistory_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computationresult',
+            name='sensor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='computation_results', to='projects.sensor'),
+        ),
+        migrations.AddField(
+            model_name='computationresult',
+            name='unit',
+            field=models.CharField(default='μSv/h', help_text='Unit of the sensor response', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='computationresult',
+            name='dose_rate',
+            field=models.FloatField(help_text='Sensor response, in μSv/h for dose rates'),
+        ),
+        migrations.AlterField(
+            model_name='computationresult',
+            name='uncertainty',
+            field=models.FloatField(help_text='Relative uncertainty (1σ) of the response'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_computationresult_sensor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computationconfiguration',
+            name='method',
+            field=models.CharField(choices=[('point_kernel', 'Point kernel'), ('monte_carlo', 'Monte Carlo')], default='point_kernel', max_length=20),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_computationconfiguration_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoseMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('plane', models.CharField(choices=[('xy', 'XY plane'), ('xz', 'XZ plane'), ('yz', 'YZ plane'), ('xyz', 'Volume')], default='xy', max_length=3)),
+                ('extents', models.JSONField(default=dict, help_text='[min, max] in cm for each axis of the plane')),
+                ('offset', models.FloatField(default=0.0, help_text='Coordinate of the plane along its normal, in cm')),
+                ('resolution', models.JSONField(default=list, help_text='Number of points along each axis of the plane')),
+                ('response_function', models.CharField(choices=[('ambient_dose', 'Ambient dose equivalent rate'), ('effective_dose', 'Effective (anterior posterior) dose rate'), ('kerma_air', 'KERMA rate in Air (μGy/h)'), ('kerma_rad', 'KERMA rate in Air (mrad/h)'), ('exposure', 'Exposure (mR/h)'), ('energy_flux', 'Energy flux rate (MeV/s)'), ('uncollided_flux', 'Uncollided flux (gammas/cm²/s)')], default='ambient_dose', max_length=20)),
+                ('points_per_source', models.IntegerField(default=1000, help_text='Source points sampled per source volume')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('error', 'Error')], default='pending', max_length=20)),
+                ('data', models.BinaryField(blank=True, help_text='Little-endian float32 responses, shape resolution, C order', null=True)),
+                ('unit', models.CharField(default='μSv/h', max_length=20)),
+                ('maximum', models.FloatField(default=0.0)),
+                ('computation_time', models.FloatField(default=0.0, help_text='Computation time in seconds')),
+                ('log_data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dose_maps', to='projects.project')),
+            ],
+            options={
+                'db_table': 'dose_maps',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_dosemap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computationresult',
+            name='sensor_hash',
+            field=models.CharField(blank=True, default='', help_text="Hash of the sensor's position and response", max_length=64),
+        ),
+        migrations.CreateModel(
+            name='ComputationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scene_hash', models.CharField(db_index=True, help_text='Hash of the run settings, volumes and sensors', max_length=64)),
+                ('run_hash', models.CharField(db_index=True, help_text='Hash of the run settings and tolerance shifts', max_length=64)),
+                ('volumes', models.JSONField(default=list, help_text='[volume hash, [lower, upper], is source] per volume')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('configuration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='projects.computationconfiguration')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='computation_runs', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Computation Run',
+                'verbose_name_plural': 'Computation Runs',
+                'db_table': 'computation_runs',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='computationresult',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='results', to='projects.computationrun'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_computationrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComputationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('force', models.BooleanField(default=False, help_text='Recompute instead of reusing stored results')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('success', 'Success'), ('error', 'Error')], db_index=True, default='queued', max_length=20)),
+                ('progress', models.FloatField(default=0.0, help_text='Completed fraction of the run (0-1)')),
+                ('samples', models.IntegerField(default=0, help_text='Samples or batches completed in the current engine run')),
+                ('uncertainty', models.FloatField(blank=True, help_text='Largest running relative uncertainty over sensors', null=True)),
+                ('eta', models.FloatField(blank=True, help_text='Estimated seconds remaining', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('configurations', models.ManyToManyField(related_name='jobs', to='projects.computationconfiguration')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='computation_jobs', to='projects.project')),
+                ('results', models.ManyToManyField(blank=True, related_name='jobs', to='projects.computationresult')),
+            ],
+            options={
+                'verbose_name': 'Computation Job',
+                'verbose_name_plural': 'Computation Jobs',
+                'db_table': 'computation_jobs',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+    ]
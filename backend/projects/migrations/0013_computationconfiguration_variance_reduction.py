@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_computationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computationconfiguration',
+            name='variance_reduction',
+            field=models.BooleanField(default=True, help_text='Monte-Carlo weight windows from an importance map'),
+        ),
+    ]
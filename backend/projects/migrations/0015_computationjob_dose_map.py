@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_streamticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computationjob',
+            name='dose_map',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='projects.dosemap'),
+        ),
+        migrations.AddField(
+            model_name='computationjob',
+            name='kind',
+            field=models.CharField(choices=[('computation', 'Computation'), ('dose_map', 'Dose map')], default='computation', max_length=20),
+        ),
+    ]
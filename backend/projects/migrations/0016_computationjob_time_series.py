@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_computationjob_dose_map'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computationjob',
+            name='output',
+            field=models.JSONField(blank=True, help_text='Response of a finished dose time series', null=True),
+        ),
+        migrations.AddField(
+            model_name='computationjob',
+            name='parameters',
+            field=models.JSONField(blank=True, default=dict, help_text='Arguments of a dose time series'),
+        ),
+        migrations.AlterField(
+            model_name='computationjob',
+            name='kind',
+            field=models.CharField(choices=[('computation', 'Computation'), ('dose_map', 'Dose map'), ('time_series', 'Dose time series')], default='computation', max_length=20),
+        ),
+    ]
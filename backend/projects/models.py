@@ -1,12 +1,47 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import json
+import secrets
 import uuid
 
 User = get_user_model()
 
 
+class ProjectQuerySet(models.QuerySet):
+    """Query helpers for loading projects together with their scene graph"""
+
+    def with_scene_graph(self):
+        """Fetch every nested scene relation in a fixed number of queries"""
+        return self.select_related('user', 'scene_config').prefetch_related(
+            'geometries',
+            'compositions',
+            'spectra',
+            models.Prefetch('sensors', queryset=Sensor.objects.select_related('selected_composition')),
+            models.Prefetch('volumes', queryset=Volume.objects.select_related('geometry', 'composition', 'spectrum')),
+        )
+
+    def with_counts(self):
+        """Annotate object counts for list views instead of counting per row.
+
+        Each count is its own subquery: counting both relations over one join
+        would multiply the rows of a project by its geometries times its volumes.
+        """
+        return self.select_related('user', 'scene_config').annotate(
+            geometries_count=_count_subquery(Geometry),
+            volumes_count=_count_subquery(Volume),
+        )
+
+
+def _count_subquery(model):
+    """Number of ``model`` rows of the outer project"""
+    counts = model.objects.filter(project=models.OuterRef('pk')).order_by().values('project').annotate(
+        n=models.Count('pk')
+    ).values('n')
+    return Coalesce(models.Subquery(counts), 0)
+
+
 class Project(models.Model):
     """Project model to store scene configurations"""
     name = models.CharField(max_length=255)
@@ -17,6 +52,8 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProjectQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} - {self.user.email}"
     
@@ -24,6 +61,31 @@ class Project(models.Model):
         ordering = ['-updated_at']
 
 
+class SceneSnapshot(models.Model):
+    """Pre-rendered, compressed JSON payload of a project's scene graph"""
+    KIND_CHOICES = [
+        ('scene', 'Complete scene (load-complete-scene)'),
+        ('project', 'Complete project (complete/<id>)'),
+    ]
+    
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='scene_snapshots')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    
+    # Payload
+    etag = models.CharField(max_length=64)  # sha256 of the uncompressed JSON
+    encoding = models.CharField(max_length=10, default='gzip')
+    data = models.BinaryField()  # Compressed JSON bytes
+    raw_size = models.PositiveIntegerField(default=0)  # Uncompressed size in bytes
+    
+    created_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.kind} snapshot - {self.project.name}"
+    
+    class Meta:
+        unique_together = ['project', 'kind']
+
+
 class SceneConfiguration(models.Model):
     """Scene configuration model"""
     project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='scene_config')
@@ -161,8 +223,14 @@ class SceneHistory(models.Model):
     """Scene history for undo/redo functionality"""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='history')
     
-    # Scene state snapshot
-    scene_state = models.JSONField()  # Complete scene state at this point
+    # Position in the project's history (0 = oldest retained step)
+    sequence = models.PositiveIntegerField(default=0)
+    
+    # Scene state: keyframes store the complete state, other steps a JSON patch
+    # against the previous step (see projects.history)
+    is_keyframe = models.BooleanField(default=True)
+    scene_state = models.JSONField(null=True, blank=True)  # Complete scene state (keyframes only)
+    delta = models.JSONField(null=True, blank=True)  # [{op, path, value}] RFC 6902 operations
     
     # Metadata
     action_name = models.CharField(max_length=100)  # "Add Cube", "Move Object", etc.
@@ -172,8 +240,11 @@ class SceneHistory(models.Model):
         return f"{self.action_name} - {self.project.name} ({self.timestamp})"
     
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-sequence']
         verbose_name_plural = 'Scene histories'
+        indexes = [
+            models.Index(fields=['project', 'sequence']),
+        ]
 
 
 class Sensor(models.Model):
@@ -525,6 +596,11 @@ class ComputationConfiguration(models.Model):
     convergence_criterion = models.FloatField(default=0.01, help_text="Convergence criterion (0.001-0.1)")
     particles_per_sample = models.IntegerField(default=10000, help_text="Number of particles per sample")
     number_of_samples = models.IntegerField(default=100, help_text="Maximum number of samples")
+    method = models.CharField(max_length=20, choices=[
+        ('point_kernel', 'Point kernel'),
+        ('monte_carlo', 'Monte Carlo')
+    ], default='point_kernel')
+    variance_reduction = models.BooleanField(default=True, help_text="Monte-Carlo weight windows from an importance map")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -538,12 +614,35 @@ class ComputationConfiguration(models.Model):
         return f"{self.name} - {self.config_type}"
 
 
+class ComputationRun(models.Model):
+    """Content hashes of the scene a configuration was computed on"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='computation_runs')
+    configuration = models.ForeignKey(ComputationConfiguration, on_delete=models.CASCADE, related_name='runs')
+    scene_hash = models.CharField(max_length=64, db_index=True, help_text="Hash of the run settings, volumes and sensors")
+    run_hash = models.CharField(max_length=64, db_index=True, help_text="Hash of the run settings and tolerance shifts")
+    volumes = models.JSONField(default=list, help_text="[volume hash, [lower, upper], is source] per volume")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'computation_runs'
+        ordering = ['-created_at', '-id']
+        verbose_name = 'Computation Run'
+        verbose_name_plural = 'Computation Runs'
+
+    def __str__(self):
+        return f"{self.configuration.name} - {self.scene_hash[:12]}"
+
+
 class ComputationResult(models.Model):
     """Results from Monte-Carlo calculations"""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='computation_results')
     configuration = models.ForeignKey(ComputationConfiguration, on_delete=models.CASCADE, related_name='results')
-    dose_rate = models.FloatField(help_text="Dose rate in μSv/h")
-    uncertainty = models.FloatField(help_text="Uncertainty in dose rate")
+    sensor = models.ForeignKey(Sensor, on_delete=models.SET_NULL, null=True, blank=True, related_name='computation_results')
+    run = models.ForeignKey(ComputationRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='results')
+    sensor_hash = models.CharField(max_length=64, blank=True, default='', help_text="Hash of the sensor's position and response")
+    dose_rate = models.FloatField(help_text="Sensor response, in μSv/h for dose rates")
+    unit = models.CharField(max_length=20, default='μSv/h', help_text="Unit of the sensor response")
+    uncertainty = models.FloatField(help_text="Relative uncertainty (1σ) of the response")
     computation_time = models.IntegerField(help_text="Computation time in seconds")
     converged = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=[
@@ -560,7 +659,61 @@ class ComputationResult(models.Model):
         verbose_name_plural = 'Computation Results'
 
     def __str__(self):
-        return f"{self.configuration.name} - {self.dose_rate:.2e} μSv/h"
+        return f"{self.configuration.name} - {self.dose_rate:.2e} {self.unit}"
+
+
+class ComputationJob(models.Model):
+    """Queued run of computation configurations, a dose map or a dose time series, executed by the ``runcomputations`` worker"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='computation_jobs')
+    kind = models.CharField(max_length=20, choices=[
+        ('computation', 'Computation'),
+        ('dose_map', 'Dose map'),
+        ('time_series', 'Dose time series'),
+    ], default='computation')
+    dose_map = models.ForeignKey('DoseMap', on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    parameters = models.JSONField(default=dict, blank=True, help_text="Arguments of a dose time series")
+    output = models.JSONField(null=True, blank=True, help_text="Response of a finished dose time series")
+    configurations = models.ManyToManyField(ComputationConfiguration, related_name='jobs')
+    results = models.ManyToManyField(ComputationResult, blank=True, related_name='jobs')
+    force = models.BooleanField(default=False, help_text="Recompute instead of reusing stored results")
+    status = models.CharField(max_length=20, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('error', 'Error')
+    ], default='queued', db_index=True)
+    progress = models.FloatField(default=0.0, help_text="Completed fraction of the run (0-1)")
+    samples = models.IntegerField(default=0, help_text="Samples or batches completed in the current engine run")
+    uncertainty = models.FloatField(null=True, blank=True, help_text="Largest running relative uncertainty over sensors")
+    eta = models.FloatField(null=True, blank=True, help_text="Estimated seconds remaining")
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'computation_jobs'
+        ordering = ['created_at', 'id']
+        verbose_name = 'Computation Job'
+        verbose_name_plural = 'Computation Jobs'
+
+    def __str__(self):
+        return f"{self.project.name} - {self.status} ({self.progress:.0%})"
+
+
+class StreamTicket(models.Model):
+    """Single-use, short-lived credential for the event stream of one job (EventSource sends no headers)"""
+    key = models.CharField(max_length=64, unique=True, default=secrets.token_urlsafe)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stream_tickets')
+    job = models.ForeignKey(ComputationJob, on_delete=models.CASCADE, related_name='stream_tickets')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'stream_tickets'
+
+    def __str__(self):
+        return f"Ticket for job {self.job_id}"
 
 
 class ToleranceConfiguration(models.Model):
@@ -582,3 +735,39 @@ class ToleranceConfiguration(models.Model):
 
     def __str__(self):
         return f"Tolerance for {self.volume.name} - {self.coordinate}"
+
+
+class DoseMap(models.Model):
+    """Sensor responses on a regular grid of points, computed in one pass"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='dose_maps')
+    name = models.CharField(max_length=100)
+    plane = models.CharField(max_length=3, choices=[
+        ('xy', 'XY plane'),
+        ('xz', 'XZ plane'),
+        ('yz', 'YZ plane'),
+        ('xyz', 'Volume')
+    ], default='xy')
+    extents = models.JSONField(default=dict, help_text="[min, max] in cm for each axis of the plane")
+    offset = models.FloatField(default=0.0, help_text="Coordinate of the plane along its normal, in cm")
+    resolution = models.JSONField(default=list, help_text="Number of points along each axis of the plane")
+    response_function = models.CharField(max_length=20, choices=Sensor.RESPONSE_CHOICES, default='ambient_dose')
+    points_per_source = models.IntegerField(default=1000, help_text="Source points sampled per source volume")
+    status = models.CharField(max_length=20, choices=[
+        ('pending', 'Pending'),
+        ('success', 'Success'),
+        ('error', 'Error')
+    ], default='pending')
+    data = models.BinaryField(null=True, blank=True, help_text="Little-endian float32 responses, shape resolution, C order")
+    unit = models.CharField(max_length=20, default='μSv/h')
+    maximum = models.FloatField(default=0.0)
+    computation_time = models.FloatField(default=0.0, help_text="Computation time in seconds")
+    log_data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dose_maps'
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.name} - {self.project.name}"
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProjectCursorPagination(CursorPagination):
+    """Keyset pagination for project lists.
+
+    Deep pages seek on the ordering columns instead of scanning past an
+    OFFSET, so users with thousands of projects page in constant time.
+    The ``-id`` tiebreaker keeps the ordering unique.
+    """
+    ordering = ('-updated_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
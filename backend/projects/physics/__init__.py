@@ -0,0 +1,6 @@
+"""
+Shielding physics for the dose computations.
+
+The modules in this package work on plain NumPy arrays; ``scene`` is the
+only one that reads the project models.
+"""
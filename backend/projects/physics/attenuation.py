@@ -0,0 +1,60 @@
+"""
+Photon attenuation of materials.
+
+Turns the ``{element, percentage}`` lists of compositions into element mass
+fractions and combines the per-element coefficients of a
+``elements.photon.PhotonTable`` into linear attenuation coefficients.
+"""
+import re
+
+import numpy as np
+
+from elements.photon import ELEMENTS, bundled_table
+
+_FORMULA_TOKEN = re.compile(r'([A-Z][a-z]?)(\d*\.?\d*)')
+
+
+def parse_formula(formula):
+    """Mass fractions of the elements in a symbol or chemical formula, e.g. 'CO2'"""
+    formula = str(formula).strip()
+    tokens = _FORMULA_TOKEN.findall(formula)
+    if not tokens or ''.join(s + n for s, n in tokens) != formula:
+        raise ValueError(f'Unknown element or formula: {formula!r}')
+
+    masses = {}
+    for symbol, count in tokens:
+        if symbol not in ELEMENTS:
+            raise ValueError(f'Unknown element: {symbol!r}')
+        masses[symbol] = masses.get(symbol, 0.0) + ELEMENTS[symbol][1] * float(count or 1)
+    total = sum(masses.values())
+    return {symbol: mass / total for symbol, mass in masses.items()}
+
+
+def mass_fractions(elements):
+    """Normalized element mass fractions of a composition's ``elements`` list.
+
+    Each entry is ``{element, percentage}`` where ``element`` is a symbol or
+    a formula (its share is split by weight between its elements).
+    """
+    fractions = {}
+    for entry in elements or []:
+        share = float(entry.get('percentage', 0.0))
+        for symbol, fraction in parse_formula(entry.get('element', '')).items():
+            fractions[symbol] = fractions.get(symbol, 0.0) + share * fraction
+    total = sum(fractions.values())
+    if total <= 0:
+        raise ValueError('Composition has no elements')
+    return {symbol: value / total for symbol, value in fractions.items()}
+
+
+def mass_attenuation(z, energies, table=None):
+    """μ/ρ (cm²/g) of atomic number ``z`` at ``energies`` (MeV)"""
+    return (table or bundled_table()).mass_attenuation([z], energies)[0]
+
+
+def mixture_attenuation(elements, density, energies, table=None):
+    """Linear attenuation coefficient μ (1/cm) of a mixture at ``energies`` (MeV)"""
+    fractions = mass_fractions(elements)
+    numbers = [ELEMENTS[symbol][0] for symbol in fractions]
+    weights = np.array(list(fractions.values()))
+    return weights @ (table or bundled_table()).mass_attenuation(numbers, energies) * density
@@ -0,0 +1,105 @@
+"""
+Bounding volume hierarchy over the primitives of a compiled geometry.
+
+The tree is built top-down over world-space AABBs, splitting at the median
+centroid along the longest axis, and stored as flat node arrays. Segments
+are traversed in batches: every step tests all live (segment, node) pairs
+against the node boxes at once, emits the primitives of the leaves that
+are hit and replaces internal nodes by their two children. The candidate
+(segment, primitive) pairs are then intersected exactly.
+"""
+import numpy as np
+
+LEAF_SIZE = 4
+
+
+def segment_box_overlap(origins, directions, lower, upper):
+    """Whether segments ``origins + t directions``, t in [0, 1], cross the boxes"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (lower - origins) / directions
+        t2 = (upper - origins) / directions
+    parallel = directions == 0
+    inside = (lower <= origins) & (origins <= upper)
+    near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    return np.maximum(near.max(axis=-1), 0.0) <= np.minimum(far.min(axis=-1), 1.0)
+
+
+class BoundingVolumeHierarchy:
+    """Binary AABB tree stored as arrays indexed by node"""
+
+    def __init__(self, lower, upper, leaf_size=LEAF_SIZE):
+        count = len(lower)
+        centroids = (lower + upper) / 2
+        self.order = np.arange(count)
+
+        node_lower, node_upper, left, right, starts, counts = [], [], [], [], [], []
+
+        def add_node(start, stop):
+            items = self.order[start:stop]
+            node_lower.append(lower[items].min(axis=0))
+            node_upper.append(upper[items].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            starts.append(start)
+            counts.append(stop - start)
+            return len(counts) - 1
+
+        stack = [add_node(0, count)] if count else []
+        while stack:
+            node = stack.pop()
+            start, size = starts[node], counts[node]
+            if size <= leaf_size:
+                continue
+            items = self.order[start:start + size]
+            axis = np.argmax(node_upper[node] - node_lower[node])
+            half = size // 2
+            split = np.argpartition(centroids[items, axis], half)
+            self.order[start:start + size] = items[split]
+
+            left[node] = add_node(start, start + half)
+            right[node] = add_node(start + half, start + size)
+            counts[node] = 0  # internal node
+            stack.extend([left[node], right[node]])
+
+        self.lower = np.array(node_lower).reshape(-1, 3)
+        self.upper = np.array(node_upper).reshape(-1, 3)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+
+    @property
+    def depth(self):
+        """Number of levels of the tree"""
+        depth, level = 0, np.array([0]) if len(self.counts) else np.array([], dtype=np.int64)
+        while len(level):
+            depth += 1
+            level = level[self.counts[level] == 0]
+            level = np.concatenate([self.left[level], self.right[level]])
+        return depth
+
+    def candidate_pairs(self, origins, ends):
+        """(segment, primitive) index pairs whose boxes the segments cross"""
+        directions = ends - origins
+        segments = np.arange(len(origins)) if len(self.counts) else np.array([], dtype=np.int64)
+        nodes = np.zeros(len(segments), dtype=np.int64)
+        found_segments, found_primitives = [], []
+
+        while len(segments):
+            hit = segment_box_overlap(origins[segments], directions[segments], self.lower[nodes], self.upper[nodes])
+            segments, nodes = segments[hit], nodes[hit]
+
+            leaf = self.counts[nodes] > 0
+            leaf_counts = self.counts[nodes[leaf]]
+            offsets = np.arange(leaf_counts.sum()) - np.repeat(np.cumsum(leaf_counts) - leaf_counts, leaf_counts)
+            found_segments.append(np.repeat(segments[leaf], leaf_counts))
+            found_primitives.append(self.order[np.repeat(self.starts[nodes[leaf]], leaf_counts) + offsets])
+
+            internal = nodes[~leaf]
+            segments = np.concatenate([segments[~leaf], segments[~leaf]])
+            nodes = np.concatenate([self.left[internal], self.right[internal]])
+
+        if not found_segments:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.concatenate(found_segments), np.concatenate(found_primitives)
@@ -0,0 +1,181 @@
+"""
+Constructive solid geometry.
+
+A ``CSGOperation`` builds its ``result_object`` from the geometries listed
+in ``source_objects`` by union, intersection or subtraction (the first
+operand minus all the others). Operands may be results of other
+operations, so the shape of a volume whose geometry is a result is a
+boolean tree over primitives, a ``Solid``.
+
+Primitives are convex, so a segment crosses each one over a single
+interval [t_in, t_out]. A tree is traced on many segments at once by
+interval arithmetic: the sorted entry and exit parameters of its leaves
+cut every segment into pieces, the boolean expression of the tree is
+evaluated on the leaf memberships of every piece's midpoint, and the
+pieces inside are the intervals of the solid. Subtracted shells
+(container walls, pipes) are thus traced exactly, without meshing.
+
+For tracing, a tree is compiled into a register program: registers
+0..L-1 hold the memberships of its L leaves and instruction k, an
+(operation, register a, register b) triple, writes register L + k. The
+last register is the solid. Evaluation is one array operation per node.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+OPERATIONS = {'union': 0, 'intersect': 1, 'subtract': 2}
+OPERATION_NAMES = {code: name for name, code in OPERATIONS.items()}
+# Points of the fixed-seed estimate of a solid's volume
+VOLUME_SAMPLES = 4096
+# Rejection rounds without an accepted point before a solid is deemed empty
+MAX_EMPTY_ROUNDS = 64
+
+
+@dataclass
+class Solid:
+    """A boolean combination of primitives and solids"""
+    operation: str  # union, intersect, subtract
+    children: list  # geometry.Primitive or Solid operands, in order
+
+    def __post_init__(self):
+        if self.operation not in OPERATIONS:
+            raise ValueError(f'Unsupported CSG operation: {self.operation}')
+        if len(self.children) < 2:
+            raise ValueError(f'A CSG {self.operation} needs at least two operands')
+
+    def leaves(self):
+        """The primitives of the tree, depth first"""
+        return [leaf for child in self.children for leaf in (child.leaves() if isinstance(child, Solid) else [child])]
+
+    @property
+    def center(self):
+        """Center of the first operand, the reference of tolerance shifts"""
+        return self.children[0].center
+
+    def translated(self, shift):
+        """The solid moved by ``shift`` (3,)"""
+        return Solid(self.operation, [child.translated(shift) for child in self.children])
+
+    def bounds(self):
+        """World-space axis-aligned bounding box, two (3,) arrays"""
+        boxes = [child.bounds() for child in self.children]
+        if self.operation == 'union':
+            return np.min([b[0] for b in boxes], axis=0), np.max([b[1] for b in boxes], axis=0)
+        if self.operation == 'intersect':
+            return np.max([b[0] for b in boxes], axis=0), np.min([b[1] for b in boxes], axis=0)
+        return boxes[0]
+
+    def contains(self, points):
+        """Whether world points (N, 3) lie inside the solid"""
+        inside = [child.contains(points) for child in self.children]
+        if self.operation == 'union':
+            return np.logical_or.reduce(inside)
+        if self.operation == 'intersect':
+            return np.logical_and.reduce(inside)
+        return inside[0] & ~np.logical_or.reduce(inside[1:])
+
+    @property
+    def volume(self):
+        """World volume in cm³, estimated from a fixed set of points of the bounding box"""
+        lower, upper = self.bounds()
+        if np.any(upper <= lower):
+            return 0.0
+        points = np.random.default_rng(0).uniform(lower, upper, size=(VOLUME_SAMPLES, 3))
+        return float(np.prod(upper - lower) * self.contains(points).mean())
+
+    def sample(self, rng, count):
+        """Uniformly distributed world points (count, 3) inside the solid"""
+        lower, upper = self.bounds()
+        accepted, total, empty = [], 0, 0
+        while total < count:
+            candidates = rng.uniform(lower, upper, size=(max(2 * (count - total), 64), 3))
+            candidates = candidates[self.contains(candidates)]
+            empty = 0 if len(candidates) else empty + 1
+            if empty >= MAX_EMPTY_ROUNDS:
+                raise ValueError('A CSG source solid is empty')
+            accepted.append(candidates)
+            total += len(candidates)
+        return np.concatenate(accepted)[:count]
+
+
+def compile_solid(shape):
+    """Leaves and register program (K, 3) of a primitive or solid"""
+    if not isinstance(shape, Solid):
+        return [shape], np.zeros((0, 3), dtype=np.int64)
+    leaves = shape.leaves()
+    instructions = []
+    leaf_index = iter(range(len(leaves)))
+
+    def emit(node):
+        # Registers are ('leaf', i) or ('op', k) until the leaf count is known
+        if not isinstance(node, Solid):
+            return ('leaf', next(leaf_index))
+        registers = [emit(child) for child in node.children]
+        result = registers[0]
+        for register in registers[1:]:
+            instructions.append((OPERATIONS[node.operation], result, register))
+            result = ('op', len(instructions) - 1)
+        return result
+
+    emit(shape)
+
+    def number(register):
+        return register[1] if register[0] == 'leaf' else len(leaves) + register[1]
+
+    program = np.array([(op, number(a), number(b)) for op, a, b in instructions], dtype=np.int64).reshape(-1, 3)
+    return leaves, program
+
+
+def decompile(leaves, program):
+    """The primitive or solid of compiled ``leaves`` and ``program``"""
+    registers = list(leaves)
+    for op, a, b in program:
+        registers.append(Solid(OPERATION_NAMES[int(op)], [registers[a], registers[b]]))
+    return registers[-1]
+
+
+def evaluate(program, inside):
+    """Membership (...) in a solid from the memberships (..., L) of its leaves"""
+    if not len(program):
+        return inside[..., 0]
+    leaf_count = inside.shape[-1]
+    values = np.concatenate([inside, np.empty(inside.shape[:-1] + (len(program),), dtype=bool)], axis=-1)
+    for k, (op, a, b) in enumerate(program):
+        if op == OPERATIONS['union']:
+            values[..., leaf_count + k] = values[..., a] | values[..., b]
+        elif op == OPERATIONS['intersect']:
+            values[..., leaf_count + k] = values[..., a] & values[..., b]
+        else:
+            values[..., leaf_count + k] = values[..., a] & ~values[..., b]
+    return values[..., -1]
+
+
+def evaluate_bounds(program, lower, upper):
+    """Bounding box of a solid from the boxes (L, 3) of its leaves"""
+    lower, upper = list(lower), list(upper)
+    for op, a, b in program:
+        if op == OPERATIONS['union']:
+            lower.append(np.minimum(lower[a], lower[b]))
+            upper.append(np.maximum(upper[a], upper[b]))
+        elif op == OPERATIONS['intersect']:
+            lower.append(np.maximum(lower[a], lower[b]))
+            upper.append(np.minimum(upper[a], upper[b]))
+        else:
+            lower.append(lower[a])
+            upper.append(upper[a])
+    return lower[-1], upper[-1]
+
+
+def intervals(t_in, t_out, program):
+    """Intervals of a solid along segments from the intervals (N, L) of its leaves.
+
+    Returns ``lower, upper`` of shape (N, 2L - 1), one per piece between
+    consecutive leaf entry/exit parameters; pieces outside the solid are
+    empty (``lower == upper``).
+    """
+    breaks = np.sort(np.concatenate([t_in, t_out], axis=1), axis=1)
+    mids = (breaks[:, :-1] + breaks[:, 1:]) / 2
+    inside = (t_in[:, None, :] <= mids[:, :, None]) & (mids[:, :, None] < t_out[:, None, :])
+    solid = evaluate(program, inside)
+    return np.where(solid, breaks[:, :-1], 0.0), np.where(solid, breaks[:, 1:], 0.0)
@@ -0,0 +1,135 @@
+"""
+Dose-rate maps over regular grids of points.
+
+A map is a plane (xy, xz or yz at a fixed offset along its normal) or a
+box (xyz) sampled on a regular grid. Responses are evaluated exactly
+(point kernel with buildup, every source point to every node) only on a
+coarse subgrid, every ``COARSE_STEP``-th point per axis, and interpolated
+in log space in between. A coarse cell is evaluated point by point
+instead when the log response bends at one of its corners (second
+differences above ``REFINE_LOG``) or vanishes there: shadow edges, the
+vicinity of sources and material boundaries stay exact, while the smooth
+regions that make up most of a map share the rays of their coarse nodes.
+Features narrower than a coarse cell that leave no trace on its nodes
+are not resolved.
+
+Exact evaluations are processed in chunks of grid points that bound the
+memory of the (source point, grid point, material, line) arrays.
+"""
+import numpy as np
+
+from .buildup import multilayer_buildup
+from .point_kernel import MIN_DISTANCE_SQUARED
+from .response import UNCOLLIDED_RESPONSES, response_coefficients
+
+PLANES = {'xy': (0, 1), 'xz': (0, 2), 'yz': (1, 2), 'xyz': (0, 1, 2)}
+COARSE_STEP = 4
+# Second difference of the coarse log responses above which a cell is evaluated point by point
+REFINE_LOG = 0.05
+# (source point, grid point, material, line) elements per chunk
+CHUNK_ELEMENTS = 4_000_000
+
+
+def grid_points(plane, extents, offset, resolution):
+    """World points of a map, shape ``resolution + (3,)``, axes in plane order"""
+    if plane not in PLANES:
+        raise ValueError(f'Unknown dose map plane {plane!r}')
+    axes = PLANES[plane]
+    resolution = [int(n) for n in resolution or []]
+    if len(resolution) != len(axes) or min(resolution) < 2:
+        raise ValueError(f'A {plane} dose map needs at least 2 points on each of its {len(axes)} axes')
+    coordinates = []
+    for axis, count in zip(axes, resolution):
+        bounds = (extents or {}).get('xyz'[axis])
+        if not bounds or len(bounds) != 2 or float(bounds[0]) >= float(bounds[1]):
+            raise ValueError(f'Dose map extent along {"xyz"[axis]} must be [min, max]')
+        coordinates.append(np.linspace(float(bounds[0]), float(bounds[1]), count))
+
+    points = np.full(tuple(resolution) + (3,), float(offset))
+    for axis, values in zip(axes, np.meshgrid(*coordinates, indexing='ij')):
+        points[..., axis] = values
+    return points
+
+
+def _coarse_axis(count):
+    """Coarse node indices of an axis, and each point's cell and share of its upper node"""
+    nodes = np.unique(np.append(np.arange(0, count, COARSE_STEP), count - 1))
+    cells = np.clip(np.searchsorted(nodes, np.arange(count), side='right') - 1, 0, len(nodes) - 2)
+    shares = (np.arange(count) - nodes[cells]) / (nodes[cells + 1] - nodes[cells])
+    return nodes, cells, shares
+
+
+def _corners(dimensions):
+    """Offsets (2^d, d) of the corners of a d-dimensional cell"""
+    return np.stack(np.meshgrid(*[[0, 1]] * dimensions, indexing='ij'), axis=-1).reshape(-1, dimensions)
+
+
+def point_responses(scene, points, weights, targets, response_function):
+    """Exact responses (T,) at ``targets`` (T, 3) of source points (P, 3) emitting ``weights`` (P, E)"""
+    energies = scene.energies
+    coefficients = response_coefficients(response_function, energies)
+    mu = scene.attenuation_table(energies)
+    parameters = scene.buildup_parameters(energies)
+    material_count = len(scene.materials)
+
+    responses = np.zeros(len(targets))
+    step = max(CHUNK_ELEMENTS // (len(points) * max(material_count, 1) * len(energies)), 1)
+    for start in range(0, len(targets), step):
+        chunk = targets[start:start + step]
+        lengths = scene.geometry.path_lengths(
+            np.repeat(points, len(chunk), axis=0), np.tile(chunk, (len(points), 1)),
+            scene.primitive_materials, material_count
+        ).reshape(len(points), len(chunk), material_count)
+        material_mfp = lengths[..., None] * mu[None, None]
+        if response_function in UNCOLLIDED_RESPONSES:
+            buildup = 1.0
+        else:
+            buildup = multilayer_buildup(material_mfp, parameters)
+        distance_squared = np.maximum(np.sum((chunk[None] - points[:, None]) ** 2, axis=2), MIN_DISTANCE_SQUARED)
+        flux = weights[:, None, :] * buildup * np.exp(-material_mfp.sum(axis=2)) / (4 * np.pi * distance_squared[..., None])
+        responses[start:start + step] = flux.sum(axis=0) @ coefficients
+    return responses
+
+
+def map_responses(scene, points, weights, grid, response_function):
+    """Responses (G,) of source points (P, 3) emitting ``weights`` (P, E) on ``grid`` (shape..., 3).
+
+    Also returns the fraction of grid points evaluated exactly besides the
+    coarse nodes.
+    """
+    shape = grid.shape[:-1]
+    targets = grid.reshape(-1, 3)
+    axes = [_coarse_axis(n) for n in shape]
+    coarse_shape = tuple(len(nodes) for nodes, _, _ in axes)
+    coarse = point_responses(
+        scene, points, weights, grid[np.ix_(*[nodes for nodes, _, _ in axes])].reshape(-1, 3), response_function
+    ).reshape(coarse_shape)
+
+    # Bending of the log response at each coarse node, the largest second difference over the axes
+    positive = coarse > 0
+    logs = np.log(np.where(positive, coarse, 1.0))
+    bending = np.zeros(coarse_shape)
+    for axis in range(len(shape)):
+        padded = np.concatenate([np.take(logs, [0], axis=axis), logs, np.take(logs, [-1], axis=axis)], axis=axis)
+        np.maximum(bending, np.abs(np.diff(padded, n=2, axis=axis)), out=bending)
+
+    # Interpolate every point from the corners of its coarse cell
+    cells = np.stack(np.meshgrid(*[c for _, c, _ in axes], indexing='ij'), axis=-1).reshape(-1, len(shape))
+    shares = np.stack(np.meshgrid(*[s for _, _, s in axes], indexing='ij'), axis=-1).reshape(-1, len(shape))
+    interpolated = np.zeros(len(targets))
+    refine = np.zeros(len(targets), dtype=bool)
+    for corner in _corners(len(shape)):
+        index = tuple((cells + corner).T)
+        interpolated += np.prod(np.where(corner, shares, 1 - shares), axis=1) * logs[index]
+        refine |= (bending[index] > REFINE_LOG) | ~positive[index]
+    responses = np.exp(interpolated)
+
+    # Coarse nodes are exact; points of bending cells are evaluated one by one
+    on_node = np.logical_and.reduce(
+        np.meshgrid(*[np.isin(np.arange(n), nodes) for n, (nodes, _, _) in zip(shape, axes)], indexing='ij')
+    ).ravel()
+    responses[on_node] = coarse.ravel()
+    refine &= ~on_node
+    if refine.any():
+        responses[refine] = point_responses(scene, points, weights, targets[refine], response_function)
+    return responses, float(refine.mean())
@@ -0,0 +1,81 @@
+"""
+Content hashes of shielding scenes.
+
+A computation depends on the primitives, materials and sources the
+engines see, not on names, colours or database ids. Every volume and
+every sensor of a ``Scene`` is hashed from its physics content (compiled
+material keys carry the photon table version), and the scene hash
+combines the sorted volume and sensor hashes with the run settings, so
+it does not depend on the order of the rows.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from .csg import Solid
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part, dtype=float).tobytes())
+        elif isinstance(part, bytes):
+            digest.update(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+def _shape_parts(shape):
+    """Hashed content of a primitive, or of a CSG solid and its operands"""
+    if isinstance(shape, Solid):
+        return ['csg', shape.operation, len(shape.children)] + [
+            part for child in shape.children for part in _shape_parts(child)
+        ]
+    return [shape.kind, shape.center, shape.rotation, shape.scale, shape.params]
+
+
+def volume_hashes(scene):
+    """Content hash of every primitive with its material and source, in primitive order"""
+    sources = {source.primitive: source for source in scene.sources}
+    hashes = []
+    for index, primitive in enumerate(scene.primitives):
+        material = scene.primitive_materials[index]
+        parts = _shape_parts(primitive)
+        if material >= 0:
+            compiled = scene.materials[material].compile(scene.photon_table)
+            parts += [compiled.key, scene.materials[material].density]
+        else:
+            parts.append('vacuum')
+        source = sources.get(index)
+        if source is not None:
+            parts += ['source', source.energies, source.emissions]
+            if source.mesh is not None:
+                parts += [source.mesh.system, *(getattr(source.mesh, name) for name in source.mesh.ARRAYS)]
+        hashes.append(_digest(*parts))
+    return hashes
+
+
+def sensor_hashes(scene):
+    """Content hash of every sensor, in sensor order"""
+    return [
+        _digest(
+            sensor.position, sensor.response_function, sensor.buildup_type,
+            sensor.buildup_material.key if sensor.buildup_material is not None else None,
+            sensor.equi_importance,
+        )
+        for sensor in scene.sensors
+    ]
+
+
+def run_hash(settings, shifts):
+    """Hash of the run settings and of the tolerance shifts by volume hash"""
+    return _digest(settings, sorted((volume, list(map(float, shift))) for volume, shift in shifts.items()))
+
+
+def scene_hash(run, volumes, sensors):
+    """Order-independent hash of a run over a scene's volume and sensor hashes"""
+    return _digest(run, sorted(volumes), sorted(sensors))
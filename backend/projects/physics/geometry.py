@@ -0,0 +1,605 @@
+"""
+Scene primitives and ray/segment intersection.
+
+Geometries follow the Three.js conventions of the editor: a primitive is
+centered at ``position``, rotated by the XYZ Euler angles of ``rotation``
+(radians) and scaled per axis by ``scale``. Cylinders and cones are
+frustums along the local Y axis. Scene units are centimetres.
+
+Segments run from ``origins`` to ``ends`` and are parametrized by
+``t`` in [0, 1]; intersections are computed in each primitive's local
+frame, where the affine transform keeps ``t`` unchanged. For tracing,
+the primitives of a scene are compiled into a ``CompiledGeometry``, with
+a bounding volume hierarchy for large scenes. A scene shape is a primitive
+or a CSG ``Solid`` over primitives (``csg``), traced by interval
+arithmetic on the intervals of its primitives.
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import cached_property
+
+import numpy as np
+
+from .bvh import BoundingVolumeHierarchy
+from .csg import compile_solid, decompile, evaluate, evaluate_bounds, intervals
+
+GEOMETRY_DEFAULTS = {
+    'cube': {'width': 1.0, 'height': 1.0, 'depth': 1.0},
+    'sphere': {'radius': 0.5},
+    'cylinder': {'radiusTop': 0.5, 'radiusBottom': 0.5, 'height': 1.0},
+    'cone': {'radius': 0.5, 'height': 1.0},
+}
+
+
+def euler_matrix(x, y, z):
+    """Rotation matrix of Three.js XYZ Euler angles"""
+    cx, sx = np.cos(x), np.sin(x)
+    cy, sy = np.cos(y), np.sin(y)
+    cz, sz = np.cos(z), np.sin(z)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rx @ ry @ rz
+
+
+def _vector(value, default):
+    value = value or {}
+    return np.array([float(value.get(axis, default)) for axis in 'xyz'])
+
+
+@dataclass
+class Primitive:
+    """A transformed cube, sphere or frustum (cylinder/cone)"""
+    kind: str  # box, sphere, frustum
+    center: np.ndarray
+    rotation: np.ndarray
+    scale: np.ndarray
+    # box: half extents; sphere: (radius,); frustum: (radius_bottom, radius_top, height)
+    params: np.ndarray
+
+    @classmethod
+    def from_geometry(cls, geometry_type, position, rotation, scale, parameters):
+        """Build a primitive from the fields of a ``Geometry`` row"""
+        if geometry_type not in GEOMETRY_DEFAULTS:
+            raise ValueError(f'Unsupported geometry type: {geometry_type}')
+        values = {**GEOMETRY_DEFAULTS[geometry_type], **(parameters or {})}
+
+        if geometry_type == 'cube':
+            kind = 'box'
+            params = np.array([values['width'], values['height'], values['depth']], dtype=float) / 2
+        elif geometry_type == 'sphere':
+            kind = 'sphere'
+            params = np.array([values['radius']], dtype=float)
+        elif geometry_type == 'cylinder':
+            kind = 'frustum'
+            params = np.array([values['radiusBottom'], values['radiusTop'], values['height']], dtype=float)
+        else:
+            kind = 'frustum'
+            params = np.array([values['radius'], 0.0, values['height']], dtype=float)
+
+        angles = _vector(rotation, 0.0)
+        return cls(
+            kind=kind,
+            center=_vector(position, 0.0),
+            rotation=euler_matrix(*angles),
+            scale=_vector(scale, 1.0),
+            params=params,
+        )
+
+    @property
+    def volume(self):
+        """World volume in cm³"""
+        factor = abs(np.prod(self.scale))
+        if self.kind == 'box':
+            return 8 * np.prod(self.params) * factor
+        if self.kind == 'sphere':
+            return 4 / 3 * np.pi * self.params[0] ** 3 * factor
+        bottom, top, height = self.params
+        return np.pi * height * (bottom ** 2 + bottom * top + top ** 2) / 3 * factor
+
+    def to_local(self, points):
+        """Transform world points (N, 3) into the unscaled local frame"""
+        return ((points - self.center) @ self.rotation) / self.scale
+
+    def to_world(self, points):
+        """Transform local points (N, 3) into world coordinates"""
+        return (points * self.scale) @ self.rotation.T + self.center
+
+    def contains_local(self, points):
+        """Whether local points (N, 3) lie inside the primitive"""
+        if self.kind == 'box':
+            return np.all(np.abs(points) <= self.params, axis=1)
+        if self.kind == 'sphere':
+            return np.einsum('ij,ij->i', points, points) <= self.params[0] ** 2
+        bottom, top, height = self.params
+        radius = (top + bottom) / 2 + (top - bottom) / height * points[:, 1]
+        return (np.abs(points[:, 1]) <= height / 2) & (points[:, 0] ** 2 + points[:, 2] ** 2 <= radius ** 2)
+
+    def contains(self, points):
+        """Whether world points (N, 3) lie inside the primitive"""
+        return self.contains_local(self.to_local(points))
+
+    def translated(self, shift):
+        """The primitive moved by ``shift`` (3,)"""
+        return replace(self, center=self.center + shift)
+
+    def bounds(self):
+        """World-space axis-aligned bounding box, two (3,) arrays"""
+        params = np.zeros(3)
+        params[:len(self.params)] = self.params
+        lower, upper = _world_bounds(
+            np.array([KIND_CODES[self.kind]]), self.center[None], self.rotation[None], self.scale[None], params[None]
+        )
+        return lower[0], upper[0]
+
+    def sample(self, rng, count):
+        """Uniformly distributed world points (count, 3) inside the primitive"""
+        if self.kind == 'box':
+            half = self.params
+        elif self.kind == 'sphere':
+            half = np.repeat(self.params[0], 3)
+        else:
+            radius = max(self.params[0], self.params[1])
+            half = np.array([radius, self.params[2] / 2, radius])
+
+        accepted, total = [], 0
+        while total < count:
+            candidates = rng.uniform(-half, half, size=(max(2 * (count - total), 64), 3))
+            candidates = candidates[self.contains_local(candidates)]
+            accepted.append(candidates)
+            total += len(candidates)
+        return self.to_world(np.concatenate(accepted)[:count])
+
+
+def _slab(o, d, half):
+    """Parameter interval where ``|o + t d| <= half``, per component"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (-half - o) / d
+        t2 = (half - o) / d
+    parallel = d == 0
+    inside = np.abs(o) <= half
+    lo = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    hi = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    return lo, hi
+
+
+def _box(o, d, half):
+    lo, hi = _slab(o, d, half)
+    return lo.max(axis=-1), hi.min(axis=-1)
+
+
+def _sphere(o, d, radius):
+    a = np.einsum('...j,...j->...', d, d)
+    b = 2 * np.einsum('...j,...j->...', o, d)
+    c = np.einsum('...j,...j->...', o, o) - radius ** 2
+    disc = b ** 2 - 4 * a * c
+    hit = (disc >= 0) & (a > 0)
+    root = np.sqrt(np.where(hit, disc, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_in = np.where(hit, (-b - root) / (2 * a), np.inf)
+        t_out = np.where(hit, (-b + root) / (2 * a), -np.inf)
+    return t_in, t_out
+
+
+def _frustum(o, d, bottom, top, height):
+    """Finite cone/cylinder along local Y with radius ``a + b y``"""
+    a = (top + bottom) / 2
+    b = (top - bottom) / height
+    ox, oy, oz = o[..., 0], o[..., 1], o[..., 2]
+    dx, dy, dz = d[..., 0], d[..., 1], d[..., 2]
+    y_in, y_out = _slab(oy, dy, height / 2)
+
+    k = a + b * oy
+    qa = dx ** 2 + dz ** 2 - (b * dy) ** 2
+    qb = 2 * (ox * dx + oz * dz - k * b * dy)
+    qc = ox ** 2 + oz ** 2 - k ** 2
+    disc = qb ** 2 - 4 * qa * qc
+    root = np.sqrt(np.maximum(disc, 0.0))
+    linear = np.abs(qa) <= 1e-12 * (dx ** 2 + dy ** 2 + dz ** 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r1 = (-qb - root) / (2 * qa)
+        r2 = (-qb + root) / (2 * qa)
+        crossing = -qc / qb
+    lo_root, hi_root = np.minimum(r1, r2), np.maximum(r1, r2)
+
+    # Opening upwards (qa > 0): inside between the roots
+    lo = np.where(disc >= 0, lo_root, np.inf)
+    hi = np.where(disc >= 0, hi_root, -np.inf)
+
+    # Opening downwards (qa < 0): inside outside the roots; the slab keeps a
+    # single piece, the one on the nappe where the radius is positive
+    first_hi = np.minimum(y_out, lo_root)
+    first_mid = (y_in + first_hi) / 2
+    first_valid = (first_hi > y_in) & (a + b * (oy + first_mid * dy) >= 0)
+    down_lo = np.where(disc < 0, -np.inf, np.where(first_valid, -np.inf, hi_root))
+    down_hi = np.where(disc < 0, np.inf, np.where(first_valid, lo_root, np.inf))
+    lo = np.where(qa < 0, down_lo, lo)
+    hi = np.where(qa < 0, down_hi, hi)
+
+    # Degenerate quadratic: the radial condition is linear in t
+    lin_lo = np.where(qb > 0, -np.inf, np.where(qb < 0, crossing, np.where(qc <= 0, -np.inf, np.inf)))
+    lin_hi = np.where(qb > 0, crossing, np.where(qb < 0, np.inf, np.where(qc <= 0, np.inf, -np.inf)))
+    lo = np.where(linear, lin_lo, lo)
+    hi = np.where(linear, lin_hi, hi)
+
+    return np.maximum(lo, y_in), np.minimum(hi, y_out)
+
+
+def _intersect_local(kinds, params, o, d):
+    """Entry/exit parameters of local segments ``o + t d`` (..., 3), one kernel per kind"""
+    t_in = np.full(o.shape[:-1], np.inf)
+    t_out = np.full(o.shape[:-1], -np.inf)
+    for code, kernel in ((0, _box), (1, _sphere), (2, _frustum)):
+        selected = kinds == code
+        if not selected.any():
+            continue
+        if code == 0:
+            args = (params[selected],)
+        elif code == 1:
+            args = (params[selected, 0],)
+        else:
+            args = tuple(params[selected].T)
+        t_in[..., selected], t_out[..., selected] = kernel(o[..., selected, :], d[..., selected, :], *args)
+    t_in = np.clip(t_in, 0.0, 1.0)
+    t_out = np.clip(t_out, 0.0, 1.0)
+    return t_in, np.maximum(t_in, t_out)
+
+
+def _contains_local(kinds, params, p):
+    """Whether local points (..., 3) lie inside primitives of ``kinds`` with ``params``"""
+    box = np.all(np.abs(p) <= params, axis=-1)
+    sphere = np.sum(p ** 2, axis=-1) <= params[..., 0] ** 2
+    bottom, top, height = params[..., 0], params[..., 1], params[..., 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radius = (top + bottom) / 2 + (top - bottom) / height * p[..., 1]
+    frustum = (np.abs(p[..., 1]) <= height / 2) & (p[..., 0] ** 2 + p[..., 2] ** 2 <= radius ** 2)
+    return np.where(kinds == 0, box, np.where(kinds == 1, sphere, frustum))
+
+
+KIND_CODES = {'box': 0, 'sphere': 1, 'frustum': 2}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+
+def _world_bounds(kinds, centers, rotations, scales, params):
+    """World-space axis-aligned bounding boxes of packed primitives, two (P, 3) arrays"""
+    local = params.copy()
+    sphere = kinds == KIND_CODES['sphere']
+    local[sphere] = params[sphere, :1]
+    frustum = kinds == KIND_CODES['frustum']
+    radius = params[frustum, :2].max(axis=1)
+    local[frustum] = np.stack([radius, params[frustum, 2] / 2, radius], axis=1)
+    half = np.einsum('pij,pj->pi', np.abs(rotations), local * np.abs(scales))
+    return centers - half, centers + half
+
+# Upper bound on the number of (segment, primitive, piece) cells evaluated at
+# once; larger batches of segments are processed in chunks
+CHUNK_CELLS = 2 ** 18
+
+# Scenes with more primitives than this are traced through a BVH
+BVH_THRESHOLD = 16
+
+
+class CompiledGeometry:
+    """The shapes of a scene packed into flat arrays.
+
+    Transforms and shape parameters of the leaf primitives of all shapes
+    are stored as ``(L, ...)`` arrays, and segments are intersected with
+    leaves in bulk: every (segment, leaf) pair is evaluated by one array
+    expression per primitive kind, without Python loops over segments or
+    primitives. Shape ``i`` owns leaves ``leaf_offsets[i]:leaf_offsets[i + 1]``
+    and the CSG program rows ``program_offsets[i]:program_offsets[i + 1]``;
+    a plain primitive is one leaf without program.
+    """
+
+    ARRAYS = ('kinds', 'centers', 'rotations', 'scales', 'params', 'volumes', 'leaf_offsets', 'program', 'program_offsets')
+
+    def __init__(self, primitives):
+        compiled = [compile_solid(shape) for shape in primitives]
+        leaves = [leaf for shape_leaves, _ in compiled for leaf in shape_leaves]
+        count = len(leaves)
+        self.kinds = np.array([KIND_CODES[p.kind] for p in leaves], dtype=np.int8)
+        self.centers = np.array([p.center for p in leaves]).reshape(count, 3)
+        self.rotations = np.array([p.rotation for p in leaves]).reshape(count, 3, 3)
+        self.scales = np.array([p.scale for p in leaves]).reshape(count, 3)
+        # box: half extents; sphere: radius, 0, 0; frustum: bottom, top, height
+        self.params = np.zeros((count, 3))
+        for i, p in enumerate(leaves):
+            self.params[i, :len(p.params)] = p.params
+        self.volumes = np.array([shape.volume for shape in primitives], dtype=float)
+        self.leaf_offsets = np.cumsum([0] + [len(l) for l, _ in compiled]).astype(np.int64)
+        self.program = np.concatenate([p for _, p in compiled] or [np.zeros((0, 3), dtype=np.int64)])
+        self.program_offsets = np.cumsum([0] + [len(p) for _, p in compiled]).astype(np.int64)
+        self._derive()
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Geometry over packed ``ARRAYS``, e.g. views into shared memory"""
+        geometry = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(geometry, name, arrays[name])
+        geometry._derive()
+        return geometry
+
+    def arrays(self):
+        """The packed primitive arrays, by name"""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def leaf(self, index):
+        """The leaf ``Primitive`` at ``index``"""
+        kind = KIND_NAMES[self.kinds[index]]
+        params = self.params[index, :1] if kind == 'sphere' else self.params[index]
+        return Primitive(kind, self.centers[index], self.rotations[index], self.scales[index], params.copy())
+
+    def primitive(self, index):
+        """The shape at ``index``, a ``Primitive`` or a CSG ``Solid``"""
+        leaves = [self.leaf(i) for i in range(self.leaf_offsets[index], self.leaf_offsets[index + 1])]
+        return decompile(leaves, self._program(index))
+
+    def _program(self, index):
+        return self.program[self.program_offsets[index]:self.program_offsets[index + 1]]
+
+    def _leaves(self, index):
+        return slice(self.leaf_offsets[index], self.leaf_offsets[index + 1])
+
+    def _derive(self):
+        count = self.leaf_count = len(self.kinds)
+        self.count = len(self.volumes)
+        # World -> local transform as one (3, 3L) matrix product
+        self._rotation_columns = self.rotations.transpose(1, 0, 2).reshape(3, 3 * count)
+        self._local_centers = np.einsum('pj,pji->pi', self.centers, self.rotations)
+        # Overlaps belong to the innermost (smallest) shape
+        self.ranks = np.argsort(np.argsort(self.volumes, kind='stable'), kind='stable')
+        self.leaf_shapes = np.repeat(np.arange(self.count), np.diff(self.leaf_offsets))
+        self.solids = np.flatnonzero(np.diff(self.program_offsets) > 0)
+        self.plain_leaves = ~np.isin(self.leaf_shapes, self.solids)
+        # Intervals per segment: one per plain leaf, one per piece of each solid
+        leaf_counts = np.diff(self.leaf_offsets)
+        self.hit_width = int(self.plain_leaves.sum() + (2 * leaf_counts[self.solids] - 1).sum())
+
+    def intersect_pairs(self, origins, ends, segments, primitives):
+        """Entry/exit parameters of the given (segment, leaf) pairs.
+
+        ``segments`` and ``primitives`` (leaf indices) are index arrays of
+        equal length K. Returns ``t_in, t_out`` of shape (K,), clipped to
+        [0, 1]; pairs that do not intersect get ``t_in == t_out``.
+        """
+        rotations = self.rotations[primitives]
+        scales = self.scales[primitives]
+        o = np.einsum('kj,kji->ki', origins[segments] - self.centers[primitives], rotations) / scales
+        d = np.einsum('kj,kji->ki', ends[segments] - origins[segments], rotations) / scales
+        # Each pair acts as its own primitive of a single-segment batch
+        t_in, t_out = _intersect_local(self.kinds[primitives], self.params[primitives], o[None], d[None])
+        return t_in[0], t_out[0]
+
+    def to_local(self, points):
+        """Points (N, 3) in the local frame of every leaf, shape (N, L, 3)"""
+        local = (points @ self._rotation_columns).reshape(len(points), self.leaf_count, 3)
+        return (local - self._local_centers) / self.scales
+
+    def intersect(self, origins, ends):
+        """Entry/exit parameters of every segment (N, 3) with every leaf, shape (N, L)"""
+        count = len(origins)
+        t_in = np.empty((count, self.leaf_count))
+        t_out = np.empty((count, self.leaf_count))
+        step = max(CHUNK_CELLS // max(self.leaf_count, 1), 1)
+        for start in range(0, count, step):
+            stop = min(start + step, count)
+            o = self.to_local(origins[start:stop])
+            d = self.to_local(ends[start:stop]) - o
+            t_in[start:stop], t_out[start:stop] = _intersect_local(self.kinds, self.params, o, d)
+        return t_in, t_out
+
+    def _gather(self, shape, rows, leaves, values, default):
+        """Distinct ``rows`` paired with leaves of ``shape``, and the pair ``values``
+        laid out as (rows, leaves of the shape) arrays, ``default`` where unpaired"""
+        span = self._leaves(shape)
+        selected = (leaves >= span.start) & (leaves < span.stop)
+        distinct, index = np.unique(rows[selected], return_inverse=True)
+        dense = []
+        for value in values:
+            array = np.full((len(distinct), span.stop - span.start), default, dtype=value.dtype)
+            array[index, leaves[selected] - span.start] = value[selected]
+            dense.append(array)
+        return distinct, dense
+
+    def locate(self, points, materials):
+        """Material index at points (N, 3): that of the innermost shape
+        containing each point, or -1 outside all shapes"""
+        materials = np.asarray(materials)
+        count = len(points)
+        innermost = np.full(count, self.count)
+        if self.leaf_count > BVH_THRESHOLD:
+            found, leaves = self.bvh.candidate_pairs(points, points)
+            local = np.einsum(
+                'kj,kji->ki', points[found] - self.centers[leaves], self.rotations[leaves]
+            ) / self.scales[leaves]
+            inside = _contains_local(self.kinds[leaves], self.params[leaves], local)
+            plain = inside & self.plain_leaves[leaves]
+            np.minimum.at(innermost, found[plain], self.ranks[self.leaf_shapes[leaves[plain]]])
+            for shape in self.solids:
+                rows, (member,) = self._gather(shape, found, leaves, (inside,), False)
+                rows = rows[evaluate(self._program(shape), member)]
+                innermost[rows] = np.minimum(innermost[rows], self.ranks[shape])
+        elif self.leaf_count:
+            step = max(CHUNK_CELLS // self.leaf_count, 1)
+            plain_ranks = self.ranks[self.leaf_shapes[self.plain_leaves]]
+            for start in range(0, count, step):
+                stop = min(start + step, count)
+                inside = _contains_local(self.kinds, self.params, self.to_local(points[start:stop]))
+                chunk = np.where(inside[:, self.plain_leaves], plain_ranks, self.count).min(axis=1, initial=self.count)
+                for shape in self.solids:
+                    member = evaluate(self._program(shape), inside[:, self._leaves(shape)])
+                    chunk = np.where(member, np.minimum(chunk, self.ranks[shape]), chunk)
+                innermost[start:stop] = chunk
+
+        by_rank = np.append(materials[np.argsort(self.ranks)], -1)
+        return by_rank[innermost]
+
+    @cached_property
+    def version(self):
+        """Content hash of the packed primitives"""
+        digest = hashlib.sha1()
+        for array in (self.kinds, self.centers, self.rotations, self.scales, self.params,
+                      self.leaf_offsets, self.program, self.program_offsets):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    @cached_property
+    def leaf_bounds(self):
+        """World-space axis-aligned bounding boxes of the leaves, two (L, 3) arrays"""
+        return _world_bounds(self.kinds, self.centers, self.rotations, self.scales, self.params)
+
+    @cached_property
+    def bounds(self):
+        """World-space axis-aligned bounding boxes of the shapes, two (P, 3) arrays"""
+        leaf_lower, leaf_upper = self.leaf_bounds
+        lower, upper = leaf_lower[self.leaf_offsets[:-1]], leaf_upper[self.leaf_offsets[:-1]]
+        for shape in self.solids:
+            span = self._leaves(shape)
+            lower[shape], upper[shape] = evaluate_bounds(self._program(shape), leaf_lower[span], leaf_upper[span])
+        return lower, upper
+
+    @cached_property
+    def bvh(self):
+        """Bounding volume hierarchy over ``leaf_bounds``"""
+        return BoundingVolumeHierarchy(*self.leaf_bounds)
+
+    def _hits(self, t_in, t_out, materials):
+        """Intervals (N, H) of every shape along segments from the leaf intervals (N, L),
+        with the rank and material of each column"""
+        plain_shapes = self.leaf_shapes[self.plain_leaves]
+        lower, upper = [t_in[:, self.plain_leaves]], [t_out[:, self.plain_leaves]]
+        ranks, owned = [self.ranks[plain_shapes]], [materials[plain_shapes]]
+        for shape in self.solids:
+            span = self._leaves(shape)
+            shape_lower, shape_upper = intervals(t_in[:, span], t_out[:, span], self._program(shape))
+            lower.append(shape_lower)
+            upper.append(shape_upper)
+            ranks.append(np.full(shape_lower.shape[1], self.ranks[shape]))
+            owned.append(np.full(shape_lower.shape[1], materials[shape]))
+        return (np.concatenate(lower, axis=1), np.concatenate(upper, axis=1),
+                np.concatenate(ranks), np.concatenate(owned))
+
+    def path_lengths(self, origins, ends, materials, material_count):
+        """Path length (cm) of each segment through each material.
+
+        ``materials[i]`` is the material index of shape ``i``, or -1 for
+        vacuum. Returns an array of shape (N, material_count). Scenes with
+        more than ``BVH_THRESHOLD`` leaf primitives only test the leaves
+        whose bounding boxes a segment crosses.
+        """
+        count = len(origins)
+        lengths = np.zeros((count, material_count))
+        if not self.count or not material_count:
+            return lengths
+
+        materials = np.asarray(materials)
+        if self.leaf_count > BVH_THRESHOLD:
+            return self._sparse_path_lengths(origins, ends, materials, material_count)
+
+        width = self.hit_width
+        step = max(CHUNK_CELLS // (max(width, self.leaf_count) * (2 * width + 1)), 1)
+        for start in range(0, count, step):
+            stop = min(start + step, count)
+            t_in, t_out, ranks, owned = self._hits(*self.intersect(origins[start:stop], ends[start:stop]), materials)
+            shape = t_in.shape
+            lengths[start:stop] = _owned_lengths(
+                t_in, t_out, np.broadcast_to(ranks, shape), np.broadcast_to(owned, shape),
+                material_count, np.linalg.norm(ends[start:stop] - origins[start:stop], axis=1)
+            )
+        return lengths
+
+    def _sparse_path_lengths(self, origins, ends, materials, material_count):
+        lengths = np.zeros((len(origins), material_count))
+        segments, leaves = self.bvh.candidate_pairs(origins, ends)
+        t_in, t_out = self.intersect_pairs(origins, ends, segments, leaves)
+        plain = self.plain_leaves[leaves] & (t_out > t_in)
+        shapes = self.leaf_shapes[leaves[plain]]
+        hits = [(segments[plain], t_in[plain], t_out[plain], self.ranks[shapes], materials[shapes])]
+        for shape in self.solids:
+            rows, (leaf_in, leaf_out) = self._gather(shape, segments, leaves, (t_in, t_out), 0.0)
+            shape_in, shape_out = intervals(leaf_in, leaf_out, self._program(shape))
+            hit = shape_out > shape_in
+            hits.append((
+                np.broadcast_to(rows[:, None], hit.shape)[hit], shape_in[hit], shape_out[hit],
+                np.full(hit.sum(), self.ranks[shape]), np.full(hit.sum(), materials[shape]),
+            ))
+        segments, t_in, t_out, ranks, owners = (np.concatenate(parts) for parts in zip(*hits))
+        if not len(segments):
+            return lengths
+
+        # Lay the hits out as one padded row per segment
+        order = np.argsort(segments, kind='stable')
+        segments, t_in, t_out, ranks, owners = segments[order], t_in[order], t_out[order], ranks[order], owners[order]
+        rows, row_index, hits = np.unique(segments, return_inverse=True, return_counts=True)
+        columns = np.arange(len(segments)) - np.repeat(np.cumsum(hits) - hits, hits)
+        width = hits.max()
+
+        padded_in = np.zeros((len(rows), width))
+        padded_out = np.zeros((len(rows), width))
+        padded_ranks = np.full((len(rows), width), self.count)
+        owned = np.full((len(rows), width), -1)
+        padded_in[row_index, columns] = t_in
+        padded_out[row_index, columns] = t_out
+        padded_ranks[row_index, columns] = ranks
+        owned[row_index, columns] = owners
+
+        step = max(CHUNK_CELLS // (width * (2 * width + 1)), 1)
+        for start in range(0, len(rows), step):
+            chunk = slice(start, start + step)
+            selected = rows[chunk]
+            lengths[selected] = _owned_lengths(
+                padded_in[chunk], padded_out[chunk], padded_ranks[chunk], owned[chunk], material_count,
+                np.linalg.norm(ends[selected] - origins[selected], axis=1)
+            )
+        return lengths
+
+
+def _owned_lengths(t_in, t_out, ranks, materials, material_count, segment_lengths):
+    """Split segments at all entry/exit points and sum each piece into the
+    material of the innermost shape containing its midpoint.
+
+    All inputs but ``segment_lengths`` are (N, H) arrays describing H
+    intervals per segment, each of a primitive or a piece of a solid.
+    """
+    count = len(t_in)
+    breaks = np.sort(np.concatenate([np.zeros((count, 1)), np.ones((count, 1)), t_in, t_out], axis=1), axis=1)
+    mids = (breaks[:, :-1] + breaks[:, 1:]) / 2
+    pieces = np.diff(breaks, axis=1) * segment_lengths[:, None]
+
+    inside = (t_in[:, None, :] <= mids[:, :, None]) & (mids[:, :, None] < t_out[:, None, :])
+    owner = np.where(inside, ranks[:, None, :], np.iinfo(np.int64).max).argmin(axis=2)
+    material = np.where(inside.any(axis=2), np.take_along_axis(materials, owner, axis=1), -1)
+
+    keep = material >= 0
+    rows = np.broadcast_to(np.arange(count)[:, None], material.shape)
+    lengths = np.bincount(
+        rows[keep] * material_count + material[keep],
+        weights=pieces[keep],
+        minlength=count * material_count,
+    )
+    return lengths.reshape(count, material_count)
+
+
+_COMPILED = OrderedDict()
+CACHE_SIZE = 16
+
+
+def compile_geometry(primitives):
+    """Compiled geometry of ``primitives``, reused while the geometry is unchanged.
+
+    Compiled scenes, with their lazily built BVH, are kept in a small LRU
+    cache keyed by the content hash of the packed primitives, so repeated
+    computations of an unchanged scene skip the rebuild.
+    """
+    geometry = CompiledGeometry(primitives)
+    cached = _COMPILED.get(geometry.version)
+    if cached is not None:
+        _COMPILED.move_to_end(geometry.version)
+        return cached
+    _COMPILED[geometry.version] = geometry
+    while len(_COMPILED) > CACHE_SIZE:
+        _COMPILED.popitem(last=False)
+    return geometry
@@ -0,0 +1,192 @@
+"""
+Importance maps and weight windows for Monte-Carlo transport.
+
+Importance is generated on a Cartesian grid over the box of the material
+volumes, ``IMPORTANCE_MESH_CELLS`` cells per axis, and on ``ENERGY_NODES``
+energies from the lowest of ``LOWEST_ENERGY`` and the source lines up to
+the highest line, from a deterministic point-kernel adjoint estimate: the
+importance of a photon of energy E in a cell for a sensor is the response
+of that sensor to a unit source of energy E at the cell center,
+
+    I(c, E) = R(E) · B(μ(E)x) · exp(-μ(E)x) / (4π r²)
+
+Photons take the importance of the node nearest to their energy on a log
+scale, so scattered photons, which penetrate less, are not split as if
+they still had their source energy.
+
+Every sensor is normalized by its response to the actual sources (the
+source spectrum on the nodes, averaged over source points), so
+sensors weigh alike and one map serves them all. Sensors with
+``equi_importance`` share a single term: their adjoints are summed before
+normalization, so the group as a whole is balanced against the other
+sensors.
+
+The map gives every cell a target weight inversely proportional to its
+importance, scaled so that photons start at their target in the sources.
+After every flight, photons above ``WINDOW_RATIO`` times the target of
+their cell and energy are split into at most ``MAX_SPLIT`` copies and photons below
+the target over ``WINDOW_RATIO`` play Russian roulette, surviving at the
+target weight. Both games keep the expected weight, so tallies stay
+unbiased while histories are pushed towards the sensors.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from .point_kernel import MIN_DISTANCE_SQUARED, sensor_buildup
+from .response import UNCOLLIDED_RESPONSES, response_coefficients
+
+# Ratio between the target weight and the split or roulette thresholds
+WINDOW_RATIO = 2.0
+# Copies a photon may be split into at one flight
+MAX_SPLIT = 8
+# Importances below this fraction of the largest are raised to it
+IMPORTANCE_FLOOR = 1e-20
+# Source points per source for the normalization of each sensor
+SOURCE_PROBES = 64
+# Optical thickness (mfp) beyond which the buildup is held constant
+MAX_BUILDUP_MFP = 40.0
+# Energy nodes of the map, log-spaced up to the highest source line
+ENERGY_NODES = 8
+LOWEST_ENERGY = 0.03  # MeV
+# (cell, sensor) segments traced at once
+CHUNK_SEGMENTS = 20000
+
+
+@dataclass
+class ImportanceMap:
+    """Target weights per cell of a Cartesian grid and energy node, relative to the source photon weight"""
+    x: np.ndarray  # cell edges (cm) along each axis
+    y: np.ndarray
+    z: np.ndarray
+    energies: np.ndarray  # nodes (MeV), ascending
+    targets: np.ndarray  # (cells, nodes), x index slowest
+
+    ARRAYS = ('x', 'y', 'z', 'energies', 'targets')
+
+    @property
+    def shape(self):
+        return len(self.x) - 1, len(self.y) - 1, len(self.z) - 1
+
+    def cells(self, positions):
+        """Flat index of the cell of each position (N, 3), clamped to the grid"""
+        index = [
+            np.clip(np.searchsorted(edges, positions[:, axis], side='right') - 1, 0, len(edges) - 2)
+            for axis, edges in enumerate((self.x, self.y, self.z))
+        ]
+        return np.ravel_multi_index(index, self.shape)
+
+    def nodes(self, energies):
+        """Index of the energy node nearest to each of ``energies`` (MeV) on a log scale"""
+        return np.searchsorted(np.sqrt(self.energies[:-1] * self.energies[1:]), energies)
+
+    def windows(self, rng, particles, weight):
+        """Split and roulette ``particles`` against the targets of their cells and
+        energies, for source photons of ``weight``"""
+        target = weight * self.targets[self.cells(particles.position), self.nodes(particles.energy)]
+        low = particles.weight < target / WINDOW_RATIO
+        survives = rng.random(len(low)) * target < particles.weight
+        particles.weight = np.where(low, target, particles.weight)
+        keep = ~low | survives
+        particles, target = particles.select(keep), target[keep]
+
+        copies = np.where(
+            particles.weight > WINDOW_RATIO * target,
+            np.minimum(np.ceil(particles.weight / target), MAX_SPLIT), 1
+        ).astype(np.int64)
+        particles.weight = particles.weight / copies
+        return particles.repeat(copies)
+
+
+def importance_grid(scene, cells=None):
+    """Cell edges of the grid over the material volumes, or None without materials"""
+    cells = cells or settings.IMPORTANCE_MESH_CELLS
+    solid = np.asarray(scene.primitive_materials) >= 0
+    if not solid.any():
+        return None
+    lower, upper = scene.geometry.bounds
+    lower, upper = lower[solid].min(axis=0), upper[solid].max(axis=0)
+    return [np.linspace(lo, hi, cells + 1) for lo, hi in zip(lower, upper)]
+
+
+def sensor_groups(sensors):
+    """Sensor indices of each importance term: one per sensor, and one for all
+    sensors with ``equi_importance``"""
+    shared = [i for i, sensor in enumerate(sensors) if sensor.equi_importance]
+    groups = [[i] for i, sensor in enumerate(sensors) if not sensor.equi_importance]
+    return groups + ([shared] if shared else [])
+
+
+def energy_nodes(scene):
+    """Log-spaced energy nodes (MeV) of a scene's importance map"""
+    lines = scene.energies
+    return np.geomspace(min(LOWEST_ENERGY, lines[0]), lines[-1], ENERGY_NODES)
+
+
+def source_spectrum(scene, energies):
+    """Share of the source photons emitted at each of the energy nodes ``energies``"""
+    spectrum = np.zeros(len(energies))
+    nodes = np.searchsorted(np.sqrt(energies[:-1] * energies[1:]), scene.energies)
+    for source in scene.sources:
+        np.add.at(spectrum, nodes[np.searchsorted(scene.energies, source.energies)], source.emissions)
+    return spectrum / spectrum.sum()
+
+
+def adjoint_responses(scene, points, energies):
+    """Response (points, sensors, E) of every sensor to one photon emitted at ``points``
+    at each of ``energies`` (MeV)"""
+    mu = scene.attenuation_table(energies)
+    parameters = scene.buildup_parameters(energies)
+    coefficients = [response_coefficients(sensor.response_function, energies) for sensor in scene.sensors]
+
+    responses = np.zeros((len(points), len(scene.sensors), len(energies)))
+    step = max(CHUNK_SEGMENTS // len(scene.sensors), 1)
+    for start in range(0, len(points), step):
+        chunk = points[start:start + step]
+        for i, sensor in enumerate(scene.sensors):
+            ends = np.broadcast_to(sensor.position, chunk.shape)
+            lengths = scene.geometry.path_lengths(chunk, ends, scene.primitive_materials, len(scene.materials))
+            material_mfp = lengths[:, :, None] * mu[None]
+            if sensor.response_function in UNCOLLIDED_RESPONSES:
+                buildup = 1.0
+            else:
+                total = np.maximum(material_mfp.sum(axis=1, keepdims=True), 1e-30)
+                buildup = sensor_buildup(
+                    sensor, material_mfp * np.minimum(MAX_BUILDUP_MFP / total, 1.0), parameters, energies
+                )
+            distance_squared = np.maximum(np.sum((ends - chunk) ** 2, axis=1), MIN_DISTANCE_SQUARED)
+            flux = buildup * np.exp(-material_mfp.sum(axis=1)) / (4 * np.pi * distance_squared[:, None])
+            responses[start:start + step, i] = flux * coefficients[i]
+    return responses
+
+
+def importance_map(scene, cells=None, seed=0):
+    """Weight-window map of a scene from the point-kernel adjoint of its sensors, or None
+    when the scene has no material to transport through"""
+    edges = importance_grid(scene, cells)
+    if edges is None or not scene.sensors or not scene.sources:
+        return None
+    centers = [(e[:-1] + e[1:]) / 2 for e in edges]
+    points = np.stack(np.meshgrid(*centers, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    rng = np.random.default_rng(seed)
+    emissions = np.array([source.emissions.sum() for source in scene.sources])
+    probes = np.concatenate([source.sample(scene.primitives, rng, SOURCE_PROBES) for source in scene.sources])
+    shares = np.repeat(emissions / emissions.sum() / SOURCE_PROBES, SOURCE_PROBES)
+
+    energies = energy_nodes(scene)
+    spectrum = source_spectrum(scene, energies)
+    adjoint = adjoint_responses(scene, np.concatenate([points, probes]), energies)
+    importance = np.zeros((len(adjoint), len(energies)))
+    for group in sensor_groups(scene.sensors):
+        term = adjoint[:, group].sum(axis=1)
+        reference = shares @ term[len(points):] @ spectrum
+        if reference > 0:
+            importance += term / reference
+    if not importance.any():
+        return None
+    importance = np.maximum(importance, importance.max() * IMPORTANCE_FLOOR)
+    # Photons start at their target weight on average over the sources
+    start = shares @ importance[len(points):] @ spectrum
+    return ImportanceMap(*edges, energies, targets=start / importance[:len(points)])
@@ -0,0 +1,123 @@
+"""
+Compiled material cache.
+
+A composition is compiled once into its mass attenuation μ/ρ on a fixed
+log-energy grid (plus the absorption edges of the photon table), so the
+engines interpolate one row instead of re-walking the ``elements`` list
+and combining per-element data on every evaluation. Compiled materials
+are keyed by a hash of the normalized mass fractions and the photon table
+version: identical materials of different projects share one entry, and
+an edited composition hashes to a new one. Density is applied at lookup,
+so a composition used at several ``Volume.real_density`` values is
+compiled once as well.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from elements.photon import ELEMENTS, EDGE_OFFSET, bundled_table
+from .attenuation import mass_fractions
+
+ENERGY_GRID = np.geomspace(1e-3, 20.0, 401)  # MeV
+CACHE_SIZE = 256
+
+_COMPILED = OrderedDict()
+_GRIDS = {}
+_COMPOSITIONS = {}  # (model label, pk) -> (updated_at, table version, key)
+
+
+@dataclass(frozen=True)
+class CompiledMaterial:
+    key: str
+    fractions: tuple  # ((symbol, mass fraction), ...)
+    log_energies: np.ndarray
+    log_mass_attenuation: np.ndarray  # log(μ/ρ) on log_energies
+
+    def mass_attenuation(self, energies):
+        """μ/ρ (cm²/g) at ``energies`` (MeV)"""
+        x = np.log(np.clip(np.atleast_1d(np.asarray(energies, dtype=float)), *np.exp(self.log_energies[[0, -1]])))
+        i = np.clip(np.searchsorted(self.log_energies, x) - 1, 0, len(self.log_energies) - 2)
+        weight = (x - self.log_energies[i]) / (self.log_energies[i + 1] - self.log_energies[i])
+        return np.exp(self.log_mass_attenuation[i] * (1 - weight) + self.log_mass_attenuation[i + 1] * weight)
+
+    def attenuation(self, energies, density):
+        """Linear attenuation coefficient μ (1/cm) at ``energies`` (MeV)"""
+        return self.mass_attenuation(energies) * density
+
+
+def energy_grid(table):
+    """The fixed grid with both sides of the table's absorption edges added"""
+    if table.version not in _GRIDS:
+        energies = table.energies
+        split = np.flatnonzero(energies[1:] <= energies[:-1] * (1 + 2 * EDGE_OFFSET))
+        edges = np.concatenate([energies[split], energies[split + 1]])
+        edges = edges[(edges > ENERGY_GRID[0]) & (edges < ENERGY_GRID[-1])]
+        _GRIDS[table.version] = np.unique(np.concatenate([ENERGY_GRID, edges]))
+    return _GRIDS[table.version]
+
+
+def material_key(fractions, table_version):
+    """Content hash of normalized mass fractions for a photon table version"""
+    content = json.dumps([table_version, sorted((s, round(f, 12)) for s, f in fractions.items())])
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def compile_material(elements, table=None):
+    """Compiled material of a composition ``elements`` list"""
+    table = table or bundled_table()
+    fractions = mass_fractions(elements)
+    key = material_key(fractions, table.version)
+    compiled = _COMPILED.get(key)
+    if compiled is not None:
+        _COMPILED.move_to_end(key)
+        return compiled
+
+    grid = energy_grid(table)
+    numbers = [ELEMENTS[symbol][0] for symbol in fractions]
+    weights = np.array(list(fractions.values()))
+    mass_attenuation = weights @ table.mass_attenuation(numbers, grid)
+    compiled = CompiledMaterial(key, tuple(sorted(fractions.items())), np.log(grid), np.log(mass_attenuation))
+
+    _COMPILED[key] = compiled
+    if len(_COMPILED) > CACHE_SIZE:
+        _COMPILED.popitem(last=False)
+    return compiled
+
+
+def composition_elements(composition):
+    """``{element, percentage}`` list of a Composition or ElementComposition"""
+    entries = composition.elements or []
+    if not any('element_id' in entry for entry in entries):
+        return entries
+    from elements.models import Element
+
+    symbols = Element.objects.in_bulk([entry.get('element_id') for entry in entries])
+    elements = []
+    for entry in entries:
+        element = symbols.get(entry.get('element_id'))
+        if element is None:
+            raise ValueError(f"Unknown element id {entry.get('element_id')!r} in {composition.name}")
+        elements.append({'element': element.symbol, 'percentage': entry.get('percentage', 0.0)})
+    return elements
+
+
+def compile_composition(composition, table=None):
+    """Compiled material of a Composition or ElementComposition instance"""
+    table = table or bundled_table()
+    label = (composition._meta.label, composition.pk)
+    known = _COMPOSITIONS.get(label)
+    if known and known[:2] == (composition.updated_at, table.version) and known[2] in _COMPILED:
+        _COMPILED.move_to_end(known[2])
+        return _COMPILED[known[2]]
+
+    compiled = compile_material(composition_elements(composition), table)
+    _COMPOSITIONS[label] = (composition.updated_at, table.version, compiled.key)
+    return compiled
+
+
+def forget_composition(composition):
+    """Drop the cached key of an edited or deleted composition"""
+    _COMPOSITIONS.pop((composition._meta.label, composition.pk), None)
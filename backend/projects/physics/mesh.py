@@ -0,0 +1,223 @@
+"""
+Source discretization on ``MeshConfiguration`` meshes.
+
+Mesh ``bounds`` give the breakpoints along each coordinate and
+``subdivisions`` split every interval into linear or exponential
+partitions; cells are the tensor product of the three edge sets.
+Cartesian meshes use world coordinates. Cylindrical (r, phi, z) and
+spherical (r, theta, phi) meshes are centred on the source volume, with
+the axis along the volume's own axis (local Y, the axis of cylinders and
+cones).
+
+Each cell is probed with stratified points to get the volume it shares
+with the source primitive, the centroid of that part and its activity
+weight (uniform activity density). Sampling draws stratified random
+points: every cell gets its share of the points and fills it by rejection
+inside the primitive. Meshes are cached by a content hash of the
+primitive and the mesh settings, so unchanged sources are not re-meshed.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+COORDINATES = {
+    'cartesian': ('x', 'y', 'z'),
+    'cylindrical': ('r', 'phi', 'z'),
+    'spherical': ('r', 'theta', 'phi'),
+}
+# Width ratio of consecutive cells of an exponential subdivision
+EXPONENTIAL_RATIO = 1.5
+# Probe points per cell and axis for the cell volumes (4³ per cell)
+PROBES_PER_AXIS = 4
+CACHE_SIZE = 64
+
+_MESHES = OrderedDict()
+
+
+def _partition(start, stop, partitions, mode='linear', direction='increasing'):
+    """Edges splitting [start, stop] into ``partitions`` cells"""
+    partitions = max(int(partitions), 1)
+    if mode == 'exponential':
+        widths = EXPONENTIAL_RATIO ** np.arange(partitions)
+        if direction == 'decreasing':
+            widths = widths[::-1]
+    else:
+        widths = np.ones(partitions)
+    return start + (stop - start) * np.concatenate([[0.0], np.cumsum(widths) / widths.sum()])
+
+
+def _breakpoints(value):
+    """Sorted interval breakpoints of one coordinate's ``bounds`` entry"""
+    if isinstance(value, dict):
+        value = value.get('proposed') or [value.get('min'), value.get('max')]
+    points = np.unique(np.asarray([float(v) for v in value or [] if v is not None]))
+    if len(points) < 2:
+        raise ValueError('at least two bounds are required per coordinate')
+    return points
+
+
+def _edges(breakpoints, subdivisions):
+    """Cell edges of one coordinate from its breakpoints and subdivisions"""
+    if isinstance(subdivisions, (int, float)):
+        settings = {i: {'partitions': subdivisions} for i in range(len(breakpoints) - 1)}
+    else:
+        settings = {int(s.get('interval', 0)): s for s in subdivisions or []}
+    edges = [breakpoints[:1]]
+    for i, (start, stop) in enumerate(zip(breakpoints[:-1], breakpoints[1:])):
+        s = settings.get(i, {})
+        edges.append(_partition(start, stop, s.get('partitions', 1), s.get('mode', 'linear'), s.get('direction', 'increasing'))[1:])
+    return np.concatenate(edges)
+
+
+def _default_bounds(primitive, system):
+    """Bounds enclosing the primitive when a coordinate has none"""
+    if primitive.kind == 'sphere':
+        extent = np.full(3, primitive.params[0])
+    elif primitive.kind == 'frustum':
+        radius = max(primitive.params[0], primitive.params[1])
+        extent = np.array([radius, primitive.params[2] / 2, radius])
+    else:
+        extent = np.asarray(primitive.params, dtype=float)
+    extent = extent * np.abs(primitive.scale)
+    if system == 'cartesian':
+        half = np.abs(primitive.rotation) @ extent
+        return {axis: [c - h, c + h] for axis, c, h in zip('xyz', primitive.center, half)}
+    radius = float(np.linalg.norm(extent))
+    if system == 'cylindrical':
+        return {'r': [0.0, radius], 'phi': [0.0, 2 * np.pi], 'z': [-radius, radius]}
+    return {'r': [0.0, radius], 'theta': [0.0, np.pi], 'phi': [0.0, 2 * np.pi]}
+
+
+def _from_unit(system, lower, upper, u):
+    """Mesh coordinates of unit-cube points ``u`` (..., 3) mapped uniformly by volume into cells"""
+    a, b = lower, upper
+    if system == 'cartesian':
+        return a + u * (b - a)
+    if system == 'cylindrical':
+        r = np.sqrt(a[..., 0] ** 2 + u[..., 0] * (b[..., 0] ** 2 - a[..., 0] ** 2))
+        return np.stack([r, a[..., 1] + u[..., 1] * (b[..., 1] - a[..., 1]), a[..., 2] + u[..., 2] * (b[..., 2] - a[..., 2])], axis=-1)
+    r = np.cbrt(a[..., 0] ** 3 + u[..., 0] * (b[..., 0] ** 3 - a[..., 0] ** 3))
+    cosine = np.cos(a[..., 1]) + u[..., 1] * (np.cos(b[..., 1]) - np.cos(a[..., 1]))
+    return np.stack([r, np.arccos(np.clip(cosine, -1, 1)), a[..., 2] + u[..., 2] * (b[..., 2] - a[..., 2])], axis=-1)
+
+
+def _cell_volumes(system, lower, upper):
+    d = upper - lower
+    if system == 'cartesian':
+        return d.prod(axis=1)
+    if system == 'cylindrical':
+        return (upper[:, 0] ** 2 - lower[:, 0] ** 2) / 2 * d[:, 1] * d[:, 2]
+    return (upper[:, 0] ** 3 - lower[:, 0] ** 3) / 3 * (np.cos(lower[:, 1]) - np.cos(upper[:, 1])) * d[:, 2]
+
+
+@dataclass
+class SourceMesh:
+    primitive: object  # geometry.Primitive of the source volume
+    system: str
+    lower: np.ndarray  # cell lower corners in mesh coordinates, (C, 3)
+    upper: np.ndarray  # cell upper corners in mesh coordinates, (C, 3)
+    volumes: np.ndarray  # cm³ of each cell inside the primitive, (C,)
+    centroids: np.ndarray  # world centroid of each cell's inside part, (C, 3)
+    weights: np.ndarray  # activity share of each cell, (C,)
+
+    ARRAYS = ('lower', 'upper', 'volumes', 'centroids', 'weights')
+
+    def to_world(self, coordinates):
+        """World points of mesh coordinates (N, 3)"""
+        if self.system == 'cartesian':
+            return coordinates
+        if self.system == 'cylindrical':
+            r, phi, z = coordinates.T
+            local = np.stack([r * np.cos(phi), z, r * np.sin(phi)], axis=1)
+        else:
+            r, theta, phi = coordinates.T
+            local = np.stack([r * np.sin(theta) * np.cos(phi), r * np.cos(theta), r * np.sin(theta) * np.sin(phi)], axis=1)
+        return local @ self.primitive.rotation.T + self.primitive.center
+
+    def _inside(self, points):
+        return self.primitive.contains_local(self.primitive.to_local(points))
+
+    def sample(self, rng, count):
+        """Stratified random points (count, 3): each cell gets its share, filled by rejection"""
+        expected = count * self.weights
+        per_cell = np.floor(expected).astype(np.int64)
+        remainder = count - per_cell.sum()
+        if remainder:
+            per_cell += rng.multinomial(remainder, (expected - per_cell) / (expected - per_cell).sum())
+        cells = np.repeat(np.arange(len(self.weights)), per_cell)
+
+        points = np.empty((count, 3))
+        pending = np.arange(count)
+        while len(pending):
+            c = cells[pending]
+            candidates = self.to_world(_from_unit(self.system, self.lower[c], self.upper[c], rng.random((len(pending), 3))))
+            inside = self._inside(candidates)
+            points[pending[inside]] = candidates[inside]
+            pending = pending[~inside]
+        return points
+
+
+def build_mesh(primitive, system, bounds, subdivisions):
+    """Discretize a source primitive on a mesh"""
+    if system not in COORDINATES:
+        raise ValueError(f'unknown coordinate system {system!r}')
+    bounds = {**_default_bounds(primitive, system), **(bounds or {})}
+    subdivisions = subdivisions or {}
+    edges = [_edges(_breakpoints(bounds[axis]), subdivisions.get(axis, 1)) for axis in COORDINATES[system]]
+    if system != 'cartesian':
+        edges[0] = np.unique(np.maximum(edges[0], 0.0))
+    if system == 'spherical':
+        edges[1] = np.unique(np.clip(edges[1], 0.0, np.pi))
+
+    grid_lower = np.stack(np.meshgrid(*[e[:-1] for e in edges], indexing='ij'), axis=-1).reshape(-1, 3)
+    grid_upper = np.stack(np.meshgrid(*[e[1:] for e in edges], indexing='ij'), axis=-1).reshape(-1, 3)
+    mesh = SourceMesh(primitive, system, grid_lower, grid_upper, None, None, None)
+
+    # Stratified probes: one jittered point per sub-cell, the same offsets in every cell
+    n = PROBES_PER_AXIS
+    strata = np.stack(np.meshgrid(*[np.arange(n)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    unit = (strata + np.random.default_rng(0).random(strata.shape)) / n
+    probes = _from_unit(system, grid_lower[:, None], grid_upper[:, None], unit[None])
+    world = mesh.to_world(probes.reshape(-1, 3))
+    inside = mesh._inside(world).reshape(len(grid_lower), len(unit))
+
+    fraction = inside.mean(axis=1)
+    keep = fraction > 0
+    if not keep.any():
+        raise ValueError('no mesh cell overlaps the source volume')
+    counts = inside.sum(axis=1, keepdims=True)
+    centroids = np.where(
+        counts > 0, (world.reshape(len(grid_lower), len(unit), 3) * inside[..., None]).sum(axis=1) / np.maximum(counts, 1), 0.0
+    )
+    volumes = _cell_volumes(system, grid_lower, grid_upper) * fraction
+
+    mesh.lower, mesh.upper = grid_lower[keep], grid_upper[keep]
+    mesh.volumes, mesh.centroids = volumes[keep], centroids[keep]
+    mesh.weights = mesh.volumes / mesh.volumes.sum()
+    return mesh
+
+
+def mesh_key(primitive, system, bounds, subdivisions):
+    """Content hash of a source primitive and its mesh settings"""
+    digest = hashlib.sha1()
+    for array in (primitive.center, primitive.rotation, primitive.scale, primitive.params):
+        digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+    digest.update(json.dumps([primitive.kind, system, bounds, subdivisions], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def source_mesh(primitive, system, bounds, subdivisions):
+    """Mesh of a source primitive, reused while the primitive and mesh are unchanged"""
+    key = mesh_key(primitive, system, bounds, subdivisions)
+    mesh = _MESHES.get(key)
+    if mesh is not None:
+        _MESHES.move_to_end(key)
+        return mesh
+    mesh = build_mesh(primitive, system, bounds, subdivisions)
+    _MESHES[key] = mesh
+    while len(_MESHES) > CACHE_SIZE:
+        _MESHES.popitem(last=False)
+    return mesh
@@ -0,0 +1,474 @@
+"""
+Monte-Carlo photon transport.
+
+Photons are simulated in samples of ``particles_per_sample`` histories,
+stored as struct-of-arrays (position, direction, energy, weight) and
+advanced together. Flights are sampled by delta tracking against the
+majorant attenuation of the scene materials, so the geometry is only
+queried for the material at collision sites. Real collisions use
+survival biasing: the weight is reduced by the photoelectric probability
+and the photon either Compton scatters (Klein-Nishina, Kahn's rejection
+method) or pair-produces and continues as an annihilation photon carrying
+twice its weight.
+
+Sensors are scored with the next-event estimator at every emission and
+collision: the probability density of reaching the sensor's direction,
+times the attenuation of the segment to the sensor over r². Tallies keep
+the flux resolved on the ``FLUX_ENERGIES`` nodes, split into uncollided and
+scattered parts, so every response function can be evaluated after the
+run. One sample's tally is one estimate; sampling stops once the relative
+error of every sensor's own response is below the convergence criterion.
+
+With an importance map (``importance``), weight windows replace the
+fixed Russian roulette: photons are split or rouletted after every flight
+against the target weight of their cell, which pushes histories through
+thick shields towards the sensors.
+
+Compton and pair shares come from the per-process data of the photon
+table when all elements of a material have it. Otherwise the Compton
+share is the Klein-Nishina coefficient and the rest of the total
+attenuation is split between photoelectric absorption and pair
+production with a ramp above the pair threshold.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from elements.photon import ELEMENTS, bundled_table
+from .geometry import CompiledGeometry
+from .importance import ImportanceMap
+from .mesh import SourceMesh
+from .parallel import parallel_samples
+from .point_kernel import MIN_DISTANCE_SQUARED
+from .response import FLUX_ENERGIES, UNCOLLIDED_RESPONSES, flux_nodes, response_coefficients
+
+ELECTRON_MASS = 0.51099895  # MeV
+CLASSICAL_ELECTRON_RADIUS = 2.8179403262e-13  # cm
+AVOGADRO = 6.02214076e23
+PAIR_THRESHOLD = 2 * ELECTRON_MASS
+# Energy (MeV) above which the non-Compton attenuation is all pair production
+PAIR_RAMP_ENERGY = 5.0
+
+ENERGY_CUTOFF = 0.01  # MeV
+ENERGY_GRID = np.geomspace(ENERGY_CUTOFF, 20.0, 300)  # MeV
+# Russian roulette below this fraction of the source weight
+ROULETTE_WEIGHT = 0.01
+ROULETTE_SURVIVAL = 0.1
+MIN_SAMPLES = 5
+
+
+def klein_nishina(energies):
+    """Klein-Nishina cross section per electron (cm²) at ``energies`` (MeV)"""
+    k = np.asarray(energies, dtype=float) / ELECTRON_MASS
+    log = np.log1p(2 * k)
+    return 2 * np.pi * CLASSICAL_ELECTRON_RADIUS ** 2 * (
+        (1 + k) / k ** 2 * (2 * (1 + k) / (1 + 2 * k) - log / k)
+        + log / (2 * k) - (1 + 3 * k) / (1 + 2 * k) ** 2
+    )
+
+
+def klein_nishina_density(energies, cosines):
+    """Compton angular density (1/sr) at scattering ``cosines`` and the scattered energies"""
+    ratio = 1 / (1 + energies / ELECTRON_MASS * (1 - cosines))
+    differential = CLASSICAL_ELECTRON_RADIUS ** 2 / 2 * ratio ** 2 * (ratio + 1 / ratio - (1 - cosines ** 2))
+    return differential / klein_nishina(energies), energies * ratio
+
+
+def sample_compton(rng, energies):
+    """Scattered energies and scattering cosines by Kahn's rejection method"""
+    alpha = energies / ELECTRON_MASS
+    x = np.empty_like(energies)
+    pending = np.arange(len(energies))
+    while len(pending):
+        a = alpha[pending]
+        r1, r2, r3 = rng.random((3, len(pending)))
+        low = r1 <= (1 + 2 * a) / (9 + 2 * a)
+        candidate = np.where(low, 1 + 2 * a * r2, (1 + 2 * a) / (1 + 2 * a * r2))
+        cosine = 1 - (candidate - 1) / a
+        accept = np.where(low, r3 <= 4 * (1 / candidate - 1 / candidate ** 2), r3 <= 0.5 * (cosine ** 2 + 1 / candidate))
+        x[pending[accept]] = candidate[accept]
+        pending = pending[~accept]
+    return energies / x, 1 - (x - 1) / alpha
+
+
+def isotropic(rng, count):
+    """Uniformly distributed unit vectors (count, 3)"""
+    cosine = rng.uniform(-1, 1, count)
+    phi = rng.uniform(0, 2 * np.pi, count)
+    sine = np.sqrt(1 - cosine ** 2)
+    return np.stack([sine * np.cos(phi), sine * np.sin(phi), cosine], axis=1)
+
+
+def rotate(rng, directions, cosines):
+    """Directions turned by polar ``cosines`` around a random azimuth"""
+    u, v, w = directions.T
+    phi = rng.uniform(0, 2 * np.pi, len(cosines))
+    sine = np.sqrt(np.maximum(1 - cosines ** 2, 0))
+    perpendicular = np.sqrt(np.maximum(1 - w ** 2, 0))
+    polar = perpendicular < 1e-10
+    safe = np.where(polar, 1.0, perpendicular)
+    turned = np.stack([
+        cosines * u + sine * (u * w * np.cos(phi) - v * np.sin(phi)) / safe,
+        cosines * v + sine * (v * w * np.cos(phi) + u * np.sin(phi)) / safe,
+        cosines * w - sine * np.cos(phi) * perpendicular,
+    ], axis=1)
+    along_axis = np.stack([sine * np.cos(phi), sine * np.sin(phi), cosines * np.sign(w)], axis=1)
+    turned = np.where(polar[:, None], along_axis, turned)
+    return turned / np.linalg.norm(turned, axis=1, keepdims=True)
+
+
+def _process_shares(compiled, table, energies):
+    """Transport μ/ρ (without coherent scattering) and its Compton and pair shares"""
+    symbols, weights = zip(*compiled.fractions)
+    numbers = [ELEMENTS[symbol][0] for symbol in symbols]
+    weights = np.array(weights)
+    total = compiled.mass_attenuation(energies)
+    try:
+        coherent, incoherent, pair_nuclear, pair_electron = (
+            weights @ table.mass_attenuation(numbers, energies, process)
+            for process in ('coherent', 'incoherent', 'pair_nuclear', 'pair_electron')
+        )
+        pair = pair_nuclear + pair_electron
+    except ValueError:
+        electrons = AVOGADRO * np.sum(weights * np.array(numbers) / [ELEMENTS[s][1] for s in symbols])
+        coherent = 0.0
+        incoherent = np.minimum(klein_nishina(energies) * electrons, total)
+        ramp = np.clip(np.log(energies / PAIR_THRESHOLD) / np.log(PAIR_RAMP_ENERGY / PAIR_THRESHOLD), 0, 1)
+        pair = (total - incoherent) * ramp
+    transport = np.maximum(total - coherent, 1e-30)
+    compton = np.clip(incoherent / transport, 0, 1)
+    return transport, compton, np.clip(pair / transport, 0, 1 - compton)
+
+
+@dataclass
+class InteractionTable:
+    """Material interaction data on ``ENERGY_GRID``; the last row is vacuum"""
+    total: np.ndarray  # μ (1/cm), (materials + 1, G)
+    compton: np.ndarray  # Compton share of μ, (materials + 1, G)
+    pair: np.ndarray  # pair production share of μ, (materials + 1, G)
+    majorant: np.ndarray  # max μ over materials, (G,)
+
+    @classmethod
+    def from_scene(cls, scene):
+        table = scene.photon_table or bundled_table()
+        rows = np.zeros((3, len(scene.materials) + 1, len(ENERGY_GRID)))
+        for i, material in enumerate(scene.materials):
+            transport, compton, pair = _process_shares(material.compile(table), table, ENERGY_GRID)
+            rows[:, i] = transport * material.density, compton, pair
+        return cls(rows[0], rows[1], rows[2], rows[0].max(axis=0))
+
+    @staticmethod
+    def _interpolation(energies):
+        x = np.log(np.clip(energies, ENERGY_GRID[0], ENERGY_GRID[-1]))
+        log_grid = np.log(ENERGY_GRID)
+        i = np.clip(np.searchsorted(log_grid, x) - 1, 0, len(ENERGY_GRID) - 2)
+        return i, (x - log_grid[i]) / (log_grid[i + 1] - log_grid[i])
+
+    def majorant_at(self, energies):
+        """Majorant μ (1/cm) at particle ``energies``"""
+        i, weight = self._interpolation(energies)
+        return self.majorant[i] * (1 - weight) + self.majorant[i + 1] * weight
+
+    def lookup(self, materials, energies):
+        """μ, Compton share and pair share of particles in ``materials`` (-1 = vacuum)"""
+        i, weight = self._interpolation(energies)
+        return tuple(
+            rows[materials, i] * (1 - weight) + rows[materials, i + 1] * weight
+            for rows in (self.total, self.compton, self.pair)
+        )
+
+    def attenuation(self, energies):
+        """μ (1/cm) of every material at ``energies``, shape (materials, N)"""
+        i, weight = self._interpolation(energies)
+        return self.total[:-1, i] * (1 - weight) + self.total[:-1, i + 1] * weight
+
+
+@dataclass
+class Particles:
+    position: np.ndarray  # cm, (N, 3)
+    direction: np.ndarray  # unit vectors, (N, 3)
+    energy: np.ndarray  # MeV, (N,)
+    weight: np.ndarray  # γ/s, (N,)
+
+    def select(self, mask):
+        return Particles(self.position[mask], self.direction[mask], self.energy[mask], self.weight[mask])
+
+    def repeat(self, copies):
+        return Particles(*(np.repeat(getattr(self, name), copies, axis=0) for name in
+                           ('position', 'direction', 'energy', 'weight')))
+
+    @staticmethod
+    def concatenate(parts):
+        return Particles(*(np.concatenate([getattr(p, name) for p in parts]) for name in
+                           ('position', 'direction', 'energy', 'weight')))
+
+
+@dataclass
+class MonteCarloResult:
+    responses: np.ndarray  # per-sample sensor responses, (samples, sensors)
+    tallies: np.ndarray  # per-sample flux on FLUX_ENERGIES, uncollided and scattered, (samples, sensors, 2, nodes)
+    particles_per_sample: int
+
+    @property
+    def energies(self):
+        return FLUX_ENERGIES
+
+    @property
+    def samples(self):
+        return len(self.responses)
+
+
+def relative_errors(total, squares, count):
+    """Relative standard error of the mean from running sums of ``count`` estimates"""
+    mean = total / count
+    variance = np.maximum(squares - total * mean, 0.0) / (count - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(mean > 0, np.sqrt(variance / count) / mean, 0.0)
+
+
+class PhotonTransport:
+    """Photon histories of a scene scored at its sensors"""
+
+    # Arrays besides the geometry's that describe a transport problem
+    ARRAYS = (
+        'primitive_materials', 'total', 'compton', 'pair', 'majorant',
+        'sensors', 'line_energies', 'line_emissions', 'line_primitives',
+    )
+
+    def __init__(self, geometry, primitive_materials, table, sensors, responses,
+                 line_energies, line_emissions, line_primitives, meshes=None, importance=None):
+        self.geometry = geometry
+        self.importance = importance
+        self.primitive_materials = primitive_materials
+        self.material_count = len(table.total) - 1
+        self.table = table
+        self.sensors = sensors
+        self.responses = list(responses)
+        # Response of each sensor per uncollided and scattered flux node, (sensors, 2, nodes)
+        self.coefficients = np.array([
+            [response_coefficients(r, FLUX_ENERGIES), response_coefficients(r, FLUX_ENERGIES) * (r not in UNCOLLIDED_RESPONSES)]
+            for r in self.responses
+        ]).reshape(len(self.responses), 2, len(FLUX_ENERGIES))
+
+        self.line_energies = line_energies
+        self.line_emissions = line_emissions
+        self.line_primitives = line_primitives
+        self.source_rate = line_emissions.sum()
+        self.line_probabilities = line_emissions / self.source_rate
+        self.meshes = meshes or {}
+        # Emission samplers by primitive: the source mesh, or the primitive itself
+        self.sources = {int(p): self.meshes.get(int(p)) or geometry.primitive(p) for p in np.unique(line_primitives)}
+
+        # Photons cannot collide outside the box of all material primitives
+        lower, upper = geometry.bounds
+        solid = primitive_materials >= 0
+        self.lower = lower[solid].min(axis=0) if solid.any() else np.zeros(3)
+        self.upper = upper[solid].max(axis=0) if solid.any() else np.zeros(3)
+        self.has_materials = bool(solid.any())
+
+    @classmethod
+    def from_scene(cls, scene, importance=None):
+        return cls(
+            scene.geometry,
+            np.asarray(scene.primitive_materials, dtype=np.int64).reshape(-1),
+            InteractionTable.from_scene(scene),
+            np.array([s.position for s in scene.sensors], dtype=float).reshape(-1, 3),
+            [s.response_function for s in scene.sensors],
+            np.concatenate([s.energies for s in scene.sources]),
+            np.concatenate([s.emissions for s in scene.sources]),
+            np.concatenate([[s.primitive] * len(s.energies) for s in scene.sources]).astype(np.int64),
+            {s.primitive: s.mesh for s in scene.sources if s.mesh is not None},
+            importance,
+        )
+
+    def arrays(self):
+        """Every array of the problem by name, to be rebuilt with ``from_arrays``"""
+        table = {name: getattr(self.table, name) for name in ('total', 'compton', 'pair', 'majorant')}
+        own = {name: getattr(self, name) for name in self.ARRAYS if name not in table}
+        meshes = {
+            f'mesh{p}.{name}': getattr(mesh, name) for p, mesh in self.meshes.items() for name in SourceMesh.ARRAYS
+        }
+        importance = {
+            f'importance.{name}': getattr(self.importance, name) for name in ImportanceMap.ARRAYS
+        } if self.importance is not None else {}
+        return {**self.geometry.arrays(), **table, **own, **meshes, **importance}
+
+    def metadata(self):
+        """The non-array arguments of ``from_arrays``"""
+        return {'responses': self.responses, 'mesh_systems': {p: mesh.system for p, mesh in self.meshes.items()}}
+
+    @classmethod
+    def from_arrays(cls, arrays, responses, mesh_systems=None):
+        geometry = CompiledGeometry.from_arrays(arrays)
+        meshes = {
+            p: SourceMesh(geometry.primitive(p), system, *(arrays[f'mesh{p}.{name}'] for name in SourceMesh.ARRAYS))
+            for p, system in (mesh_systems or {}).items()
+        }
+        importance = None
+        if 'importance.targets' in arrays:
+            importance = ImportanceMap(*(arrays[f'importance.{name}'] for name in ImportanceMap.ARRAYS))
+        return cls(
+            geometry,
+            arrays['primitive_materials'],
+            InteractionTable(arrays['total'], arrays['compton'], arrays['pair'], arrays['majorant']),
+            arrays['sensors'], responses,
+            arrays['line_energies'], arrays['line_emissions'], arrays['line_primitives'], meshes, importance,
+        )
+
+    def enter_bounds(self, particles):
+        """Move photons outside the material box to where they enter it, dropping those that miss it"""
+        position, direction = particles.position, particles.direction
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t1 = (self.lower - position) / direction
+            t2 = (self.upper - position) / direction
+        parallel = direction == 0
+        inside = (self.lower <= position) & (position <= self.upper)
+        near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2)).max(axis=1)
+        far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2)).min(axis=1)
+        enter = np.maximum(near, 0.0)
+        particles.position = position + enter[:, None] * direction
+        return particles.select(enter <= far)
+
+    def emit(self, rng, count):
+        """Source photons of one sample, each carrying an equal share of the emission rate"""
+        lines = rng.choice(len(self.line_energies), size=count, p=self.line_probabilities)
+        primitives = self.line_primitives[lines]
+        position = np.empty((count, 3))
+        for index, primitive in self.sources.items():
+            chosen = np.flatnonzero(primitives == index)
+            position[chosen] = primitive.sample(rng, len(chosen))
+        return Particles(position, isotropic(rng, count), self.line_energies[lines], np.full(count, self.source_rate / count))
+
+    def score(self, positions, branches, tally):
+        """Add next-event contributions of ``branches`` [(energies, factors, component)]
+        at ``positions`` (K, 3), with energies and factors of shape (K, sensors) and
+        component 0 for uncollided, 1 for scattered flux"""
+        count, sensor_count = len(positions), len(self.sensors)
+        origins = np.repeat(positions, sensor_count, axis=0)
+        ends = np.tile(self.sensors, (count, 1))
+        lengths = self.geometry.path_lengths(origins, ends, self.primitive_materials, self.material_count)
+        distance_squared = np.maximum(np.sum((ends - origins) ** 2, axis=1), MIN_DISTANCE_SQUARED).reshape(count, sensor_count)
+
+        nodes = len(FLUX_ENERGIES)
+        for energies, factors, component in branches:
+            mfp = np.einsum('nm,mn->n', lengths, self.table.attenuation(energies.ravel())).reshape(count, sensor_count)
+            flux = (factors * np.exp(-mfp) / distance_squared).ravel()
+            lower, upper_share = flux_nodes(energies)
+            index = (lower + (np.arange(sensor_count) * 2 + component) * nodes).ravel()
+            upper_share = np.broadcast_to(upper_share, (count, sensor_count)).ravel()
+            tally += (
+                np.bincount(index, flux * (1 - upper_share), minlength=tally.size)
+                + np.bincount(index + 1, flux * upper_share, minlength=tally.size)
+            ).reshape(tally.shape)
+
+    def sensor_responses(self, tallies):
+        """Each sensor's own response (..., sensors) of tallies (..., sensors, 2, nodes)"""
+        return np.einsum('...scn,scn->...s', tallies, self.coefficients)
+
+    def collide(self, rng, particles, materials, tally):
+        """Score and scatter photons at real collision sites in ``materials``"""
+        _, compton, pair = self.table.lookup(materials, particles.energy)
+        survival = compton + pair
+        particles.weight = particles.weight * survival
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pair_share = np.where(survival > 0, pair / survival, 0.0)
+
+        to_sensors = self.sensors[None] - particles.position[:, None]
+        to_sensors /= np.maximum(np.linalg.norm(to_sensors, axis=2, keepdims=True), 1e-12)
+        cosines = np.einsum('ki,ksi->ks', particles.direction, to_sensors)
+        density, scattered = klein_nishina_density(particles.energy[:, None], cosines)
+        weight = particles.weight[:, None]
+        self.score(particles.position, [
+            (scattered, weight * (1 - pair_share)[:, None] * density, 1),
+            (np.full_like(scattered, ELECTRON_MASS), weight * pair_share[:, None] * 2 / (4 * np.pi), 1),
+        ], tally)
+
+        pairs = rng.random(len(particles.energy)) < pair_share
+        energy, cosine = sample_compton(rng, particles.energy)
+        particles.direction = np.where(
+            pairs[:, None], isotropic(rng, len(pairs)), rotate(rng, particles.direction, cosine)
+        )
+        particles.energy = np.where(pairs, ELECTRON_MASS, energy)
+        particles.weight = np.where(pairs, 2 * particles.weight, particles.weight)
+        return particles
+
+    def run_sample(self, rng, count):
+        """Energy-resolved flux (sensors, 2, nodes) of ``count`` source photons"""
+        tally = np.zeros((len(self.sensors), 2, len(FLUX_ENERGIES)))
+        particles = self.emit(rng, count)
+        shape = (count, len(self.sensors))
+        self.score(particles.position, [(
+            np.broadcast_to(particles.energy[:, None], shape),
+            np.broadcast_to(particles.weight[:, None] / (4 * np.pi), shape),
+            0,
+        )], tally)
+        if not self.has_materials:
+            return tally
+
+        source_weight = self.source_rate / count
+        roulette_weight = ROULETTE_WEIGHT * source_weight
+        while len(particles.energy):
+            particles = self.enter_bounds(particles)
+            majorant = self.table.majorant_at(particles.energy)
+            distance = -np.log1p(-rng.random(len(majorant))) / np.maximum(majorant, 1e-30)
+            particles.position = particles.position + distance[:, None] * particles.direction
+            particles = particles.select(majorant > 0)
+
+            materials = self.geometry.locate(particles.position, self.primitive_materials)
+            mu, _, _ = self.table.lookup(materials, particles.energy)
+            real = rng.random(len(mu)) * self.table.majorant_at(particles.energy) < mu
+            collided = self.collide(rng, particles.select(real), materials[real], tally)
+            virtual = particles.select(~real)
+
+            particles = Particles.concatenate([virtual, collided])
+            particles = particles.select(particles.energy >= ENERGY_CUTOFF)
+            if self.importance is not None:
+                particles = self.importance.windows(rng, particles, source_weight)
+                continue
+            low = particles.weight < roulette_weight
+            survives = rng.random(len(low)) < ROULETTE_SURVIVAL
+            particles.weight = np.where(low, particles.weight / ROULETTE_SURVIVAL, particles.weight)
+            particles = particles.select(~low | survives)
+        return tally
+
+
+def monte_carlo(scene, particles_per_sample=10000, max_samples=100, convergence_criterion=0.01, seed=0, workers=1,
+                progress=None, importance=None):
+    """Transport samples of photons until every sensor converges or ``max_samples`` is reached.
+
+    Sample ``i`` uses the ``i``-th stream spawned from ``seed``; with
+    ``workers > 1`` samples run in a process pool and give the same result.
+    ``progress(samples, max_samples, largest relative error)`` is called
+    after every sample. ``importance`` is an ``importance.ImportanceMap`` of
+    weight windows, analog transport with roulette when None.
+    """
+    if not scene.sensors:
+        raise ValueError('The project has no sensors')
+    if not scene.sources:
+        raise ValueError('The project has no source volume with a line spectrum')
+
+    transport = PhotonTransport.from_scene(scene, importance)
+    streams = np.random.SeedSequence(seed).spawn(max_samples)
+    if workers > 1:
+        samples = parallel_samples(transport, streams, particles_per_sample, workers)
+    else:
+        samples = (transport.run_sample(np.random.default_rng(stream), particles_per_sample) for stream in streams)
+
+    tallies, responses = [], []
+    total = squares = 0.0
+    try:
+        for tally in samples:
+            response = transport.sensor_responses(tally)
+            tallies.append(tally)
+            responses.append(response)
+            total = total + response
+            squares = squares + response ** 2
+            count = len(responses)
+            errors = relative_errors(total, squares, count) if count > 1 else None
+            if progress:
+                progress(count, max_samples, float(errors.max()) if errors is not None else None)
+            if count >= MIN_SAMPLES and np.all(errors < convergence_criterion):
+                break
+    finally:
+        samples.close()
+    return MonteCarloResult(np.array(responses), np.array(tallies), particles_per_sample)
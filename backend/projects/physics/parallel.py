@@ -0,0 +1,108 @@
+"""
+Parallel execution of Monte-Carlo samples.
+
+The arrays of a transport problem are copied once into a shared memory
+block. Pool workers attach to it when they start and rebuild the problem
+from views into the block, so tasks carry nothing but a sample's
+``SeedSequence`` stream. Sample ``i`` always draws from the ``i``-th
+stream spawned from the run seed, and results are reduced in sample
+order, so a run is bit-identical whatever the number of workers.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Bytes between arrays in the shared block
+ALIGNMENT = 64
+
+_WORKER = {}
+
+
+class SharedArrays:
+    """NumPy arrays copied into one shared memory block"""
+
+    def __init__(self, arrays):
+        self.layout = {}
+        size = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            self.layout[name] = (array.dtype.str, array.shape, size)
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, view in self.views(self.memory, self.layout).items():
+            view[...] = arrays[name]
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @staticmethod
+    def views(memory, layout):
+        """Arrays of ``layout`` backed by ``memory``"""
+        return {
+            name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+            for name, (dtype, shape, offset) in layout.items()
+        }
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _initialize_worker(memory_name, layout, metadata):
+    """Attach to the shared problem and rebuild the transport once per worker"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from .monte_carlo import PhotonTransport
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    _WORKER['memory'] = memory
+    _WORKER['transport'] = PhotonTransport.from_arrays(SharedArrays.views(memory, layout), **metadata)
+
+
+def _run_sample(stream, count):
+    return _WORKER['transport'].run_sample(np.random.default_rng(stream), count)
+
+
+def _context():
+    """Fork where available so workers inherit the loaded Django apps"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+
+def parallel_samples(transport, streams, count, workers):
+    """Sample tallies of ``transport``, one per stream, yielded in stream order.
+
+    At most two tasks per worker are in flight; closing the generator
+    cancels the samples that are no longer needed.
+    """
+    with SharedArrays(transport.arrays()) as shared, ProcessPoolExecutor(
+        max_workers=workers, mp_context=_context(), initializer=_initialize_worker,
+        initargs=(shared.name, shared.layout, transport.metadata()),
+    ) as pool:
+        pending = deque()
+        streams = iter(streams)
+        try:
+            while True:
+                while len(pending) < 2 * workers:
+                    stream = next(streams, None)
+                    if stream is None:
+                        break
+                    pending.append(pool.submit(_run_sample, stream, count))
+                if not pending:
+                    return
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
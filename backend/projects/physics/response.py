@@ -0,0 +1,110 @@
+"""
+Sensor response functions.
+
+A response converts the photon flux at a sensor (γ/cm²/s, per emission
+line or energy node) into the quantity chosen by
+``Sensor.response_function``. Each response is a per-energy coefficient,
+interpolated log-log in fluence-to-dose tables (ICRP 74 for H*(10) and air
+kerma, ICRP 116 for the AP effective dose); the sensor reading is the sum
+of the energy-resolved flux weighted by it.
+
+Engines keep the flux resolved in energy, so every response of a sensor
+follows from one run: ``all_responses`` evaluates the whole library as a
+matrix product. Continuous (scattered) spectra are deposited on the
+``FLUX_ENERGIES`` nodes, split linearly between the two nodes around each
+energy so the energy flux is preserved exactly.
+"""
+import numpy as np
+
+# ICRP 74: ambient dose equivalent per fluence, H*(10)/Φ in pSv·cm²
+AMBIENT_DOSE_ENERGIES = np.array([
+    0.010, 0.015, 0.020, 0.030, 0.040, 0.050, 0.060, 0.080, 0.100, 0.150, 0.200, 0.300,
+    0.400, 0.500, 0.600, 0.800, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0,
+])
+AMBIENT_DOSE_COEFFICIENTS = np.array([
+    0.061, 0.83, 1.05, 0.81, 0.64, 0.55, 0.51, 0.53, 0.61, 0.89, 1.20, 1.80,
+    2.38, 2.93, 3.44, 4.38, 5.20, 6.90, 8.60, 11.1, 13.4, 15.5, 17.6, 21.6, 25.6,
+])
+
+# ICRP 116: effective dose per fluence, anterior-posterior irradiation, E/Φ in pSv·cm²
+EFFECTIVE_DOSE_ENERGIES = np.array([
+    0.010, 0.015, 0.020, 0.030, 0.040, 0.050, 0.060, 0.070, 0.080, 0.100, 0.150, 0.200,
+    0.300, 0.400, 0.500, 0.511, 0.600, 0.662, 0.800, 1.0, 1.117, 1.33, 1.5, 2.0, 3.0,
+    4.0, 5.0, 6.0, 6.129, 8.0, 10.0,
+])
+EFFECTIVE_DOSE_COEFFICIENTS = np.array([
+    0.0685, 0.156, 0.225, 0.312, 0.350, 0.369, 0.389, 0.411, 0.443, 0.518, 0.747, 1.00,
+    1.51, 2.00, 2.47, 2.52, 2.91, 3.17, 3.73, 4.49, 4.90, 5.59, 6.12, 7.48, 9.75,
+    11.7, 13.4, 15.0, 15.1, 17.8, 20.5,
+])
+
+# ICRP 74: air kerma free-in-air per fluence, K/Φ in pGy·cm², on AMBIENT_DOSE_ENERGIES
+AIR_KERMA_COEFFICIENTS = np.array([
+    7.60, 3.21, 1.73, 0.739, 0.438, 0.328, 0.292, 0.308, 0.372, 0.600, 0.856, 1.38,
+    1.89, 2.38, 2.84, 3.69, 4.47, 6.14, 7.55, 9.96, 12.1, 14.1, 16.1, 20.1, 24.0,
+])
+
+# pSv/s -> μSv/h (and pGy/s -> μGy/h)
+PSV_PER_S_TO_USV_PER_H = 3600 * 1e-6
+# μGy -> mrad
+USV_TO_MRAD = 0.1
+# Air kerma of one röntgen, Gy/R (W/e = 33.97 J/C, bremsstrahlung neglected)
+AIR_KERMA_PER_ROENTGEN = 8.764e-3
+
+RESPONSE_UNITS = {
+    'ambient_dose': 'μSv/h',
+    'effective_dose': 'μSv/h',
+    'kerma_air': 'μGy/h',
+    'kerma_rad': 'mrad/h',
+    'exposure': 'mR/h',
+    'energy_flux': 'MeV/cm²/s',
+    'uncollided_flux': 'γ/cm²/s',
+}
+
+# Nodes (MeV) of energy-resolved continuous fluxes
+FLUX_ENERGIES = np.geomspace(1e-3, 20.0, 241)
+
+# Responses that are evaluated without buildup
+UNCOLLIDED_RESPONSES = {'uncollided_flux'}
+
+
+def _log_log(energies, table_energies, table_values):
+    energies = np.clip(energies, table_energies[0], table_energies[-1])
+    return np.exp(np.interp(np.log(energies), np.log(table_energies), np.log(table_values)))
+
+
+def response_coefficients(response_function, energies):
+    """Per-line factors turning flux (γ/cm²/s) into the response unit"""
+    energies = np.asarray(energies, dtype=float)
+    if response_function == 'ambient_dose':
+        return _log_log(energies, AMBIENT_DOSE_ENERGIES, AMBIENT_DOSE_COEFFICIENTS) * PSV_PER_S_TO_USV_PER_H
+    if response_function == 'effective_dose':
+        return _log_log(energies, EFFECTIVE_DOSE_ENERGIES, EFFECTIVE_DOSE_COEFFICIENTS) * PSV_PER_S_TO_USV_PER_H
+    if response_function in ('kerma_air', 'kerma_rad', 'exposure'):
+        kerma = _log_log(energies, AMBIENT_DOSE_ENERGIES, AIR_KERMA_COEFFICIENTS) * PSV_PER_S_TO_USV_PER_H
+        if response_function == 'kerma_rad':
+            return kerma * USV_TO_MRAD
+        if response_function == 'exposure':
+            return kerma * 1e-6 / AIR_KERMA_PER_ROENTGEN * 1e3
+        return kerma
+    if response_function == 'energy_flux':
+        return energies.copy()
+    if response_function == 'uncollided_flux':
+        return np.ones_like(energies)
+    raise ValueError(f'Unsupported response function: {response_function}')
+
+
+def all_responses(energies, flux, uncollided):
+    """Every response of fluxes (..., E) at ``energies`` (MeV), by response name"""
+    return {
+        name: (uncollided if name in UNCOLLIDED_RESPONSES else flux) @ response_coefficients(name, energies)
+        for name in RESPONSE_UNITS
+    }
+
+
+def flux_nodes(energies):
+    """Lower ``FLUX_ENERGIES`` node of each energy and the share going to the node above"""
+    energies = np.clip(energies, FLUX_ENERGIES[0], FLUX_ENERGIES[-1])
+    lower = np.clip(np.searchsorted(FLUX_ENERGIES, energies, side='right') - 1, 0, len(FLUX_ENERGIES) - 2)
+    upper_share = (energies - FLUX_ENERGIES[lower]) / (FLUX_ENERGIES[lower + 1] - FLUX_ENERGIES[lower])
+    return lower, upper_share
@@ -0,0 +1,234 @@
+"""
+Shielding scene assembled from a project's models.
+
+Collects everything the dose engines need into NumPy-friendly containers:
+one shape per volume (a primitive, or a CSG ``Solid`` when its geometry
+is the result of ``CSGOperation`` rows) with its material index, the distinct materials
+(composition at the volume's density), the sources with their photon
+lines or groups (``source_terms``) and the sensors.
+"""
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+from django.conf import settings
+
+from elements.photon import load_photon_table
+from ..models import CSGOperation, Geometry, MeshConfiguration, Volume, Sensor
+from .csg import OPERATIONS, Solid
+from .buildup import at_energies, material_parameters
+from .geometry import Primitive, compile_geometry
+from .materials import compile_composition, compile_material
+from .mesh import source_mesh
+from .source_terms import source_emissions, source_nuclides
+
+
+@dataclass
+class Material:
+    name: str
+    elements: list
+    density: float  # g/cm³
+    compiled: object = None  # materials.CompiledMaterial, compiled on first use when None
+
+    def compile(self, table=None):
+        """The compiled material, compiling it on first use"""
+        if self.compiled is None:
+            self.compiled = compile_material(self.elements, table)
+        return self.compiled
+
+    def attenuation(self, energies, table=None):
+        """Linear attenuation coefficient μ (1/cm) at ``energies`` (MeV)"""
+        return self.compile(table).attenuation(energies, self.density)
+
+
+@dataclass
+class Source:
+    name: str
+    primitive: int  # index into Scene.primitives
+    energies: np.ndarray  # MeV
+    emissions: np.ndarray  # γ/s per line
+    mesh: object = None  # mesh.SourceMesh when the volume has a mesh configuration
+    nuclides: dict = None  # activity (Bq) by nuclide of isotope sources
+    groups: object = None  # group boundaries (keV) when emissions are collapsed onto groups
+
+    def sample(self, primitives, rng, count):
+        """Emission points of the source, stratified over its mesh cells if it has one"""
+        return (self.mesh or primitives[self.primitive]).sample(rng, count)
+
+
+@dataclass
+class SensorPoint:
+    id: int
+    name: str
+    position: np.ndarray  # cm
+    response_function: str
+    buildup_type: str
+    buildup_material: object = None  # CompiledMaterial of the selected composition
+    equi_importance: bool = False  # shares one Monte-Carlo importance term with the other such sensors
+
+
+@dataclass
+class Scene:
+    primitives: list = field(default_factory=list)  # geometry.Primitive or csg.Solid per volume
+    materials: list = field(default_factory=list)
+    primitive_materials: list = field(default_factory=list)  # material index per primitive, -1 = vacuum
+    volumes: list = field(default_factory=list)  # Volume id per primitive
+    sources: list = field(default_factory=list)
+    sensors: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    photon_table: object = None  # elements.photon.PhotonTable, bundled data when None
+
+    @cached_property
+    def geometry(self):
+        """The scene primitives packed for tracing"""
+        return compile_geometry(self.primitives)
+
+    @property
+    def energies(self):
+        """Sorted distinct source line energies (MeV)"""
+        if not self.sources:
+            return np.empty(0)
+        return np.unique(np.concatenate([s.energies for s in self.sources]))
+
+    def attenuation_table(self, energies):
+        """μ (1/cm) of every material at ``energies``, shape (materials, energies)"""
+        if not self.materials:
+            return np.zeros((0, len(energies)))
+        return np.array([m.attenuation(energies, self.photon_table) for m in self.materials])
+
+    def buildup_parameters(self, energies):
+        """G-P coefficients of every material at ``energies``, shape (materials, energies, 5)"""
+        if not self.materials:
+            return np.zeros((0, len(energies), 5))
+        return np.array([
+            at_energies(material_parameters(m.compile(self.photon_table)), energies) for m in self.materials
+        ])
+
+
+def _geometry_primitive(geometry):
+    return Primitive.from_geometry(
+        geometry.geometry_type, geometry.position, geometry.rotation, geometry.scale, geometry.geometry_parameters
+    )
+
+
+def _operand_id(value):
+    """Geometry id of a CSG operand, or None when it cannot be read"""
+    try:
+        return int(value['id'] if isinstance(value, dict) else value)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def geometry_shape(geometry, geometries, operations, warnings, path=()):
+    """Primitive of a geometry, or the CSG solid of the latest operation producing it.
+
+    Operations that cannot be traced (unsupported, cyclic or with a missing
+    operand) leave the geometry its own shape, with a warning.
+    """
+    operation = operations.get(geometry.pk)
+    if operation is None:
+        return _geometry_primitive(geometry)
+    if geometry.pk in path:
+        warnings.append(f'CSG operations on {geometry.name} form a cycle, its own shape is used')
+        return _geometry_primitive(geometry)
+    if operation.operation_type not in OPERATIONS:
+        warnings.append(f'CSG {operation.operation_type} of {geometry.name} is not supported, its own shape is used')
+        return _geometry_primitive(geometry)
+    operands = []
+    for value in operation.source_objects or []:
+        operand = geometries.get(_operand_id(value))
+        if operand is None:
+            warnings.append(
+                f'CSG operation of {geometry.name} refers to a missing geometry {value!r}, its own shape is used'
+            )
+            return _geometry_primitive(geometry)
+        operands.append(geometry_shape(operand, geometries, operations, warnings, path + (geometry.pk,)))
+    if len(operands) == 1:
+        return operands[0]
+    return Solid(operation.operation_type, operands)
+
+
+def load_scene(project):
+    """Build the shielding scene of a project"""
+    scene = Scene(photon_table=load_photon_table())
+    material_index = {}
+
+    meshes = {
+        mesh.volume_id: mesh
+        for mesh in MeshConfiguration.objects.filter(volume__project=project, volume__is_source=True).order_by('id')
+    }
+    # The latest operation producing a geometry defines its shape
+    operations = {
+        operation.result_object_id: operation
+        for operation in CSGOperation.objects.filter(project=project).order_by('created_at', 'id')
+    }
+    geometries = Geometry.objects.filter(project=project).in_bulk() if operations else {}
+    volumes = Volume.objects.filter(project=project).select_related('geometry', 'composition', 'spectrum')
+    for volume in volumes:
+        scene.primitives.append(geometry_shape(volume.geometry, geometries, operations, scene.warnings))
+        index = len(scene.primitives) - 1
+        scene.volumes.append(volume.pk)
+
+        composition = volume.composition
+        if composition is None or not composition.elements:
+            scene.primitive_materials.append(-1)
+        else:
+            density = volume.real_density or composition.density
+            key = (composition.pk, density)
+            if key not in material_index:
+                material_index[key] = len(scene.materials)
+                scene.materials.append(Material(
+                    composition.name, composition.elements, density,
+                    compile_composition(composition, scene.photon_table)
+                ))
+            scene.primitive_materials.append(material_index[key])
+
+        if not volume.is_source:
+            continue
+        if volume.spectrum is None:
+            scene.warnings.append(f'Source {volume.volume_name} has no spectrum and was skipped')
+            continue
+        spectrum = volume.spectrum
+        by_isotope = spectrum.spectrum_type != 'line' or (volume.gamma_selection_mode == 'by-isotope' and bool(spectrum.isotopes))
+        grouped = 'by-groups' in (volume.gamma_selection_mode, volume.calculation_mode)
+        energies, emissions, warnings = source_emissions(spectrum, by_isotope=by_isotope, grouped=grouped)
+        scene.warnings.extend(warnings)
+        if not len(energies):
+            continue
+        mesh = None
+        if volume.pk in meshes and isinstance(scene.primitives[index], Solid):
+            scene.warnings.append(f'Source {volume.volume_name} is a CSG solid, its mesh is ignored and the whole volume is sampled')
+        elif volume.pk in meshes:
+            configuration = meshes[volume.pk]
+            try:
+                mesh = source_mesh(
+                    scene.primitives[index], configuration.coordinate_system,
+                    configuration.bounds, configuration.subdivisions
+                )
+            except (ValueError, TypeError, KeyError) as e:
+                scene.warnings.append(f'Mesh of source {volume.volume_name} is invalid ({e}), the whole volume is sampled')
+        scene.sources.append(Source(
+            volume.volume_name, index, energies, emissions, mesh,
+            nuclides=source_nuclides(spectrum) if by_isotope else None,
+            groups=np.asarray(settings.SOURCE_GROUP_BOUNDARIES, dtype=float) if grouped else None,
+        ))
+
+    for sensor in Sensor.objects.filter(project=project).select_related('selected_composition'):
+        coordinates = sensor.coordinates or {}
+        buildup_material = None
+        if sensor.buildup_type == 'composition':
+            if sensor.selected_composition and sensor.selected_composition.elements:
+                buildup_material = compile_composition(sensor.selected_composition, scene.photon_table)
+            else:
+                scene.warnings.append(f'Sensor {sensor.name} has no buildup composition, automatic buildup is used')
+        scene.sensors.append(SensorPoint(
+            id=sensor.pk,
+            name=sensor.name,
+            position=np.array([float(coordinates.get(axis, 0.0)) for axis in 'xyz']),
+            response_function=sensor.response_function,
+            buildup_type=sensor.buildup_type,
+            buildup_material=buildup_material,
+            equi_importance=sensor.equi_importance,
+        ))
+
+    return scene
@@ -0,0 +1,130 @@
+"""
+Photon source terms of spectra.
+
+A spectrum emits either its own lines (``Spectrum.lines``, energies in
+keV and intensities in γ/s) or the gamma lines of its isotopes
+(``Spectrum.isotopes``), both scaled by the spectrum multiplier. An
+isotope entry is a nuclide symbol emitting 1 Bq, or
+``{'isotope': 'Co-60', 'activity': Bq, 'equilibrium': bool}``. Isotopes
+emit their ``GammaSpectrum`` lines and, in equilibrium (by default
+``settings.SOURCE_DAUGHTERS_IN_EQUILIBRIUM``), those of their shorter-lived
+descendants reached through ``DecayPath``.
+
+Computed by groups, emissions are collapsed onto a group structure
+(boundaries in keV, ``settings.SOURCE_GROUP_BOUNDARIES``): each group
+emits at its mid energy the number of photons that carries the energy of
+its lines, so the emitted power is kept while the engines see a few
+group energies instead of every line. Lines outside the structure fall
+into its first or last group. The group vector per decay of every
+isotope is cached, so a source of many nuclides is a sum of cached
+vectors.
+"""
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from elements.decay import load_decay_data, nuclide_key
+
+CACHE_SIZE = 512
+
+_GROUP_VECTORS = OrderedDict()  # (data version, nuclide, boundaries, equilibrium) -> photons per decay
+
+
+def group_energies(boundaries):
+    """Mid energies (keV) of the groups between ``boundaries``"""
+    boundaries = np.asarray(boundaries, dtype=float)
+    return (boundaries[:-1] + boundaries[1:]) / 2
+
+
+def collapse(energies, emissions, boundaries):
+    """Photons per group at the group mid energies with the power of lines ``energies`` (keV)"""
+    mids = group_energies(boundaries)
+    groups = np.clip(np.searchsorted(boundaries, energies, side='right') - 1, 0, len(mids) - 1)
+    return np.bincount(groups, weights=np.asarray(emissions) * np.asarray(energies), minlength=len(mids)) / mids
+
+
+def isotope_lines(data, symbol, equilibrium):
+    """Line energies (keV) and photons per decay of a nuclide, with its chain in equilibrium"""
+    chain = data.equilibrium_chain(symbol) if equilibrium else [(data[symbol], 1.0)]
+    energies = np.concatenate([nuclide.energies for nuclide, _ in chain])
+    photons = np.concatenate([nuclide.intensities * ratio for nuclide, ratio in chain])
+    return energies, photons
+
+
+def isotope_group_vector(data, symbol, boundaries, equilibrium):
+    """Photons per decay of a nuclide in each group, cached per nuclear data version"""
+    key = (data.version, nuclide_key(symbol), tuple(boundaries), bool(equilibrium))
+    vector = _GROUP_VECTORS.get(key)
+    if vector is None:
+        vector = collapse(*isotope_lines(data, symbol, equilibrium), boundaries)
+        _GROUP_VECTORS[key] = vector
+        if len(_GROUP_VECTORS) > CACHE_SIZE:
+            _GROUP_VECTORS.popitem(last=False)
+    else:
+        _GROUP_VECTORS.move_to_end(key)
+    return vector
+
+
+def isotope_entries(isotopes, equilibrium):
+    """(nuclide, activity in Bq, equilibrium) of every entry of ``Spectrum.isotopes``"""
+    entries = []
+    for entry in isotopes or []:
+        if isinstance(entry, dict):
+            symbol = entry.get('isotope') or entry.get('symbol')
+            entries.append((symbol, float(entry.get('activity', 1.0)), bool(entry.get('equilibrium', equilibrium))))
+        else:
+            entries.append((entry, 1.0, equilibrium))
+    return entries
+
+
+def source_nuclides(spectrum, equilibrium=None):
+    """Activities (Bq) by nuclide of a spectrum's isotopes, with their chains in equilibrium"""
+    if equilibrium is None:
+        equilibrium = settings.SOURCE_DAUGHTERS_IN_EQUILIBRIUM
+    data = load_decay_data()
+    activities = {}
+    for symbol, activity, chain in isotope_entries(spectrum.isotopes, equilibrium):
+        if symbol not in data or activity <= 0:
+            continue
+        for nuclide, ratio in data.equilibrium_chain(symbol) if chain else [(data[symbol], 1.0)]:
+            activities[nuclide.key] = activities.get(nuclide.key, 0.0) + activity * ratio * spectrum.multiplier
+    return activities
+
+
+def source_emissions(spectrum, by_isotope=False, grouped=False, boundaries=None, equilibrium=None):
+    """Energies (MeV) and emission rates (γ/s) of a spectrum, and warnings about its isotopes"""
+    boundaries = np.asarray(boundaries or settings.SOURCE_GROUP_BOUNDARIES, dtype=float)
+    if equilibrium is None:
+        equilibrium = settings.SOURCE_DAUGHTERS_IN_EQUILIBRIUM
+    warnings = []
+
+    if not by_isotope:
+        lines = [line for line in spectrum.lines or [] if float(line.get('intensity', 0)) > 0]
+        energies = np.array([float(line['energy']) for line in lines])
+        emissions = np.array([float(line['intensity']) for line in lines])
+        if grouped and len(energies):
+            energies, emissions = group_energies(boundaries), collapse(energies, emissions, boundaries)
+    else:
+        data = load_decay_data()
+        known = []
+        for symbol, activity, chain in isotope_entries(spectrum.isotopes, equilibrium):
+            if symbol not in data:
+                warnings.append(f'Isotope {symbol} of spectrum {spectrum.name} has no decay data and was skipped')
+            elif activity > 0:
+                known.append((symbol, activity, chain))
+        if grouped:
+            energies = group_energies(boundaries)
+            emissions = np.zeros(len(energies))
+            for symbol, activity, chain in known:
+                emissions += activity * isotope_group_vector(data, symbol, boundaries, chain)
+        else:
+            lines = [isotope_lines(data, symbol, chain) for symbol, _, chain in known]
+            energies = np.concatenate([e for e, _ in lines]) if lines else np.empty(0)
+            emissions = np.concatenate([p * a for (_, p), (_, a, _) in zip(lines, known)]) if lines else np.empty(0)
+            # Lines shared by several nuclides are emitted once
+            energies, index = np.unique(energies, return_inverse=True)
+            emissions = np.bincount(index, weights=emissions, minlength=len(energies))
+
+    keep = emissions > 0
+    return energies[keep] / 1000.0, emissions[keep] * spectrum.multiplier, warnings  # keV -> MeV
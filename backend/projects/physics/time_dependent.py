@@ -0,0 +1,108 @@
+"""
+Dose rates of decaying sources.
+
+The response of a sensor is linear in the activities of the nuclides of
+each source, so it factors into per-nuclide kernels K (sensors, nuclides)
+computed once and the decayed inventories A(t) (``elements.decay``):
+
+    dose(t) = Σ_sources K · A(t)
+
+A kernel column is the response to one decay of a nuclide: the sensor
+responses per unit emission at every line energy of the source (one
+point-kernel run with all its lines, or its groups when it is computed
+by groups) weighted by the photons per decay of the nuclide at those
+energies. The source inventory starts from the activities of its
+isotopes, with their equilibrium daughters, and every descendant the
+chain can reach gets a column, so daughter ingrowth costs no transport.
+Sources given by lines only have no inventory and contribute a constant
+dose rate.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from elements.decay import load_decay_data
+from .point_kernel import point_kernel
+from .response import UNCOLLIDED_RESPONSES, response_coefficients
+from .source_terms import collapse, group_energies
+
+
+@dataclass
+class SourceInventory:
+    name: str
+    nuclides: list  # nuclide keys, parents first
+    kernels: np.ndarray  # response per Bq, shape (sensors, nuclides)
+    activities: np.ndarray  # Bq, shape (times, nuclides)
+
+
+@dataclass
+class TimeSeries:
+    times: np.ndarray  # s
+    rates: np.ndarray  # response, shape (times, sensors)
+    constant: np.ndarray  # response of sources without inventory, shape (sensors,)
+    inventories: list  # SourceInventory per isotope source
+
+    def contributions(self):
+        """Response (times, sensors) of every nuclide, summed over sources"""
+        totals = {}
+        for inventory in self.inventories:
+            for i, key in enumerate(inventory.nuclides):
+                part = inventory.activities[:, i:i + 1] * inventory.kernels[:, i]
+                totals[key] = totals[key] + part if key in totals else part
+        return totals
+
+
+def unit_responses(scene, source, energies, points_per_source, seed):
+    """Responses (sensors, E) of a source emitting one photon per second at each of ``energies`` (MeV)"""
+    unit = replace(source, energies=energies, emissions=np.ones(len(energies)))
+    kernel = point_kernel(replace(scene, sources=[unit]), points_per_source, seed=seed)
+    flux, uncollided = kernel.flux.mean(axis=0), kernel.uncollided.mean(axis=0)
+    return np.array([
+        (uncollided[i] if sensor.response_function in UNCOLLIDED_RESPONSES else flux[i])
+        * response_coefficients(sensor.response_function, kernel.energies)
+        for i, sensor in enumerate(scene.sensors)
+    ]).reshape(len(scene.sensors), len(kernel.energies))
+
+
+def nuclide_photons(data, keys, groups):
+    """Energies (MeV) and photons per decay (E, nuclides) of nuclides ``keys``, collapsed onto ``groups``"""
+    nuclides = [data.nuclides[key] for key in keys]
+    if groups is not None:
+        return group_energies(groups) / 1000.0, np.stack([
+            collapse(n.energies, n.intensities, groups) for n in nuclides
+        ], axis=1)
+    energies = np.unique(np.concatenate([n.energies for n in nuclides]))
+    photons = np.zeros((len(energies), len(keys)))
+    for i, nuclide in enumerate(nuclides):
+        np.add.at(photons[:, i], np.searchsorted(energies, nuclide.energies), nuclide.intensities)
+    return energies / 1000.0, photons
+
+
+def dose_time_series(scene, times, points_per_source=1000, seed=0):
+    """Sensor responses of the decaying sources of ``scene`` at ``times`` (s)"""
+    if not scene.sensors:
+        raise ValueError('The project has no sensors')
+    if not scene.sources:
+        raise ValueError('The project has no source volume with a line spectrum')
+    for sensor in scene.sensors:
+        response_coefficients(sensor.response_function, [1.0])
+
+    data = load_decay_data()
+    times = np.asarray(times, dtype=float)
+    rates = np.zeros((len(times), len(scene.sensors)))
+    constant = np.zeros(len(scene.sensors))
+    inventories = []
+    for source in scene.sources:
+        if not source.nuclides:
+            responses = unit_responses(scene, source, source.energies, points_per_source, seed)
+            constant += responses @ source.emissions
+            continue
+        keys, activities = data.decay(source.nuclides, times)
+        energies, photons = nuclide_photons(data, keys, source.groups)
+        keep = photons.any(axis=1)
+        kernels = np.zeros((len(scene.sensors), len(keys)))
+        if keep.any():
+            kernels = unit_responses(scene, source, energies[keep], points_per_source, seed) @ photons[keep]
+        rates += activities @ kernels.T
+        inventories.append(SourceInventory(source.name, keys, kernels, activities))
+    return TimeSeries(times, rates + constant, constant, inventories)
@@ -0,0 +1,119 @@
+"""
+Tolerance configurations of a project.
+
+A ``ToleranceConfiguration`` row shifts a volume by +plus_delta or
+-minus_delta along one coordinate of its position: x, y, z (cm), or the
+spherical r (cm), theta and phi (radians) around the scene origin, with
+the polar axis along Y as in the editor. The contribution sign of each
+side tells whether it raises (+) or lowers (-) the dose: the maximum
+configuration applies the sides marked '+', the minimum configuration the
+sides marked '-' and the nominal configuration none.
+
+A ``Perturbation`` holds the shifted primitives of one configuration.
+Engines evaluate it by correlated sampling against the nominal scene:
+perturbed runs reuse the nominal source points, moved with their volume,
+and the nominal path lengths of every segment that passes nowhere near a
+shifted volume. A tolerance study then traces little more than the
+nominal run, and the dose difference keeps little of the statistical
+noise of the two estimates.
+"""
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from .bvh import segment_box_overlap
+
+COORDINATES = ('x', 'y', 'z', 'r', 'theta', 'phi')
+
+
+def _shift(center, coordinate, delta):
+    """World translation moving ``center`` by ``delta`` along ``coordinate``"""
+    if coordinate in ('x', 'y', 'z'):
+        shift = np.zeros(3)
+        shift['xyz'.index(coordinate)] = delta
+        return shift
+    x, y, z = center
+    r = float(np.linalg.norm(center))
+    if coordinate == 'r':
+        return (center / r if r > 0 else np.array([0.0, 1.0, 0.0])) * delta
+    if r == 0:
+        return np.zeros(3)
+    theta, phi = np.arccos(np.clip(y / r, -1, 1)), np.arctan2(z, x)
+    if coordinate == 'theta':
+        theta += delta
+    else:
+        phi += delta
+    moved = r * np.array([np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)])
+    return moved - center
+
+
+def configuration_deltas(tolerances, config_type):
+    """(volume id, coordinate, signed delta) applied by a configuration type"""
+    wanted = {'maximum': '+', 'minimum': '-'}.get(config_type)
+    deltas = []
+    for tolerance in tolerances if wanted else ():
+        if tolerance.plus_contribution == wanted and tolerance.plus_delta:
+            deltas.append((tolerance.volume_id, tolerance.coordinate, tolerance.plus_delta))
+        elif tolerance.minus_contribution == wanted and tolerance.minus_delta:
+            deltas.append((tolerance.volume_id, tolerance.coordinate, -tolerance.minus_delta))
+    return deltas
+
+
+def _moved_mesh(mesh, primitive, shift):
+    """A source mesh following its primitive by ``shift``"""
+    if mesh.system == 'cartesian':
+        return replace(mesh, primitive=primitive, lower=mesh.lower + shift, upper=mesh.upper + shift, centroids=mesh.centroids + shift)
+    return replace(mesh, primitive=primitive, centroids=mesh.centroids + shift)
+
+
+@dataclass
+class Perturbation:
+    """Translations of some primitives of a scene"""
+    config_type: str = 'nominal'
+    shifts: dict = field(default_factory=dict)  # primitive index -> world translation (3,)
+
+    def apply(self, scene):
+        """The perturbed scene, with source meshes moved along with their volume"""
+        if not self.shifts:
+            return scene
+        primitives = list(scene.primitives)
+        for index, shift in self.shifts.items():
+            primitives[index] = primitives[index].translated(shift)
+        sources = [
+            replace(s, mesh=_moved_mesh(s.mesh, primitives[s.primitive], self.shifts[s.primitive]))
+            if s.mesh is not None and s.primitive in self.shifts else s
+            for s in scene.sources
+        ]
+        return replace(scene, primitives=primitives, sources=sources, warnings=list(scene.warnings))
+
+    def move_points(self, source, points):
+        """Nominal emission points of ``source`` in the perturbed scene"""
+        shift = self.shifts.get(source.primitive)
+        return points if shift is None else points + shift
+
+    def affected(self, scene, perturbed, origins, ends):
+        """Segments (N,) whose path lengths may differ between ``scene`` and ``perturbed``"""
+        mask = np.zeros(len(origins), dtype=bool)
+        lower, upper = scene.geometry.bounds
+        moved_lower, moved_upper = perturbed.geometry.bounds
+        for index in self.shifts:
+            box_lower = np.minimum(lower[index], moved_lower[index])
+            box_upper = np.maximum(upper[index], moved_upper[index])
+            mask |= segment_box_overlap(origins, ends - origins, box_lower, box_upper)
+        return mask
+
+
+def tolerance_perturbation(scene, tolerances, config_type):
+    """Perturbation of ``scene`` for a configuration type from ``ToleranceConfiguration`` rows"""
+    perturbation = Perturbation(config_type)
+    primitives = {volume: index for index, volume in enumerate(scene.volumes)}
+    for volume, coordinate, delta in configuration_deltas(tolerances, config_type):
+        if coordinate not in COORDINATES:
+            scene.warnings.append(f'Tolerance on unknown coordinate {coordinate!r} was ignored')
+            continue
+        if volume not in primitives:
+            continue
+        index = primitives[volume]
+        current = perturbation.shifts.get(index, np.zeros(3))
+        perturbation.shifts[index] = current + _shift(scene.primitives[index].center + current, coordinate, delta)
+    return perturbation
@@ -0,0 +1,134 @@
+"""
+Reuse of stored computation results.
+
+Every computed configuration records a ``ComputationRun`` with the content
+hashes of its scene (``physics.fingerprint``). A configuration asked
+again on a scene with the same hash returns its stored results without
+running an engine.
+
+Point-kernel results are also reused sensor by sensor: when the run
+settings, tolerance shifts and sources are unchanged, the response of a
+sensor only depends on the volumes crossed by the segments from the
+sources to the sensor. Those segments lie in the bounding box of the
+source volumes and the sensor, so a sensor whose box meets none of the
+added or removed volumes keeps its previous result. Only the others are
+recomputed.
+"""
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+from .models import ComputationResult, ComputationRun
+from .physics.fingerprint import run_hash, scene_hash, sensor_hashes, volume_hashes
+
+# Bump when engine changes invalidate stored results
+CACHE_VERSION = 1
+
+
+@dataclass
+class Fingerprint:
+    """Content hashes of a configuration's run on a scene"""
+    run: str
+    scene: str
+    volumes: list  # hash per primitive
+    sensors: list  # hash per sensor
+
+
+def scene_fingerprints(scene, configurations, perturbations, seed, batches):
+    """Fingerprint of each configuration with its perturbation of ``scene``"""
+    volumes, sensors = volume_hashes(scene), sensor_hashes(scene)
+    table = scene.photon_table.version if scene.photon_table is not None else 'bundled'
+    fingerprints = []
+    for configuration, perturbation in zip(configurations, perturbations):
+        settings = [
+            CACHE_VERSION, table, configuration.method, configuration.particles_per_sample,
+            configuration.number_of_samples, configuration.convergence_criterion, seed, batches,
+            configuration.variance_reduction,
+        ]
+        run = run_hash(settings, {volumes[index]: shift for index, shift in perturbation.shifts.items()})
+        fingerprints.append(Fingerprint(run, scene_hash(run, volumes, sensors), volumes, sensors))
+    return fingerprints
+
+
+def cached_results(configuration, scene, fingerprint):
+    """Stored results of a run of ``configuration`` on the same scene, or None"""
+    run = configuration.runs.filter(scene_hash=fingerprint.scene).first()
+    if run is None:
+        return None
+    results = list(run.results.all())
+    stored = {(result.sensor_id, result.sensor_hash) for result in results}
+    if len(results) != len(scene.sensors) or any(
+        (sensor.id, sensor_hash) not in stored for sensor, sensor_hash in zip(scene.sensors, fingerprint.sensors)
+    ):
+        return None
+    return results
+
+
+def reusable_results(configuration, scene, perturbation, fingerprint):
+    """Previous results (by sensor index) of the sensors unaffected by the changes since
+    the last run of ``configuration`` with the same settings and sources"""
+    run = configuration.runs.filter(run_hash=fingerprint.run).first()
+    if run is None or not scene.sources:
+        return {}
+    lower, upper = scene.geometry.bounds
+    sources = {source.primitive for source in scene.sources}
+    current = Counter(fingerprint.volumes)
+    previous = Counter(volume for volume, _, _ in run.volumes)
+
+    changed = []
+    for volume, bounds, is_source in run.volumes:
+        if previous[volume] != current[volume]:
+            if is_source:
+                return {}
+            changed.append(np.array(bounds, dtype=float))
+    for index, volume in enumerate(fingerprint.volumes):
+        if previous[volume] != current[volume]:
+            if index in sources:
+                return {}
+            changed.append(np.array([lower[index], upper[index]]))
+
+    perturbed = perturbation.apply(scene)
+    moved_lower, moved_upper = perturbed.geometry.bounds
+    source_lower = np.min([np.minimum(lower[i], moved_lower[i]) for i in sources], axis=0)
+    source_upper = np.max([np.maximum(upper[i], moved_upper[i]) for i in sources], axis=0)
+
+    previous_results = {}
+    for result in run.results.filter(status__in=('success', 'warning')).exclude(sensor_hash=''):
+        previous_results.setdefault(result.sensor_hash, result)
+    reusable = {}
+    for index, (sensor, sensor_hash) in enumerate(zip(scene.sensors, fingerprint.sensors)):
+        if sensor_hash not in previous_results:
+            continue
+        box_lower = np.minimum(source_lower, sensor.position)
+        box_upper = np.maximum(source_upper, sensor.position)
+        if all(np.any(bounds[1] < box_lower) or np.any(bounds[0] > box_upper) for bounds in changed):
+            reusable[index] = previous_results[sensor_hash]
+    return reusable
+
+
+def record_run(project, configuration, scene, fingerprint):
+    """Store the hashes and volume bounds of a configuration's run"""
+    lower, upper = scene.geometry.bounds
+    sources = {source.primitive for source in scene.sources}
+    return ComputationRun.objects.create(
+        project=project, configuration=configuration, scene_hash=fingerprint.scene, run_hash=fingerprint.run,
+        volumes=[
+            [volume, [lower[i].tolist(), upper[i].tolist()], i in sources]
+            for i, volume in enumerate(fingerprint.volumes)
+        ],
+    )
+
+
+def copy_results(run, scene, fingerprint, reused):
+    """New results of ``run`` copied from the reused ones, by sensor index"""
+    results = []
+    for index, previous in reused.items():
+        results.append(ComputationResult(
+            project=run.project, configuration=run.configuration, sensor_id=scene.sensors[index].id,
+            run=run, sensor_hash=fingerprint.sensors[index], dose_rate=previous.dose_rate,
+            unit=previous.unit, uncertainty=previous.uncertainty, computation_time=0,
+            converged=previous.converged, status=previous.status,
+            log_data={**(previous.log_data or {}), 'reused_from': previous.pk},
+        ))
+    return ComputationResult.objects.bulk_create(results)
@@ -4,8 +4,9 @@ from .models import (
     Spectrum, Volume, SceneHistory, CSGOperation, Sensor,
     CompoundObject, CompoundObjectGeometry, CompoundObjectComposition,
     CompoundObjectSpectrum, CompoundObjectSensor, CompoundObjectImport,
-    MeshConfiguration, ComputationConfiguration, ComputationResult, ToleranceConfiguration
+    MeshConfiguration, ComputationConfiguration, ComputationResult, ComputationJob, ToleranceConfiguration, DoseMap
 )
+from .history import record_history, reconstruct_state
 
 
 class SceneConfigurationSerializer(serializers.ModelSerializer):
@@ -111,9 +112,14 @@ class ProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at', 'updated_at']
     
     def get_geometries_count(self, obj):
+        # List views annotate the count (see ProjectQuerySet.with_counts)
+        if hasattr(obj, 'geometries_count'):
+            return obj.geometries_count
         return obj.geometries.count()
     
     def get_volumes_count(self, obj):
+        if hasattr(obj, 'volumes_count'):
+            return obj.volumes_count
         return obj.volumes.count()
 
 
@@ -133,11 +139,21 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
 
 
 class SceneHistorySerializer(serializers.ModelSerializer):
-    """Serializer for scene history"""
+    """Serializer for scene history metadata (the state itself is write-only)"""
+    scene_state = serializers.JSONField(write_only=True)
+    
     class Meta:
         model = SceneHistory
-        fields = '__all__'
-        read_only_fields = ['project', 'timestamp']
+        fields = ['id', 'project', 'sequence', 'action_name', 'timestamp', 'is_keyframe', 'scene_state']
+        read_only_fields = ['project', 'sequence', 'timestamp', 'is_keyframe']
+
+
+class SceneHistoryDetailSerializer(SceneHistorySerializer):
+    """Serializer for a single history step with its reconstructed scene state"""
+    scene_state = serializers.SerializerMethodField()
+    
+    def get_scene_state(self, obj):
+        return reconstruct_state(obj)
 
 
 class SensorSerializer(serializers.ModelSerializer):
@@ -408,10 +424,7 @@ class CompleteSceneSerializer(serializers.Serializer):
         
         # Create history
         for hist_data in history_data:
-            SceneHistory.objects.create(
-                project=project,
-                **hist_data
-            )
+            record_history(project, hist_data['action_name'], hist_data['scene_state'])
         
         # Create CSG operations
         for csg_data in csg_operations_data:
@@ -459,6 +472,29 @@ class ComputationResultSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at',)
 
 
+class ComputationJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued computation runs and their progress"""
+
+    class Meta:
+        model = ComputationJob
+        fields = '__all__'
+        read_only_fields = (
+            'project', 'kind', 'dose_map', 'parameters', 'output', 'configurations', 'results', 'force', 'status', 'progress', 'samples', 'uncertainty',
+            'eta', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at'
+        )
+
+
+class DoseMapSerializer(serializers.ModelSerializer):
+    """Serializer for dose map definitions; the responses are served separately"""
+
+    class Meta:
+        model = DoseMap
+        exclude = ('data',)
+        read_only_fields = (
+            'project', 'status', 'unit', 'maximum', 'computation_time', 'log_data', 'created_at', 'updated_at'
+        )
+
+
 class ToleranceConfigurationSerializer(serializers.ModelSerializer):
     class Meta:
         model = ToleranceConfiguration
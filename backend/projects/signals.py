@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from elements.models import ElementComposition
+from .models import (
+    Project, SceneConfiguration, Geometry, Composition,
+    Spectrum, Volume, SceneHistory, CSGOperation, Sensor
+)
+from .physics.materials import forget_composition
+from .snapshots import invalidate_snapshots
+
+
+# Models whose rows are part of a serialized scene snapshot
+SCENE_MODELS = [
+    SceneConfiguration, Geometry, Composition, Spectrum,
+    Volume, SceneHistory, CSGOperation, Sensor
+]
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_snapshots(sender, instance, created, **kwargs):
+    """Project fields are embedded in the snapshots"""
+    if not created:
+        invalidate_snapshots(instance.pk)
+
+
+def invalidate_scene_snapshots(sender, instance, **kwargs):
+    """Drop the project's snapshots when any scene object changes"""
+    invalidate_snapshots(instance.project_id)
+
+
+for model in SCENE_MODELS:
+    post_save.connect(invalidate_scene_snapshots, sender=model, dispatch_uid=f'snapshot_save_{model.__name__}')
+    post_delete.connect(invalidate_scene_snapshots, sender=model, dispatch_uid=f'snapshot_delete_{model.__name__}')
+
+
+def invalidate_compiled_material(sender, instance, **kwargs):
+    """Recompile a composition's attenuation on its next use"""
+    forget_composition(instance)
+
+
+for model in (Composition, ElementComposition):
+    post_save.connect(invalidate_compiled_material, sender=model, dispatch_uid=f'material_save_{model.__name__}')
+    post_delete.connect(invalidate_compiled_material, sender=model, dispatch_uid=f'material_delete_{model.__name__}')
@@ -0,0 +1,115 @@
+"""
+Materialized scene snapshots.
+
+Loading a project re-serializes the same unchanged scene graph on every
+open. Instead, the rendered JSON payload is stored gzip-compressed in a
+``SceneSnapshot`` row, built when the scene is saved and dropped by the
+signals in ``projects.signals`` whenever any part of the scene changes.
+Load views serve the stored bytes as-is with a strong ETag, so repeat
+visits are answered with ``304 Not Modified``.
+"""
+import gzip
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from .models import (
+    Project, SceneConfiguration, Geometry, Composition,
+    Spectrum, Volume, SceneHistory, CSGOperation, SceneSnapshot
+)
+from .serializers import (
+    ProjectSerializer, SceneConfigurationSerializer, GeometrySerializer,
+    CompositionSerializer, SpectrumSerializer, VolumeSerializer,
+    SceneHistorySerializer, CSGOperationSerializer, CompleteProjectSerializer
+)
+
+
+def serialize_complete_scene(project):
+    """Payload of the load-complete-scene endpoint"""
+    scene_config = SceneConfiguration.objects.get(project=project)
+    geometries = Geometry.objects.filter(project=project)
+    compositions = Composition.objects.filter(project=project)
+    spectra = Spectrum.objects.filter(project=project)
+    volumes = Volume.objects.filter(project=project).select_related('geometry', 'composition', 'spectrum')
+    history = SceneHistory.objects.filter(project=project).defer('scene_state', 'delta')
+    csg_operations = CSGOperation.objects.filter(project=project).select_related('result_object')
+
+    return {
+        'project': ProjectSerializer(project).data,
+        'scene_config': SceneConfigurationSerializer(scene_config).data,
+        'geometries': GeometrySerializer(geometries, many=True).data,
+        'compositions': CompositionSerializer(compositions, many=True).data,
+        'spectra': SpectrumSerializer(spectra, many=True).data,
+        'volumes': VolumeSerializer(volumes, many=True).data,
+        'history': SceneHistorySerializer(history, many=True).data,
+        'csg_operations': CSGOperationSerializer(csg_operations, many=True).data,
+    }
+
+
+def serialize_complete_project(project):
+    """Payload of the complete project retrieve endpoint"""
+    project = Project.objects.with_scene_graph().get(pk=project.pk)
+    return CompleteProjectSerializer(project).data
+
+
+SNAPSHOT_BUILDERS = {
+    'scene': serialize_complete_scene,
+    'project': serialize_complete_project,
+}
+
+
+def build_snapshot(project, kind):
+    """Render, compress and store the ``kind`` payload of a project"""
+    raw = JSONRenderer().render(SNAPSHOT_BUILDERS[kind](project))
+    snapshot, _ = SceneSnapshot.objects.update_or_create(
+        project=project,
+        kind=kind,
+        defaults={
+            'etag': hashlib.sha256(raw).hexdigest(),
+            'encoding': 'gzip',
+            'data': gzip.compress(raw, compresslevel=6),
+            'raw_size': len(raw),
+        }
+    )
+    return snapshot
+
+
+def build_snapshots(project):
+    """Rebuild every snapshot kind of a project, e.g. right after a save"""
+    return [build_snapshot(project, kind) for kind in SNAPSHOT_BUILDERS]
+
+
+def get_snapshot(project, kind):
+    """Return the stored snapshot, building it first if the scene changed"""
+    # The payload is deferred so that a matching If-None-Match never reads it
+    snapshot = SceneSnapshot.objects.filter(project=project, kind=kind).defer('data').first()
+    if snapshot is None:
+        snapshot = build_snapshot(project, kind)
+    return snapshot
+
+
+def invalidate_snapshots(project_id):
+    """Drop the stored snapshots of a project"""
+    SceneSnapshot.objects.filter(project_id=project_id).delete()
+
+
+def snapshot_response(request, snapshot):
+    """Serve a snapshot with a strong ETag and conditional GET support"""
+    accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    etag = f'"{snapshot.etag}-gzip"' if accepts_gzip else f'"{snapshot.etag}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = bytes(snapshot.data)
+        if accepts_gzip:
+            response = HttpResponse(data, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(data), content_type='application/json')
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,222 @@
+"""
+Synthetic projects for load and scaling tests.
+
+Generates a project of any size from a seed: compositions of random
+element mixes, line and isotope spectra, primitives on a jittered grid
+(so volumes do not overlap), a volume for each of the first ``volumes``
+geometries with a share of them sources, sensors above the grid,
+compound objects exported from runs of neighbouring volumes, and an undo
+history of object moves stored like ``projects.history`` stores it, with
+keyframes and JSON patches. The same seed and counts give the same rows.
+
+Every model is written with one ``bulk_create``, so queries grow with
+the insert batches of the database (a few hundred rows each on SQLite),
+not with the rows.
+"""
+import numpy as np
+from django.db import transaction
+
+from .history import KEYFRAME_INTERVAL, RETENTION
+from .models import (
+    Project, SceneConfiguration, Geometry, Composition, Spectrum, Volume, Sensor, SceneHistory,
+    CompoundObject, CompoundObjectGeometry, CompoundObjectComposition, CompoundObjectSpectrum, CompoundObjectSensor,
+)
+
+SIZE_PRESETS = {
+    'small': {'geometries': 100, 'volumes': 100, 'compositions': 10, 'spectra': 10, 'sensors': 10,
+              'compound_objects': 5, 'history': 50},
+    'medium': {'geometries': 1000, 'volumes': 1000, 'compositions': 50, 'spectra': 50, 'sensors': 100,
+               'compound_objects': 20, 'history': 200},
+    'large': {'geometries': 10000, 'volumes': 10000, 'compositions': 200, 'spectra': 200, 'sensors': 500,
+              'compound_objects': 50, 'history': 200},
+}
+
+ELEMENTS = ['H', 'C', 'N', 'O', 'Na', 'Mg', 'Al', 'Si', 'Ca', 'Fe', 'Cu', 'Zn', 'W', 'Pb']
+ISOTOPES = ['Co-60', 'Cs-137', 'Am-241', 'Eu-152', 'Ir-192', 'Ba-133', 'Na-22']
+RESPONSE_FUNCTIONS = [choice for choice, _ in Sensor.RESPONSE_CHOICES]
+GEOMETRY_TYPES = ['cube', 'sphere', 'cylinder', 'cone']
+# Spacing (cm) of the geometry grid and largest extent of a geometry
+PITCH = 150.0
+MAX_SIZE = 100.0
+SOURCE_FRACTION = 0.1
+OBJECTS_PER_COMPOUND = 5
+
+
+def _color(rng):
+    return '#' + ''.join(f'{v:02X}' for v in rng.integers(0, 256, 3))
+
+
+def _vector(values):
+    return {axis: round(float(v), 2) for axis, v in zip('xyz', values)}
+
+
+def _composition(rng, project, i):
+    elements = rng.choice(ELEMENTS, size=rng.integers(1, 5), replace=False)
+    shares = rng.dirichlet(np.ones(len(elements))) * 100
+    return Composition(
+        project=project, name=f'Material {i}', density=round(float(rng.uniform(0.5, 11.5)), 3), color=_color(rng),
+        elements=[{'element': str(e), 'percentage': round(float(p), 3)} for e, p in zip(elements, shares)],
+    )
+
+
+def _spectrum(rng, project, i):
+    if rng.random() < 0.5:
+        isotopes = rng.choice(ISOTOPES, size=rng.integers(1, 4), replace=False)
+        return Spectrum(
+            project=project, name=f'Isotopes {i}', spectrum_type='group', multiplier=float(10 ** rng.uniform(3, 9)),
+            isotopes=[{'isotope': str(s), 'activity': float(10 ** rng.uniform(3, 9))} for s in isotopes],
+        )
+    energies = np.sort(rng.uniform(50, 3000, rng.integers(1, 11)))
+    return Spectrum(
+        project=project, name=f'Lines {i}', spectrum_type='line', multiplier=1.0,
+        lines=[{'energy': round(float(e), 1), 'intensity': float(10 ** rng.uniform(3, 7))} for e in energies],
+    )
+
+
+def _geometry(rng, project, i, center):
+    kind = GEOMETRY_TYPES[rng.integers(len(GEOMETRY_TYPES))]
+    size = rng.uniform(MAX_SIZE / 10, MAX_SIZE, 3)
+    parameters = {
+        'cube': {'width': size[0], 'height': size[1], 'depth': size[2]},
+        'sphere': {'radius': size[0] / 2},
+        'cylinder': {'radiusTop': size[0] / 2, 'radiusBottom': size[0] / 2, 'height': size[1]},
+        'cone': {'radius': size[0] / 2, 'height': size[1]},
+    }[kind]
+    return Geometry(
+        project=project, name=f'Object {i}', geometry_type=kind, position=_vector(center),
+        rotation=_vector([0.0, rng.uniform(0, np.pi), 0.0]), scale=_vector([1, 1, 1]), color=_color(rng),
+        geometry_parameters={name: round(float(v), 2) for name, v in parameters.items()},
+        user_data={'volumeName': f'Object {i}'},
+    )
+
+
+def _history(rng, project, geometries, steps):
+    """Scene history rows of ``steps`` random object moves, keyframes every ``KEYFRAME_INTERVAL``"""
+    state = {'objects': {g.name: {'position': dict(g.position)} for g in geometries}}
+    rows = []
+    for sequence in range(steps):
+        geometry = geometries[rng.integers(len(geometries))] if geometries else None
+        if geometry is not None:
+            position = state['objects'][geometry.name]['position']
+            position = _vector([position[axis] + rng.normal(0, 5) for axis in 'xyz'])
+            state['objects'][geometry.name]['position'] = position
+        action = f'Move {geometry.name}' if geometry is not None else 'Edit scene'
+        if sequence % KEYFRAME_INTERVAL == 0:
+            rows.append(SceneHistory(
+                project=project, sequence=sequence, action_name=action, is_keyframe=True,
+                scene_state={'objects': {name: {'position': dict(o['position'])} for name, o in state['objects'].items()}},
+            ))
+        else:
+            delta = [] if geometry is None else [
+                {'op': 'replace', 'path': f'/objects/{geometry.name}/position', 'value': position}
+            ]
+            rows.append(SceneHistory(
+                project=project, sequence=sequence, action_name=action, is_keyframe=False, delta=delta
+            ))
+    return rows
+
+
+def generate_project(user, name=None, seed=0, geometries=100, volumes=None, compositions=10, spectra=10,
+                     sensors=10, compound_objects=5, history=50):
+    """Create a synthetic project of ``user`` with the given object counts.
+
+    ``volumes`` defaults to one per geometry. History beyond
+    ``SCENE_HISTORY_RETENTION`` steps is not generated, as compaction would
+    drop it.
+    """
+    rng = np.random.default_rng(seed)
+    volumes = geometries if volumes is None else min(volumes, geometries)
+    history = min(history, RETENTION)
+
+    with transaction.atomic():
+        project = Project.objects.create(
+            name=name or f'Synthetic {geometries} objects (seed {seed})',
+            description=f'Synthetic project: {geometries} geometries, {volumes} volumes, seed {seed}', user=user,
+        )
+        SceneConfiguration.objects.create(project=project)
+
+        composition_rows = Composition.objects.bulk_create([_composition(rng, project, i) for i in range(compositions)])
+        spectrum_rows = Spectrum.objects.bulk_create([_spectrum(rng, project, i) for i in range(spectra)])
+
+        columns = max(int(np.ceil(np.sqrt(geometries))), 1)
+        jitter = (PITCH - MAX_SIZE) / 2
+        geometry_rows = []
+        for i in range(geometries):
+            center = [(i % columns) * PITCH, MAX_SIZE / 2, (i // columns) * PITCH] + rng.uniform(-jitter, jitter, 3)
+            geometry_rows.append(_geometry(rng, project, i, center))
+        geometry_rows = Geometry.objects.bulk_create(geometry_rows)
+
+        volume_rows = []
+        for i, geometry in enumerate(geometry_rows[:volumes]):
+            source = bool(spectrum_rows) and rng.random() < SOURCE_FRACTION
+            spectrum = spectrum_rows[rng.integers(len(spectrum_rows))] if source else None
+            volume_rows.append(Volume(
+                project=project, geometry=geometry, volume_name=geometry.name,
+                composition=composition_rows[rng.integers(len(composition_rows))] if composition_rows else None,
+                spectrum=spectrum, is_source=source,
+                gamma_selection_mode='by-isotope' if spectrum and spectrum.isotopes else 'by-lines',
+            ))
+        Volume.objects.bulk_create(volume_rows)
+
+        extent = max(columns - 1, 1) * PITCH
+        sensor_rows = Sensor.objects.bulk_create([
+            Sensor(
+                project=project, name=f'S{i}', coordinates=_vector(rng.uniform([0, MAX_SIZE, 0], [extent, 2 * MAX_SIZE, extent])),
+                response_function=RESPONSE_FUNCTIONS[rng.integers(len(RESPONSE_FUNCTIONS))],
+            )
+            for i in range(sensors)
+        ])
+
+        SceneHistory.objects.bulk_create(_history(rng, project, geometry_rows, history))
+        _compound_objects(rng, project, compound_objects, volume_rows, sensor_rows)
+    return project
+
+
+def _compound_objects(rng, project, count, volumes, sensors):
+    """Compound objects exported from runs of consecutive volumes, with their materials and spectra"""
+    objects, members = [], []
+    for i in range(count if volumes else 0):
+        start = int(rng.integers(len(volumes)))
+        group = volumes[start:start + OBJECTS_PER_COMPOUND]
+        compositions = list({v.composition.pk: v.composition for v in group if v.composition}.values())
+        spectra = list({v.spectrum.pk: v.spectrum for v in group if v.spectrum}.values())
+        picked = [sensors[rng.integers(len(sensors))]] if sensors else []
+        objects.append(CompoundObject(
+            project=project, name=f'Compound {i}', description='Synthetic compound object',
+            file_path=f'/MercuradObjects/General/Compound {i}.mercurad', tags=['synthetic'],
+            volumes_count=len(group), compositions_count=len(compositions), spectra_count=len(spectra),
+            sensors_count=len(picked),
+        ))
+        members.append((group, compositions, spectra, picked))
+    objects = CompoundObject.objects.bulk_create(objects)
+
+    rows = {CompoundObjectGeometry: [], CompoundObjectComposition: [], CompoundObjectSpectrum: [], CompoundObjectSensor: []}
+    for compound, (group, compositions, spectra, picked) in zip(objects, members):
+        for order, volume in enumerate(group):
+            g = volume.geometry
+            rows[CompoundObjectGeometry].append(CompoundObjectGeometry(
+                compound_object=compound, original_geometry=g, order=order, geometry_data={
+                    'name': g.name, 'geometry_type': g.geometry_type, 'position': g.position, 'rotation': g.rotation,
+                    'scale': g.scale, 'color': g.color, 'opacity': g.opacity, 'transparent': g.transparent,
+                    'geometry_parameters': g.geometry_parameters, 'user_data': g.user_data,
+                    'transform_controls_enabled': g.transform_controls_enabled, 'transform_mode': g.transform_mode,
+                },
+            ))
+        rows[CompoundObjectComposition] += [CompoundObjectComposition(
+            compound_object=compound, original_composition=c,
+            composition_data={'name': c.name, 'density': c.density, 'color': c.color, 'elements': c.elements},
+        ) for c in compositions]
+        rows[CompoundObjectSpectrum] += [CompoundObjectSpectrum(
+            compound_object=compound, original_spectrum=s, spectrum_data={
+                'name': s.name, 'spectrum_type': s.spectrum_type, 'multiplier': s.multiplier,
+                'lines': s.lines, 'isotopes': s.isotopes,
+            },
+        ) for s in spectra]
+        rows[CompoundObjectSensor] += [CompoundObjectSensor(
+            compound_object=compound, original_sensor=s, sensor_data={
+                'name': s.name, 'coordinates': s.coordinates, 'buildup_type': s.buildup_type,
+                'equi_importance': s.equi_importance, 'response_function': s.response_function,
+            },
+        ) for s in picked]
+    for model, instances in rows.items():
+        model.objects.bulk_create(instances)
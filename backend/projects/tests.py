@@ -1,3 +1,1363 @@
-from django.test import TestCase
+import copy
+import gzip
+import json
+import tempfile
+import time
+from dataclasses import replace
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from benchmarks.scenes import scene_payload
+from benchmarks.suite import Measurement, regressions
+from elements.models import DecayPath, Element, ElementComposition, GammaSpectrum, Isotope
+
+from .cloning import clone_project, instantiate_example_scene
+from .computation import batch_statistics, run_computation, run_computations
+from .dose_maps import map_array, run_dose_map
+from .history import KEYFRAME_INTERVAL, apply_patch, compact_history, make_patch, record_history, reconstruct_state
+from .jobs import MAX_TIMES, STALE_ERROR, Heartbeat, claim_job, enqueue_computation, run_job, stale_jobs
+from .models import (
+    Project, SceneConfiguration, Geometry, Composition,
+    Spectrum, Volume, Sensor, MeshConfiguration, ToleranceConfiguration, CSGOperation,
+    ComputationConfiguration, ComputationResult, ComputationJob, DoseMap, ExampleScene, SceneHistory, StreamTicket
+)
+from .physics.attenuation import mixture_attenuation
+from .physics.buildup import GP_PARAMETERS, gp_buildup, material_parameters, multilayer_buildup
+from .physics.csg import Solid
+from .physics import dose_map as dose_map_module
+from .physics import geometry as geometry_module
+from .physics.geometry import CompiledGeometry, Primitive, compile_geometry
+from .physics.importance import importance_map, sensor_groups
+from .physics.materials import compile_composition, compile_material
+from .physics.mesh import build_mesh
+from .physics.monte_carlo import Particles, klein_nishina_density, monte_carlo, sample_compton
+from .physics.point_kernel import correlated_point_kernel, point_kernel
+from .physics.response import RESPONSE_UNITS, response_coefficients
+from .physics.scene import Material, Scene, SensorPoint, Source, load_scene
+from .physics.source_terms import group_energies, source_emissions
+from .physics.tolerance import tolerance_perturbation
+from .synthetic import generate_project
+
+User = get_user_model()
+
+
+def build_scene(project, object_count):
+    """Populate a project with ``object_count`` volumes and their related objects"""
+    SceneConfiguration.objects.create(project=project)
+    composition = Composition.objects.create(
+        project=project, name='Steel', density=7.85, color='#A9A9A9',
+        elements=[{'element': 'Fe', 'percentage': 100.0}]
+    )
+    spectrum = Spectrum.objects.create(
+        project=project, name='Co-60', spectrum_type='line',
+        lines=[{'energy': 1173.2, 'intensity': 1.0}, {'energy': 1332.5, 'intensity': 1.0}]
+    )
+    for i in range(object_count):
+        geometry = Geometry.objects.create(
+            project=project, name=f'cube-{i}', geometry_type='cube',
+            position={'x': i * 10, 'y': 0, 'z': 0},
+            rotation={'x': 0, 'y': 0, 'z': 0},
+            scale={'x': 1, 'y': 1, 'z': 1},
+            geometry_parameters={'width': 5, 'height': 5, 'depth': 5}
+        )
+        Volume.objects.create(
+            project=project, geometry=geometry, composition=composition,
+            spectrum=spectrum if i % 2 else None, volume_name=f'cube-{i}',
+            is_source=bool(i % 2)
+        )
+        Sensor.objects.create(
+            project=project, name=f'S{i}', coordinates={'x': i * 10, 'y': 50, 'z': 0},
+            selected_composition=composition
+        )
+
+
+class ShieldingProjectMixin:
+    """A project with a nominal configuration and a 661.7 keV line spectrum of 1e6 γ/s"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.project = Project.objects.create(name='Shielding', user=self.user)
+        self.configuration = ComputationConfiguration.objects.create(
+            project=self.project, name='Nominal', config_type='nominal', particles_per_sample=2000
+        )
+        self.spectrum = Spectrum.objects.create(
+            project=self.project, name='Cs-137', spectrum_type='line', multiplier=1e6,
+            lines=[{'energy': 661.7, 'intensity': 1.0}]
+        )
+
+    def _add_volume(self, name, geometry_type, parameters, position=None, composition=None, is_source=False):
+        geometry = Geometry.objects.create(
+            project=self.project, name=name, geometry_type=geometry_type,
+            position=position or {'x': 0, 'y': 0, 'z': 0}, rotation={'x': 0, 'y': 0, 'z': 0},
+            scale={'x': 1, 'y': 1, 'z': 1}, geometry_parameters=parameters
+        )
+        return Volume.objects.create(
+            project=self.project, geometry=geometry, composition=composition, volume_name=name,
+            spectrum=self.spectrum if is_source else None, is_source=is_source
+        )
+
+
+class SceneLoadQueryCountTests(TestCase):
+    """Loading a project must cost a constant number of queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _make_project(self, object_count):
+        project = Project.objects.create(name=f'Scene {object_count}', user=self.user)
+        build_scene(project, object_count)
+        return project
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def _assert_constant(self, url_for):
+        small = self._make_project(2)
+        large = self._make_project(25)
+        self.assertEqual(self._count_queries(url_for(small)), self._count_queries(url_for(large)))
+
+    def test_fixture_lines_are_in_kev(self):
+        # Spectrum line energies are stored in keV: Co-60 emits at 1173 and 1332 keV
+        energies = [line['energy'] for line in self._make_project(2).spectra.get().lines]
+        self.assertTrue(all(1000 < energy < 1400 for energy in energies), energies)
+
+    def test_complete_project_retrieve(self):
+        self._assert_constant(
+            lambda project: reverse('projects:complete-project-retrieve', args=[project.id])
+        )
+
+    def test_load_complete_scene(self):
+        self._assert_constant(
+            lambda project: reverse('projects:load-complete-scene', args=[project.uuid])
+        )
+
+    def test_project_detail(self):
+        self._assert_constant(
+            lambda project: reverse('projects:project-detail', args=[project.uuid])
+        )
+
+
+class SceneSnapshotTests(TestCase):
+    """Complete-scene loads are served from a cached, ETag-validated snapshot"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Snapshot scene', user=self.user)
+        build_scene(self.project, 3)
+        self.url = reverse('projects:load-complete-scene', args=[self.project.uuid])
+
+    def test_gzip_payload_and_not_modified(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        payload = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(payload['volumes']), 3)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_scene_edit_invalidates_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        geometry = self.project.geometries.first()
+        geometry.position = {'x': 1, 'y': 2, 'z': 3}
+        geometry.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn({'x': 1, 'y': 2, 'z': 3}, [g['position'] for g in response.json()['geometries']])
+
+
+class ProjectListTests(TestCase):
+    """Project lists annotate counts and page with a cursor"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('projects:project-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def test_counts_are_annotated(self):
+        build_scene(Project.objects.create(name='First', user=self.user), 3)
+        small_queries, _ = self._list_queries()
+        for i in range(10):
+            build_scene(Project.objects.create(name=f'Extra {i}', user=self.user), 1)
+        large_queries, payload = self._list_queries()
+
+        self.assertEqual(small_queries, large_queries)
+        first = next(p for p in payload['results'] if p['name'] == 'First')
+        self.assertEqual(first['geometries_count'], 3)
+        self.assertEqual(first['volumes_count'], 3)
+
+    def test_counts_do_not_join_the_relations(self):
+        generate_project(self.user, geometries=30, volumes=20)
+        Project.objects.create(name='Empty', user=self.user)
+        with CaptureQueriesContext(connection) as context:
+            payload = self.client.get(reverse('projects:project-list')).json()
+        counts = {p['name']: (p['geometries_count'], p['volumes_count']) for p in payload['results']}
+        self.assertEqual(counts['Empty'], (0, 0))
+        self.assertEqual(counts['Synthetic 30 objects (seed 0)'], (30, 20))
+        self.assertFalse(any('JOIN "projects_volume"' in q['sql'] for q in context.captured_queries))
+
+    def test_cursor_pagination_visits_every_project(self):
+        for i in range(7):
+            Project.objects.create(name=f'Project {i}', user=self.user)
+        url = reverse('projects:project-list') + '?page_size=3'
+        seen = []
+        while url:
+            payload = self.client.get(url).json()
+            seen.extend(p['id'] for p in payload['results'])
+            url = payload['next']
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+
+class ProjectCloneTests(TestCase):
+    """The clone engine copies the whole graph with bulk inserts"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+
+    def _make_project(self, object_count):
+        project = Project.objects.create(name=f'Plant {object_count}', user=self.user)
+        build_scene(project, object_count)
+        for volume in project.volumes.all():
+            MeshConfiguration.objects.create(
+                volume=volume, coordinate_system='cartesian',
+                bounds={'x': [-1, 1], 'y': [-1, 1], 'z': [-1, 1]}, subdivisions={'x': 2, 'y': 2, 'z': 2}
+            )
+            ToleranceConfiguration.objects.create(volume=volume, coordinate='x', plus_delta=0.1)
+        ComputationConfiguration.objects.create(project=project, name='Nominal', config_type='nominal')
+        return project
+
+    def _clone_queries(self, project):
+        with CaptureQueriesContext(connection) as context:
+            clone = clone_project(project, user=self.user, name='Copy')
+        return clone, len(context.captured_queries)
+
+    def test_clone_copies_graph_with_remapped_relations(self):
+        source = self._make_project(4)
+        clone, _ = self._clone_queries(source)
+
+        self.assertEqual(clone.geometries.count(), 4)
+        self.assertEqual(clone.sensors.count(), 4)
+        self.assertEqual(clone.computation_configurations.count(), 1)
+        self.assertEqual(MeshConfiguration.objects.filter(volume__project=clone).count(), 4)
+        self.assertEqual(ToleranceConfiguration.objects.filter(volume__project=clone).count(), 4)
+        for volume in clone.volumes.select_related('geometry', 'composition'):
+            self.assertEqual(volume.geometry.project_id, clone.id)
+            self.assertEqual(volume.composition.project_id, clone.id)
+        for sensor in clone.sensors.select_related('selected_composition'):
+            self.assertEqual(sensor.selected_composition.project_id, clone.id)
+
+    def test_clone_query_count_is_constant(self):
+        _, small = self._clone_queries(self._make_project(2))
+        _, large = self._clone_queries(self._make_project(30))
+        self.assertEqual(small, large)
+
+    def test_instantiate_example_scene(self):
+        call_command('populate_example_scenes', stdout=StringIO())
+        scene = ExampleScene.objects.get(name='DUMTUTOR-PCS')
+        project = instantiate_example_scene(scene, user=self.user)
+
+        self.assertEqual(project.geometries.count(), 3)
+        source = project.volumes.get(is_source=True)
+        self.assertEqual(source.geometry.geometry_type, 'cylinder')
+        self.assertEqual(source.composition.name, 'Glass Matrix')
+
+
+class SceneHistoryTests(TestCase):
+    """History steps are stored as patches against periodic keyframes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.project = Project.objects.create(name='History', user=self.user)
+
+    def _state(self, step):
+        return {
+            'camera': {'x': 0, 'y': 5, 'z': 10},
+            'objects': [{'id': i, 'position': {'x': i, 'y': 0, 'z': 0}} for i in range(step % 7 + 3)],
+            'selected': step,
+        }
+
+    def test_patch_round_trip(self):
+        old = {'a': [1, 2, 3, 4], 'b': {'c': 1, 'd/e': 2}, 'f': 'x'}
+        new = {'a': [1, 9, 3, 4, 5], 'b': {'d/e': 3}, 'g': None}
+        self.assertEqual(apply_patch(old, make_patch(old, new)), new)
+        self.assertEqual(apply_patch(new, make_patch(new, old)), old)
+
+    def test_states_reconstruct_from_keyframes(self):
+        for step in range(45):
+            record_history(self.project, f'Step {step}', self._state(step))
+
+        entries = SceneHistory.objects.filter(project=self.project).order_by('sequence')
+        self.assertEqual(entries.filter(is_keyframe=True).count(), 3)
+        self.assertTrue(all(e.scene_state is None for e in entries.filter(is_keyframe=False)))
+        for entry in entries:
+            self.assertEqual(reconstruct_state(entry), self._state(entry.sequence))
+
+    def test_patches_apply_to_one_copy_of_the_keyframe(self):
+        for step in range(KEYFRAME_INTERVAL):
+            record_history(self.project, f'Step {step}', self._state(step))
+        entry = SceneHistory.objects.get(project=self.project, sequence=KEYFRAME_INTERVAL - 1)
+        with mock.patch('projects.history.copy.deepcopy', wraps=copy.deepcopy) as deepcopy:
+            state = reconstruct_state(entry)
+        self.assertEqual(state, self._state(KEYFRAME_INTERVAL - 1))
+        # Only the patched values are copied, never the whole document
+        deltas = SceneHistory.objects.filter(project=self.project, is_keyframe=False).values_list('delta', flat=True)
+        values = sum('value' in op for delta in deltas for op in delta)
+        self.assertEqual(deepcopy.call_count, values)
+        self.assertEqual(reconstruct_state(SceneHistory.objects.get(project=self.project, sequence=0)), self._state(0))
+
+    def test_compaction_keeps_retention_limit(self):
+        for step in range(30):
+            record_history(self.project, f'Step {step}', self._state(step))
+        compact_history(self.project, retention=12)
+
+        entries = SceneHistory.objects.filter(project=self.project).order_by('sequence')
+        self.assertEqual(entries.count(), 12)
+        self.assertTrue(entries.first().is_keyframe)
+        for entry in entries:
+            self.assertEqual(reconstruct_state(entry), self._state(entry.sequence))
+
+    def test_list_returns_metadata_and_detail_returns_state(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('projects:history-list', args=[self.project.uuid])
+        for step in range(3):
+            response = client.post(url, {'action_name': f'Step {step}', 'scene_state': self._state(step)}, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        listed = client.get(url).json()['results']
+        self.assertEqual(len(listed), 3)
+        self.assertNotIn('scene_state', listed[0])
+
+        entry = SceneHistory.objects.get(project=self.project, sequence=2)
+        detail = client.get(reverse('projects:history-detail', args=[self.project.uuid, entry.id])).json()
+        self.assertEqual(detail['scene_state'], self._state(2))
+
+
+class GeometryKernelTests(TestCase):
+    """Packed primitives intersect segments like a brute-force point test"""
+
+    def test_chords_match_sampled_segments(self):
+        rng = np.random.default_rng(7)
+        primitives = [
+            Primitive.from_geometry(geometry_type, {'x': 0.3, 'y': -0.2, 'z': 0.1}, {'x': 0.4, 'y': 0.7, 'z': -0.3},
+                                    {'x': 1.2, 'y': 0.8, 'z': 1.5}, parameters)
+            for geometry_type, parameters in [
+                ('cube', {'width': 2, 'height': 3, 'depth': 1}),
+                ('sphere', {'radius': 1.5}),
+                ('cylinder', {'radiusTop': 1, 'radiusBottom': 2, 'height': 3}),
+                ('cone', {'radius': 1.5, 'height': 3}),
+            ]
+        ]
+        geometry = CompiledGeometry(primitives)
+        origins = rng.uniform(-4, 4, (300, 3))
+        ends = rng.uniform(-4, 4, (300, 3))
+        ends[:30] = origins[:30] + [0, 5, 0]  # parallel to the cylinder/cone axes
+
+        t_in, t_out = geometry.intersect(origins, ends)
+        steps = np.linspace(0, 1, 2001)[:, None, None]
+        points = (origins + steps * (ends - origins)).reshape(-1, 3)
+        for i, primitive in enumerate(primitives):
+            sampled = primitive.contains_local(primitive.to_local(points)).reshape(len(steps), -1).mean(axis=0)
+            np.testing.assert_allclose(t_out[:, i] - t_in[:, i], sampled, atol=2e-3)
+
+        segments = rng.integers(0, 300, 500)
+        indices = rng.integers(0, len(primitives), 500)
+        pair_in, pair_out = geometry.intersect_pairs(origins, ends, segments, indices)
+        np.testing.assert_allclose(pair_in, t_in[segments, indices])
+        np.testing.assert_allclose(pair_out, t_out[segments, indices])
+
+
+class BoundingVolumeHierarchyTests(TestCase):
+    """Large scenes are traced through a BVH built once per geometry version"""
+
+    def _primitives(self, count, seed=3):
+        rng = np.random.default_rng(seed)
+        types = ['cube', 'sphere', 'cylinder', 'cone']
+        return [
+            Primitive.from_geometry(
+                types[i % 4], dict(zip('xyz', rng.uniform(-60, 60, 3))), dict(zip('xyz', rng.uniform(-3, 3, 3))),
+                {'x': 1, 'y': 1, 'z': 1},
+                {'width': 5, 'height': 3, 'depth': 4, 'radius': 2, 'radiusTop': 1, 'radiusBottom': 2}
+            )
+            for i in range(count)
+        ]
+
+    def test_bvh_path_lengths_match_brute_force(self):
+        rng = np.random.default_rng(5)
+        geometry = CompiledGeometry(self._primitives(200))
+        materials = rng.integers(-1, 4, 200)
+        origins = rng.uniform(-80, 80, (1000, 3))
+        ends = rng.uniform(-80, 80, (1000, 3))
+
+        traced = geometry.path_lengths(origins, ends, materials, 4)
+        segments, _ = geometry.bvh.candidate_pairs(origins, ends)
+        self.assertLess(len(segments), len(origins) * geometry.count / 4)
+
+        threshold = geometry_module.BVH_THRESHOLD
+        geometry_module.BVH_THRESHOLD = geometry.count
+        try:
+            brute_force = geometry.path_lengths(origins, ends, materials, 4)
+        finally:
+            geometry_module.BVH_THRESHOLD = threshold
+        np.testing.assert_allclose(traced, brute_force, atol=1e-9)
+
+    def test_compiled_geometry_is_cached_per_version(self):
+        first = compile_geometry(self._primitives(50))
+        self.assertIs(compile_geometry(self._primitives(50)), first)
+        self.assertIsNot(compile_geometry(self._primitives(50, seed=4)), first)
+
+
+class CSGTests(ShieldingProjectMixin, TestCase):
+    """Boolean solids are traced exactly from the intervals of their primitives"""
+
+    def _primitive(self, geometry_type, parameters, position=(0, 0, 0), rotation=(0, 0, 0)):
+        return Primitive.from_geometry(
+            geometry_type, dict(zip('xyz', position)), dict(zip('xyz', rotation)), {'x': 1, 'y': 1, 'z': 1}, parameters
+        )
+
+    def test_solid_path_lengths_match_sampled_segments(self):
+        rng = np.random.default_rng(11)
+        shapes = [
+            Solid('subtract', [
+                self._primitive('cylinder', {'radiusTop': 2, 'radiusBottom': 2, 'height': 6}, (-5, 0, 0), (0.3, 0, 0.2)),
+                self._primitive('cylinder', {'radiusTop': 1.5, 'radiusBottom': 1.5, 'height': 7}, (-5, 0, 0), (0.3, 0, 0.2)),
+            ]),
+            Solid('subtract', [
+                Solid('union', [
+                    self._primitive('cube', {'width': 3, 'height': 3, 'depth': 3}, (5, 0, 0)),
+                    self._primitive('sphere', {'radius': 2}, (6.5, 0, 0)),
+                ]),
+                self._primitive('sphere', {'radius': 1}, (5.5, 0, 0)),
+            ]),
+            Solid('intersect', [
+                self._primitive('cube', {'width': 3, 'height': 3, 'depth': 3}, (0, 5, 0)),
+                self._primitive('sphere', {'radius': 1.8}, (0, 5, 0)),
+            ]),
+            self._primitive('cone', {'radius': 1.5, 'height': 3}, (0, -5, 0)),
+        ]
+        geometry = CompiledGeometry(shapes)
+        self.assertEqual(geometry.count, 4)
+        self.assertIsInstance(geometry.primitive(1), Solid)
+        origins = rng.uniform(-9, 9, (300, 3))
+        ends = rng.uniform(-9, 9, (300, 3))
+
+        traced = geometry.path_lengths(origins, ends, [0, 1, 2, 3], 4)
+        steps = np.linspace(0, 1, 4001)[:, None, None]
+        points = (origins + steps * (ends - origins)).reshape(-1, 3)
+        length = np.linalg.norm(ends - origins, axis=1)
+        located = geometry.locate(points[:2000], [0, 1, 2, 3])
+        for i, shape in enumerate(shapes):
+            sampled = shape.contains(points).reshape(len(steps), -1).mean(axis=0) * length
+            np.testing.assert_allclose(traced[:, i], sampled, atol=2e-2)
+            np.testing.assert_array_equal(located == i, shape.contains(points[:2000]))
+
+        threshold = geometry_module.BVH_THRESHOLD
+        geometry_module.BVH_THRESHOLD = 0
+        try:
+            np.testing.assert_allclose(geometry.path_lengths(origins, ends, [0, 1, 2, 3], 4), traced, atol=1e-9)
+            np.testing.assert_array_equal(geometry.locate(points[:2000], [0, 1, 2, 3]), located)
+        finally:
+            geometry_module.BVH_THRESHOLD = threshold
+
+    def test_subtracted_shell_attenuates_exactly(self):
+        lead = Composition.objects.create(
+            project=self.project, name='Lead', density=11.35, color='#444444',
+            elements=[{'element': 'Pb', 'percentage': 100}]
+        )
+        self._add_volume('source', 'sphere', {'radius': 0.01}, is_source=True)
+        outer, inner = (
+            Geometry.objects.create(
+                project=self.project, name=name, geometry_type='sphere', position={'x': 0, 'y': 0, 'z': 0},
+                rotation={'x': 0, 'y': 0, 'z': 0}, scale={'x': 1, 'y': 1, 'z': 1}, geometry_parameters={'radius': radius}
+            )
+            for name, radius in (('outer', 10), ('inner', 9))
+        )
+        shell = Geometry.objects.create(
+            project=self.project, name='shell', geometry_type='csg', position={'x': 0, 'y': 0, 'z': 0},
+            rotation={'x': 0, 'y': 0, 'z': 0}, scale={'x': 1, 'y': 1, 'z': 1}, geometry_parameters={}
+        )
+        CSGOperation.objects.create(project=self.project, operation_type='subtract', source_objects=[outer.pk, inner.pk], result_object=shell)
+        Volume.objects.create(project=self.project, geometry=shell, composition=lead, volume_name='shell')
+        Sensor.objects.create(project=self.project, name='S', coordinates={'x': 0, 'y': 100, 'z': 0}, response_function='uncollided_flux')
+
+        result = run_computation(self.project, self.configuration)[0]
+        mu = mixture_attenuation(lead.elements, lead.density, [0.6617])[0]
+        self.assertAlmostEqual(result.dose_rate / (1e6 / (4 * np.pi * 100 ** 2)), np.exp(-mu), places=4)
+        self.configuration.method = 'monte_carlo'
+        self.configuration.save()
+        result = run_computation(self.project, self.configuration)[0]
+        self.assertAlmostEqual(result.dose_rate / (1e6 / (4 * np.pi * 100 ** 2)), np.exp(-mu), places=4)
+
+    def test_unreadable_operands_keep_the_result_shape(self):
+        self._add_volume('box', 'cube', {'width': 10, 'height': 10, 'depth': 10})
+        self._add_volume('ball', 'sphere', {'radius': 5})
+        box, ball = (Geometry.objects.get(project=self.project, name=name) for name in ('box', 'ball'))
+        for operands in ([ball.pk, 'mesh-7'], [ball.pk, 999999]):
+            CSGOperation.objects.create(project=self.project, operation_type='union', source_objects=operands, result_object=box)
+            scene = load_scene(self.project)
+            self.assertEqual([p.kind for p in scene.primitives], ['box', 'sphere'])
+            self.assertIn('refers to a missing geometry', scene.warnings[-1])
+
+
+class CompiledMaterialTests(TestCase):
+    """Compositions compile once into shared attenuation tables"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.projects = [Project.objects.create(name=f'P{i}', user=self.user) for i in range(2)]
+        self.elements = [{'element': 'Pb', 'percentage': 90}, {'element': 'H2O', 'percentage': 10}]
+
+    def _composition(self, project, elements):
+        return Composition.objects.create(project=project, name='Mix', density=10.0, color='#000000', elements=elements)
+
+    def test_compiled_table_matches_mixture_and_is_shared(self):
+        first = compile_composition(self._composition(self.projects[0], self.elements))
+        second = compile_composition(self._composition(self.projects[1], list(reversed(self.elements))))
+        self.assertIs(first, second)
+
+        energies = [0.02, 0.0879, 0.0881, 0.6617, 1.25, 7.0]
+        np.testing.assert_allclose(
+            first.attenuation(energies, 10.0), mixture_attenuation(self.elements, 10.0, energies), rtol=2e-3
+        )
+
+        # Element compositions reference elements by id
+        ids = {symbol: Element.objects.create(atomic_number=z, symbol=symbol, name=symbol, atomic_mass=mass).pk
+               for symbol, z, mass in [('H', 1, 1.008), ('O', 8, 15.999), ('Pb', 82, 207.2)]}
+        water = mixture_attenuation([{'element': 'H2O', 'percentage': 100}], 1.0, [1.0])
+        by_id = ElementComposition.objects.create(
+            project=self.projects[0], name='Water', density=1.0,
+            elements=[{'element_id': ids['H'], 'percentage': 11.19}, {'element_id': ids['O'], 'percentage': 88.81}]
+        )
+        np.testing.assert_allclose(compile_composition(by_id).attenuation([1.0], 1.0), water, rtol=1e-3)
+
+    def test_edited_composition_is_recompiled(self):
+        composition = self._composition(self.projects[0], self.elements)
+        before = compile_composition(composition)
+        self.assertIs(compile_composition(composition), before)
+
+        composition.elements = [{'element': 'Fe', 'percentage': 100}]
+        composition.save()
+        after = compile_composition(Composition.objects.get(pk=composition.pk))
+        self.assertNotEqual(after.key, before.key)
+        np.testing.assert_allclose(after.attenuation([1.0], 1.0), mixture_attenuation(composition.elements, 1.0, [1.0]), rtol=1e-3)
+
+
+class BuildupTests(TestCase):
+    """G-P buildup factors and their multilayer combination"""
+
+    def test_gp_form(self):
+        parameters = np.array(GP_PARAMETERS['iron'][1])
+        mfp = np.array([0.0, 1.0, 5.0, 20.0])
+        buildup = gp_buildup(mfp[:, None], parameters)
+        np.testing.assert_allclose(buildup[0], 1.0, atol=1e-6)
+        # B(1 mfp) = b by construction of the G-P form
+        np.testing.assert_allclose(buildup[1], parameters[:, 0], rtol=1e-2)
+        self.assertTrue(np.all(np.diff(buildup, axis=0) > 0))
+        # K = 1 reduces to linear buildup
+        self.assertAlmostEqual(float(gp_buildup(3.0, [2.0, 1.0, 0.0, 14.0, 0.0])), 4.0)
+
+    def test_deep_penetration_stays_finite(self):
+        parameters = np.array(GP_PARAMETERS['iron'][1])
+        buildup = gp_buildup(np.array([40.0, 100.0, 1000.0])[:, None], parameters)
+        self.assertTrue(np.isfinite(buildup).all())
+        np.testing.assert_allclose(buildup[1:], buildup[:1].repeat(2, axis=0))
+        # The attenuated flux vanishes instead of becoming NaN
+        flux = multilayer_buildup(np.array([[[1000.0]]]), parameters[:1, None]) * np.exp(-1000.0)
+        np.testing.assert_array_equal(flux, 0.0)
+
+    def test_materials_interpolate_and_combine(self):
+        water = material_parameters(compile_material([{'element': 'H2O', 'percentage': 100}]))
+        lead = material_parameters(compile_material([{'element': 'Pb', 'percentage': 100}]))
+        np.testing.assert_allclose(lead, GP_PARAMETERS['lead'][1])
+        np.testing.assert_allclose(water, GP_PARAMETERS['water'][1], rtol=1e-2)
+
+        parameters = np.stack([water[3:4], lead[3:4]])  # 1 MeV, shape (2, 1, 5)
+        only_lead = multilayer_buildup(np.array([[[0.0], [4.0]]]), parameters)
+        np.testing.assert_allclose(only_lead, gp_buildup(4.0, lead[3]))
+        mixed = multilayer_buildup(np.array([[[2.0], [2.0]]]), parameters)
+        self.assertTrue(gp_buildup(4.0, lead[3]) < mixed[0, 0] < gp_buildup(4.0, water[3]))
+        np.testing.assert_allclose(multilayer_buildup(np.zeros((3, 2, 1)), parameters), 1.0)
+
+
+class SourceMeshTests(TestCase):
+    """Source volumes are discretized on their mesh configurations"""
+
+    def test_cylindrical_mesh_cells(self):
+        cylinder = Primitive.from_geometry(
+            'cylinder', {'x': 10, 'y': 0, 'z': 0}, {'x': 0.3, 'y': 0, 'z': 0.5}, {'x': 1, 'y': 1, 'z': 1},
+            {'radiusTop': 20, 'radiusBottom': 20, 'height': 50}
+        )
+        mesh = build_mesh(
+            cylinder, 'cylindrical', {'r': {'proposed': [0, 10, 20]}, 'phi': [0, 2 * np.pi], 'z': [-25, 25]},
+            {'r': [{'interval': 0, 'partitions': 2}, {'interval': 1, 'partitions': 3, 'mode': 'exponential'}], 'phi': 4, 'z': 2}
+        )
+        self.assertEqual(len(mesh.weights), 5 * 4 * 2)
+        self.assertAlmostEqual(mesh.volumes.sum() / (np.pi * 20 ** 2 * 50), 1.0, places=6)
+        self.assertAlmostEqual(mesh.weights.sum(), 1.0)
+
+        points = mesh.sample(np.random.default_rng(0), 4000)
+        self.assertTrue(cylinder.contains_local(cylinder.to_local(points)).all())
+        # Every cell receives its share of the points
+        radius = np.linalg.norm(cylinder.to_local(points)[:, [0, 2]], axis=1)
+        expected = mesh.weights[mesh.lower[:, 0] >= 10].sum() * 4000
+        self.assertLessEqual(abs((radius >= 10).sum() - expected), 40)
+
+    def test_scene_sources_use_cached_meshes(self):
+        user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        project = Project.objects.create(name='Meshed', user=user)
+        build_scene(project, 2)
+        MeshConfiguration.objects.create(
+            volume=project.volumes.get(is_source=True), coordinate_system='cartesian',
+            bounds={'x': [7.5, 10, 12.5], 'y': [-2.5, 2.5], 'z': [-2.5, 2.5]}, subdivisions={'x': 2, 'y': 2, 'z': 2}
+        )
+
+        first, second = load_scene(project), load_scene(project)
+        self.assertEqual(len(first.sources), 1)
+        self.assertIsNotNone(first.sources[0].mesh)
+        self.assertIs(first.sources[0].mesh, second.sources[0].mesh)
+        self.assertEqual(first.sources[0].sample(first.primitives, np.random.default_rng(1), 100).shape, (100, 3))
+
+
+class PointKernelTests(ShieldingProjectMixin, TestCase):
+    """The point-kernel engine reproduces analytic shielding results"""
+
+    def _result(self, sensor_name):
+        return ComputationResult.objects.get(configuration=self.configuration, sensor__name=sensor_name)
+
+    def test_shielded_point_source_matches_exponential_attenuation(self):
+        iron = Composition.objects.create(
+            project=self.project, name='Iron', density=7.87, color='#888888',
+            elements=[{'element': 'Fe', 'percentage': 100}]
+        )
+        self._add_volume('source', 'sphere', {'radius': 0.01}, is_source=True)
+        self._add_volume('slab', 'cube', {'width': 2, 'height': 200, 'depth': 200}, position={'x': 50, 'y': 0, 'z': 0}, composition=iron)
+        Sensor.objects.create(project=self.project, name='OPEN', coordinates={'x': -100, 'y': 0, 'z': 0}, response_function='uncollided_flux')
+        Sensor.objects.create(project=self.project, name='BEHIND', coordinates={'x': 100, 'y': 0, 'z': 0}, response_function='uncollided_flux')
+
+        run_computation(self.project, self.configuration)
+
+        expected = 1e6 / (4 * np.pi * 100 ** 2)
+        mu = mixture_attenuation(iron.elements, iron.density, [0.6617])[0]
+        self.assertAlmostEqual(self._result('OPEN').dose_rate / expected, 1.0, places=3)
+        self.assertAlmostEqual(self._result('BEHIND').dose_rate / expected, np.exp(-2 * mu), places=3)
+        self.assertEqual(self._result('OPEN').unit, 'γ/cm²/s')
+
+    def test_drum_scene_dose_falls_with_distance(self):
+        call_command('populate_example_scenes', stdout=StringIO())
+        self.project = instantiate_example_scene(ExampleScene.objects.get(name='DUMTUTOR-PCS'), user=self.user)
+        self.configuration.project = self.project
+        self.configuration.save()
+        self.spectrum.project = self.project
+        self.spectrum.save()
+        self.project.volumes.filter(is_source=True).update(spectrum=self.spectrum)
+        for i, distance in enumerate([50, 100, 200]):
+            Sensor.objects.create(project=self.project, name=f'D{i}', coordinates={'x': distance, 'y': 0, 'z': 0})
+
+        started = time.perf_counter()
+        results = run_computation(self.project, self.configuration)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+        doses = [self._result(f'D{i}').dose_rate for i in range(3)]
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(r.unit == 'μSv/h' for r in results))
+        self.assertGreater(doses[0], doses[1])
+        self.assertGreater(doses[1], doses[2])
+        self.assertTrue(all(0 < r.uncertainty < 0.2 for r in results))
+
+    def test_start_computation_endpoint(self):
+        self._add_volume('source', 'sphere', {'radius': 5}, is_source=True)
+        Sensor.objects.create(project=self.project, name='S1', coordinates={'x': 100, 'y': 0, 'z': 0})
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(
+            reverse('projects:start-computation', args=[self.project.id]),
+            {'particles_per_sample': 2000, 'number_of_samples': 10}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['job']['status'], 'queued')
+
+        call_command('runcomputations', '--once', stdout=StringIO())
+        job = ComputationJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.status, 'success')
+        self.assertEqual(job.progress, 1.0)
+        self.assertEqual(job.samples, 10)
+        self.assertLess(job.uncertainty, 0.2)
+        result = job.results.get()
+        self.assertEqual(result.sensor, self.project.sensors.get())
+        self.assertGreater(result.dose_rate, 0)
+        self.assertEqual(len(result.log_data['convergence_history']), 9)
+
+    async def test_job_progress_events(self):
+        user = await User.objects.acreate(email='stream@example.com', username='stream')
+        token = await Token.objects.acreate(user=user)
+        project = await Project.objects.acreate(name='Streamed', user=user)
+        job = await ComputationJob.objects.acreate(project=project, status='success', progress=1.0, samples=10)
+        url = reverse('projects:computation-job-events', args=[job.pk])
+
+        self.assertEqual((await AsyncClient().get(url)).status_code, 401)
+        self.assertEqual((await AsyncClient().get(url, query_params={'token': token.key})).status_code, 401)
+        response = await AsyncClient().get(url, headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(events.startswith('event: done\n'))
+        self.assertEqual(json.loads(events.split('data: ')[1])['progress'], 1.0)
+
+    async def test_event_source_streams_with_a_ticket(self):
+        # The front end sends its token in a header, which EventSource cannot do
+        user = await User.objects.acreate(email='browser@example.com', username='browser')
+        token = await Token.objects.acreate(user=user)
+        project = await Project.objects.acreate(name='Streamed', user=user)
+        job = await ComputationJob.objects.acreate(project=project, status='success', progress=1.0)
+        other = await ComputationJob.objects.acreate(project=project, status='success')
+        issue = reverse('projects:computation-job-stream-ticket', args=[job.pk])
+        headers = {'Authorization': f'Token {token.key}'}
+
+        self.assertEqual((await AsyncClient().post(issue)).status_code, 403)
+        ticket = (await AsyncClient().post(issue, headers=headers)).json()
+        response = await AsyncClient().get(ticket['url'])
+        self.assertEqual(response.status_code, 200)
+        events = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(events.startswith('event: done\n'))
+        # Tickets are single-use, bound to their job and short-lived
+        self.assertEqual((await AsyncClient().get(ticket['url'])).status_code, 401)
+        ticket = (await AsyncClient().post(issue, headers=headers)).json()
+        other_url = reverse('projects:computation-job-events', args=[other.pk])
+        self.assertEqual((await AsyncClient().get(other_url, query_params={'ticket': ticket['ticket']})).status_code, 401)
+        expired = timezone.now() - timedelta(seconds=settings.STREAM_TICKET_LIFETIME + 1)
+        await StreamTicket.objects.filter(key=ticket['ticket']).aupdate(created_at=expired)
+        self.assertEqual((await AsyncClient().get(ticket['url'])).status_code, 401)
+
+    async def test_stale_job_ends_its_stream(self):
+        user = await User.objects.acreate(email='crashed@example.com', username='crashed')
+        project = await Project.objects.acreate(name='Crashed', user=user)
+        job = await ComputationJob.objects.acreate(project=project, status='running')
+        stale = timezone.now() - timedelta(seconds=settings.COMPUTATION_JOB_TIMEOUT + 1)
+        await ComputationJob.objects.filter(pk=job.pk).aupdate(updated_at=stale)
+
+        client = AsyncClient()
+        await client.aforce_login(user)
+        response = await client.get(reverse('projects:computation-job-events', args=[job.pk]))
+        events = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(events.startswith('event: done\n'))
+        self.assertEqual(json.loads(events.split('data: ')[1])['status'], 'error')
+
+    def test_job_without_successful_results_fails(self):
+        self._add_volume('source', 'sphere', {'radius': 5}, is_source=True)
+        self.project.volumes.update(spectrum=None)
+        Sensor.objects.create(project=self.project, name='S1', coordinates={'x': 100, 'y': 0, 'z': 0})
+        job = enqueue_computation(self.project, [self.configuration])
+        # A job left running by a crashed worker is failed on the next claim
+        crashed = ComputationJob.objects.create(project=self.project, status='running')
+        ComputationJob.objects.filter(pk=crashed.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.COMPUTATION_JOB_TIMEOUT + 1)
+        )
+
+        self.assertEqual(claim_job(), job)
+        job = run_job(job)
+        self.assertEqual(job.status, 'error')
+        self.assertEqual(job.error, job.results.get().log_data['steps'][-1])
+        crashed.refresh_from_db()
+        self.assertEqual(crashed.status, 'error')
+
+    def test_failed_stale_job_stays_failed(self):
+        self._add_volume('source', 'sphere', {'radius': 5}, is_source=True)
+        Sensor.objects.create(project=self.project, name='S1', coordinates={'x': 100, 'y': 0, 'z': 0})
+        enqueue_computation(self.project, [self.configuration])
+        job = claim_job()
+        # Failed as stale while the run goes on
+        ComputationJob.objects.filter(pk=job.pk).update(status='error', error=STALE_ERROR)
+
+        with self.assertLogs('projects.jobs', 'WARNING'):
+            job = run_job(job)
+        self.assertEqual((job.status, job.error), ('error', STALE_ERROR))
+        self.assertFalse(job.results.exists())
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    """Running jobs are kept alive by a worker thread, not by engine progress"""
+
+    def test_heartbeat_keeps_a_silent_job_alive(self):
+        user = User.objects.create_user(email='worker@example.com', username='worker', password='pw')
+        job = ComputationJob.objects.create(project=Project.objects.create(name='Silent', user=user), status='running')
+        ComputationJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.COMPUTATION_JOB_TIMEOUT + 1)
+        )
+        self.assertTrue(stale_jobs().filter(pk=job.pk).exists())
+
+        heartbeat = Heartbeat(job.pk, interval=0.01)
+        heartbeat.start()
+        time.sleep(0.2)
+        heartbeat.stop()
+        self.assertFalse(stale_jobs().filter(pk=job.pk).exists())
+
+
+class ResultCacheTests(ShieldingProjectMixin, TestCase):
+    """Results are reused for unchanged scene content"""
+
+    def test_identical_scene_returns_stored_results(self):
+        self._add_volume('source', 'sphere', {'radius': 5}, is_source=True)
+        Sensor.objects.create(project=self.project, name='S1', coordinates={'x': 100, 'y': 0, 'z': 0})
+        first = run_computation(self.project, self.configuration)
+
+        # Renaming a volume does not change the scene content
+        self.project.volumes.update(volume_name='renamed')
+        self.assertEqual([r.pk for r in run_computation(self.project, self.configuration)], [r.pk for r in first])
+        forced = run_computation(self.project, self.configuration, reuse=False)
+        self.assertNotEqual(forced[0].pk, first[0].pk)
+        self.assertEqual(forced[0].dose_rate, first[0].dose_rate)
+
+    def test_only_sensors_reached_by_a_change_are_recomputed(self):
+        lead = Composition.objects.create(
+            project=self.project, name='Lead', density=11.35, color='#555555',
+            elements=[{'element': 'Pb', 'percentage': 100}]
+        )
+        self._add_volume('source', 'sphere', {'radius': 1}, is_source=True)
+        wall = self._add_volume('wall', 'cube', {'width': 2, 'height': 50, 'depth': 50}, position={'x': 50, 'y': 0, 'z': 0}, composition=lead)
+        Sensor.objects.create(project=self.project, name='NEAR', coordinates={'x': 100, 'y': 0, 'z': 0})
+        Sensor.objects.create(project=self.project, name='FAR', coordinates={'x': -100, 'y': 0, 'z': 0})
+        run_computation(self.project, self.configuration)
+        before = {r.sensor.name: r for r in self.configuration.results.all()}
+
+        wall.geometry.geometry_parameters = {'width': 4, 'height': 50, 'depth': 50}
+        wall.geometry.save()
+        after = {r.sensor.name: r for r in run_computation(self.project, self.configuration)}
+        self.assertEqual(after['FAR'].log_data['reused_from'], before['FAR'].pk)
+        self.assertEqual(after['FAR'].dose_rate, before['FAR'].dose_rate)
+        self.assertNotIn('reused_from', after['NEAR'].log_data)
+        self.assertLess(after['NEAR'].dose_rate, before['NEAR'].dose_rate)
+
+
+class ToleranceTests(ShieldingProjectMixin, TestCase):
+    """Tolerance configurations are evaluated by correlated sampling of the nominal run"""
+
+    def _scene(self):
+        iron = Composition.objects.create(
+            project=self.project, name='Iron', density=7.87, color='#888888',
+            elements=[{'element': 'Fe', 'percentage': 100}]
+        )
+        source = self._add_volume('source', 'sphere', {'radius': 2}, is_source=True)
+        slab = self._add_volume('slab', 'cube', {'width': 4, 'height': 20, 'depth': 200}, position={'x': 50, 'y': 0, 'z': 0}, composition=iron)
+        ToleranceConfiguration.objects.create(volume=source, coordinate='x', plus_delta=10, plus_contribution='+', minus_delta=10, minus_contribution='-')
+        ToleranceConfiguration.objects.create(volume=slab, coordinate='y', plus_delta=9.5, plus_contribution='-')
+        for name, y in (('BEHIND', 0), ('EDGE', 12)):
+            Sensor.objects.create(project=self.project, name=name, coordinates={'x': 100, 'y': y, 'z': 0})
+        Sensor.objects.create(project=self.project, name='OPEN', coordinates={'x': -100, 'y': 0, 'z': 0})
+
+    def test_correlated_runs_match_moved_geometry(self):
+        self._scene()
+        scene = load_scene(self.project)
+        for config_type in ('minimum', 'maximum'):
+            perturbation = tolerance_perturbation(scene, ToleranceConfiguration.objects.all(), config_type)
+            self.assertEqual(len(perturbation.shifts), 2 if config_type == 'minimum' else 1)
+            correlated = correlated_point_kernel(scene, [perturbation], points_per_source=500, batches=4, seed=5)[1]
+            direct = point_kernel(perturbation.apply(scene), points_per_source=500, batches=4, seed=5)
+            np.testing.assert_allclose(correlated.flux, direct.flux, rtol=1e-9)
+            np.testing.assert_allclose(correlated.uncollided, direct.uncollided, rtol=1e-9)
+
+    def test_tolerance_study_shares_one_run(self):
+        self._scene()
+        configurations = [self.configuration] + [
+            ComputationConfiguration.objects.create(project=self.project, name=t, config_type=t, particles_per_sample=2000)
+            for t in ('minimum', 'maximum')
+        ]
+        run_computations(self.project, configurations)
+
+        def result(config_type, sensor):
+            return ComputationResult.objects.get(configuration__config_type=config_type, sensor__name=sensor)
+
+        for sensor in ('BEHIND', 'EDGE'):
+            self.assertGreater(result('maximum', sensor).dose_rate, result('nominal', sensor).dose_rate)
+        # Moving the source towards +x takes it away from the open sensor
+        self.assertLess(result('maximum', 'OPEN').dose_rate, result('nominal', 'OPEN').dose_rate)
+        maximum = result('maximum', 'BEHIND')
+        tolerance = maximum.log_data['tolerance']
+        self.assertEqual(tolerance['shifted_volumes'], [self.project.volumes.get(is_source=True).id])
+        self.assertAlmostEqual(tolerance['nominal'], result('nominal', 'BEHIND').dose_rate)
+        # The correlated difference is more precise than either estimate
+        self.assertLess(tolerance['difference_uncertainty'], 0.5 * maximum.uncertainty * maximum.dose_rate)
+        self.assertNotIn('tolerance', result('nominal', 'BEHIND').log_data)
+
+
+class DoseMapTests(ShieldingProjectMixin, TestCase):
+    """Dose maps evaluate a whole grid in one pass"""
+
+    def test_map_matches_exact_tracing(self):
+        iron = Composition.objects.create(
+            project=self.project, name='Iron', density=7.87, color='#888888',
+            elements=[{'element': 'Fe', 'percentage': 100}]
+        )
+        self._add_volume('source', 'sphere', {'radius': 1}, is_source=True)
+        self._add_volume('wall', 'cube', {'width': 5, 'height': 40, 'depth': 40}, position={'x': 30, 'y': 10, 'z': 0}, composition=iron)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(reverse('projects:dose-map-list', args=[self.project.id]), {
+            'name': 'Floor', 'plane': 'xy', 'offset': 0, 'resolution': [81, 61], 'points_per_source': 50,
+            'extents': {'x': [-60, 60], 'y': [-45, 45]},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        dose_map = DoseMap.objects.get()
+        response = client.post(reverse('projects:compute-dose-map', args=[dose_map.id]))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['job']['kind'], 'dose_map')
+        self.assertEqual(DoseMap.objects.get().status, 'pending')
+        call_command('runcomputations', '--once', stdout=StringIO())
+        job = ComputationJob.objects.get(pk=response.data['job']['id'])
+        self.assertEqual(job.status, 'success')
+        response = client.get(reverse('projects:dose-map-detail', args=[dose_map.id]))
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertNotIn('data', response.json())
+
+        response = client.get(reverse('projects:dose-map-data', args=[dose_map.id]))
+        self.assertEqual(response['X-Dose-Map-Shape'], '81,61')
+        values = np.frombuffer(response.content, dtype='<f4').reshape(81, 61)
+        self.assertLess(DoseMap.objects.get().log_data['refined_fraction'], 0.9)
+
+        # The same map traced point by point
+        original = dose_map_module.COARSE_STEP
+        dose_map_module.COARSE_STEP = 1
+        try:
+            exact = map_array(run_dose_map(DoseMap.objects.get()))
+        finally:
+            dose_map_module.COARSE_STEP = original
+        np.testing.assert_allclose(values, exact, rtol=0.01)
+        # The wall shadows the far side of the map
+        self.assertLess(values[-1, 40], 0.3 * values[0, 40])
+
+        response = client.get(reverse('projects:dose-map-image', args=[dose_map.id]))
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content[:8], b'\x89PNG\r\n\x1a\n')
+
+
+def build_cerium_chain():
+    """Ce-144 (133.5 keV) decaying to Pr-144 (696.5 keV) and stable Nd-144"""
+    cerium = Element.objects.create(atomic_number=58, symbol='Ce', name='Cerium')
+    praseodymium = Element.objects.create(atomic_number=59, symbol='Pr', name='Praseodymium')
+    neodymium = Element.objects.create(atomic_number=60, symbol='Nd', name='Neodymium')
+    ce144 = Isotope.objects.create(element=cerium, mass_number=144, half_life='284.9 d')
+    pr144 = Isotope.objects.create(element=praseodymium, mass_number=144, half_life='17.28 min')
+    nd144 = Isotope.objects.create(element=neodymium, mass_number=144, half_life='stable', is_stable=True)
+    GammaSpectrum.objects.create(isotope=ce144, energy=133.5, intensity=11.1)
+    GammaSpectrum.objects.create(isotope=pr144, energy=696.5, intensity=1.34)
+    DecayPath.objects.create(parent_isotope=ce144, daughter_isotope=pr144, decay_type='beta_minus')
+    DecayPath.objects.create(parent_isotope=pr144, daughter_isotope=nd144, decay_type='beta_minus')
+
+
+class IsotopeProjectMixin:
+    """A project with a Ce-144 group spectrum, and an unknown nuclide, over the Ce-144 decay chain"""
+
+    def setUp(self):
+        build_cerium_chain()
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='pw')
+        self.project = Project.objects.create(name='Waste drum', user=self.user)
+        self.spectrum = Spectrum.objects.create(
+            project=self.project, name='Fission products', spectrum_type='group', multiplier=2.0,
+            isotopes=[{'isotope': 'Ce-144', 'activity': 1e9}, 'Xx-1']
+        )
+
+
+class SourceTermTests(IsotopeProjectMixin, TestCase):
+    """Isotope spectra expand into gamma lines and collapse onto energy groups"""
+
+    def test_isotope_lines_with_daughters(self):
+        energies, emissions, warnings = source_emissions(self.spectrum, by_isotope=True, equilibrium=True)
+        np.testing.assert_allclose(energies, [0.1335, 0.6965])
+        np.testing.assert_allclose(emissions, [2e9 * 0.111, 2e9 * 0.0134], rtol=1e-4)
+        self.assertEqual(len(warnings), 1)
+
+        energies, _, _ = source_emissions(self.spectrum, by_isotope=True, equilibrium=False)
+        np.testing.assert_allclose(energies, [0.1335])
+
+    def test_groups_keep_emitted_power(self):
+        lines, line_emissions, _ = source_emissions(self.spectrum, by_isotope=True)
+        boundaries = [10, 100, 200, 500, 1000, 2000]
+        energies, emissions, _ = source_emissions(self.spectrum, by_isotope=True, grouped=True, boundaries=boundaries)
+        np.testing.assert_allclose(energies * 1000, group_energies(boundaries)[[1, 3]])
+        self.assertAlmostEqual(emissions @ energies / (line_emissions @ lines), 1.0)
+
+        geometry = Geometry.objects.create(
+            project=self.project, name='drum', geometry_type='sphere', position={'x': 0, 'y': 0, 'z': 0},
+            rotation={'x': 0, 'y': 0, 'z': 0}, scale={'x': 1, 'y': 1, 'z': 1}, geometry_parameters={'radius': 10}
+        )
+        Volume.objects.create(
+            project=self.project, geometry=geometry, volume_name='drum', spectrum=self.spectrum,
+            is_source=True, gamma_selection_mode='by-groups'
+        )
+        scene = load_scene(self.project)
+        self.assertTrue(np.isin(scene.sources[0].energies * 1000, group_energies(settings.SOURCE_GROUP_BOUNDARIES)).all())
+        self.assertIn('Xx-1', scene.warnings[0])
+
+
+class TimeDependentDoseTests(IsotopeProjectMixin, TestCase):
+    """Decaying inventories reuse one set of per-nuclide dose kernels"""
+
+    def setUp(self):
+        super().setUp()
+        geometry = Geometry.objects.create(
+            project=self.project, name='drum', geometry_type='sphere', position={'x': 0, 'y': 0, 'z': 0},
+            rotation={'x': 0, 'y': 0, 'z': 0}, scale={'x': 1, 'y': 1, 'z': 1}, geometry_parameters={'radius': 0.01}
+        )
+        Volume.objects.create(
+            project=self.project, geometry=geometry, volume_name='drum', spectrum=self.spectrum,
+            is_source=True, gamma_selection_mode='by-isotope'
+        )
+        Sensor.objects.create(project=self.project, name='S', coordinates={'x': 100, 'y': 0, 'z': 0}, response_function='uncollided_flux')
+
+    def test_dose_decays_with_its_chain(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            reverse('projects:dose-time-series', args=[self.project.id]), {'times': [0, 1, 2], 'time_unit': 'y'}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['job']['kind'], 'time_series')
+        call_command('runcomputations', '--once', stdout=StringIO())
+        response = client.get(reverse('projects:computation-job-detail', args=[response.data['job']['id']]))
+        self.assertEqual(response.data['status'], 'success')
+        output = response.data['output']
+        sensor = output['sensors'][0]
+        self.assertEqual(sensor['unit'], 'γ/cm²/s')
+
+        # Pr-144 starts in equilibrium, so the whole chain follows the Ce-144 half-life
+        ratio = 2e9 * (0.111 + 0.0134 * 284.9 * 1440 / (284.9 * 1440 - 17.28)) / (4 * np.pi * 100 ** 2)
+        decayed = np.exp(-np.log(2) * np.array([0, 1, 2]) * 365.25 / 284.9)
+        np.testing.assert_allclose(sensor['dose_rates'], ratio * decayed, rtol=1e-3)
+        np.testing.assert_allclose(
+            np.add(sensor['nuclides']['Ce-144'], sensor['nuclides']['Pr-144']), sensor['dose_rates'], rtol=1e-9
+        )
+        activities = output['inventories'][0]['activities']
+        self.assertEqual(list(activities), ['Ce-144', 'Pr-144', 'Nd-144'])
+        self.assertAlmostEqual(activities['Ce-144'][0] / 2e9, 1.0)
+
+        response = client.post(reverse('projects:dose-time-series', args=[self.project.id]), {'times': [-1]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.post(
+            reverse('projects:dose-time-series', args=[self.project.id]), {'times': [0] * (MAX_TIMES + 1)}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ComputationJob.objects.count(), 1)
+
+
+class ResponseTests(ShieldingProjectMixin, TestCase):
+    """Every sensor response follows from one run's energy-resolved flux"""
+
+    def test_response_library_units(self):
+        energies = [0.1, 0.6617, 1.25]
+        kerma = response_coefficients('kerma_air', energies)
+        np.testing.assert_allclose(response_coefficients('kerma_rad', energies), kerma / 10)
+        np.testing.assert_allclose(response_coefficients('exposure', energies), kerma / 8.764)
+        # Air kerma at 662 keV is about 3.1 pGy·cm², effective dose below H*(10)
+        self.assertAlmostEqual(kerma[1] / 3.6e-3, 3.1, delta=0.05)
+        self.assertTrue(np.all(response_coefficients('effective_dose', energies) < response_coefficients('ambient_dose', energies)))
+
+    def test_all_responses_from_one_run(self):
+        self._add_volume('source', 'sphere', {'radius': 0.01}, is_source=True)
+        Sensor.objects.create(project=self.project, name='S', coordinates={'x': 100, 'y': 0, 'z': 0}, response_function='kerma_air')
+        for method in ('point_kernel', 'monte_carlo'):
+            self.configuration.method = method
+            self.configuration.save()
+            result = run_computation(self.project, self.configuration)[0]
+            responses = result.log_data['responses']
+            self.assertEqual(set(responses), set(RESPONSE_UNITS))
+            flux = 1e6 / (4 * np.pi * 100 ** 2)
+            self.assertAlmostEqual(responses['uncollided_flux']['value'] / flux, 1.0, places=3)
+            self.assertAlmostEqual(responses['energy_flux']['value'] / (0.6617 * flux), 1.0, places=3)
+            self.assertAlmostEqual(responses['kerma_air']['value'] / result.dose_rate, 1.0, places=6)
+            self.assertEqual(result.unit, 'μGy/h')
+
+
+class MonteCarloTests(ShieldingProjectMixin, TestCase):
+    """The Monte-Carlo engine transports photons until the sensors converge"""
+
+    def test_compton_sampling_follows_klein_nishina(self):
+        rng = np.random.default_rng(3)
+        energies, cosines = sample_compton(rng, np.full(200000, 1.0))
+        grid = np.linspace(-1, 1, 2001)
+        density, scattered = klein_nishina_density(np.full_like(grid, 1.0), grid)
+        self.assertAlmostEqual(np.trapezoid(density, grid) * 2 * np.pi, 1.0, places=4)
+        expected = np.trapezoid(density * grid, grid) * 2 * np.pi
+        self.assertAlmostEqual(cosines.mean(), expected, delta=0.005)
+        np.testing.assert_allclose(energies, 1.0 / (1 + (1 - cosines) / 0.51099895))
+
+    def test_shielded_source_converges(self):
+        self.configuration.method = 'monte_carlo'
+        self.configuration.convergence_criterion = 0.05
+        self.configuration.number_of_samples = 50
+        self.configuration.save()
+        water = Composition.objects.create(
+            project=self.project, name='Water', density=1.0, color='#0000FF',
+            elements=[{'element': 'H2O', 'percentage': 100}]
+        )
+        self._add_volume('source', 'sphere', {'radius': 0.01}, is_source=True)
+        self._add_volume('slab', 'cube', {'width': 10, 'height': 200, 'depth': 200}, position={'x': 50, 'y': 0, 'z': 0}, composition=water)
+        Sensor.objects.create(project=self.project, name='UNCOLLIDED', coordinates={'x': 100, 'y': 0, 'z': 0}, response_function='uncollided_flux')
+        Sensor.objects.create(project=self.project, name='DOSE', coordinates={'x': 100, 'y': 0, 'z': 0})
+
+        run_computation(self.project, self.configuration)
+
+        uncollided = ComputationResult.objects.get(sensor__name='UNCOLLIDED')
+        dose = ComputationResult.objects.get(sensor__name='DOSE')
+        mu = mixture_attenuation(water.elements, 1.0, [0.6617])[0]
+        self.assertAlmostEqual(uncollided.dose_rate / (1e6 * np.exp(-10 * mu) / (4 * np.pi * 100 ** 2)), 1.0, places=2)
+        self.assertTrue(dose.converged)
+        self.assertLess(dose.uncertainty, 0.05)
+        samples = dose.log_data['samples']
+        self.assertLess(samples, 50)
+        self.assertEqual(len(dose.log_data['convergence_history']), samples - 1)
+        # Scattered photons add to the uncollided dose
+        uncollided_dose = uncollided.dose_rate * response_coefficients('ambient_dose', [0.6617])[0]
+        self.assertGreater(dose.dose_rate, 1.05 * uncollided_dose)
+
+    def test_parallel_samples_are_reproducible(self):
+        scene = Scene(
+            primitives=[
+                Primitive('sphere', np.zeros(3), np.eye(3), np.ones(3), np.array([1.0])),
+                Primitive('box', np.array([30.0, 0, 0]), np.eye(3), np.ones(3), np.array([5.0, 50, 50])),
+            ],
+            materials=[Material('Water', [{'element': 'H2O', 'percentage': 100}], 1.0)],
+            primitive_materials=[-1, 0],
+            sources=[Source('Co-60', 0, np.array([1.173, 1.332]), np.array([1e6, 1e6]))],
+            sensors=[SensorPoint(1, 'S', np.array([60.0, 0, 0]), 'ambient_dose', 'automatic')],
+        )
+        serial = monte_carlo(scene, particles_per_sample=1000, max_samples=6, convergence_criterion=1e-4, seed=11)
+        parallel = monte_carlo(scene, particles_per_sample=1000, max_samples=6, convergence_criterion=1e-4, seed=11, workers=3)
+        self.assertEqual(serial.samples, 6)
+        np.testing.assert_array_equal(serial.responses, parallel.responses)
+
+
+class ImportanceTests(ShieldingProjectMixin, TestCase):
+    """Weight windows from the point-kernel adjoint keep Monte-Carlo unbiased and cut its variance"""
+
+    def _slab_scene(self, *sensors):
+        return Scene(
+            primitives=[
+                Primitive('sphere', np.zeros(3), np.eye(3), np.ones(3), np.array([1.0])),
+                Primitive('box', np.array([30.0, 0, 0]), np.eye(3), np.ones(3), np.array([5.0, 50, 50])),
+            ],
+            materials=[Material('Iron', [{'element': 'Fe', 'percentage': 100}], 7.87)],
+            primitive_materials=[-1, 0],
+            sources=[Source('Cs-137', 0, np.array([0.6617]), np.array([1e6]))],
+            sensors=list(sensors) or [SensorPoint(1, 'S', np.array([60.0, 0, 0]), 'ambient_dose', 'automatic')],
+        )
+
+    def test_windows_keep_the_expected_weight(self):
+        importance = importance_map(self._slab_scene())
+        rng = np.random.default_rng(5)
+        count = 200000
+        positions = np.column_stack([rng.uniform(25, 35, count), rng.uniform(-10, 10, (count, 2))])
+        particles = Particles(
+            positions, np.tile([1.0, 0, 0], (count, 1)), np.full(count, 0.6617), rng.uniform(0.001, 1.0, count)
+        )
+        weight = particles.weight.sum()
+        windowed = importance.windows(rng, particles, 1.0)
+        self.assertAlmostEqual(windowed.weight.sum() / weight, 1.0, delta=0.01)
+        targets = importance.targets[importance.cells(windowed.position), importance.nodes(windowed.energy)]
+        # Nothing is left below its window
+        self.assertTrue(np.all(windowed.weight >= targets / 2 * (1 - 1e-12)))
+
+    def test_deep_penetration_figure_of_merit_improves(self):
+        scene = self._slab_scene()
+        importance = importance_map(scene)
+        results = {}
+        for windows in (None, importance):
+            started = time.perf_counter()
+            result = monte_carlo(scene, particles_per_sample=1000, max_samples=20, convergence_criterion=1e-6, importance=windows)
+            elapsed = time.perf_counter() - started
+            mean, error, _ = batch_statistics(result.responses[:, 0])
+            results[windows is None] = (mean, error, 1 / (error ** 2 * elapsed))
+        (analog, analog_error, analog_merit), (weighted, weighted_error, weighted_merit) = results[True], results[False]
+        self.assertLess(abs(weighted - analog), 3 * np.hypot(analog * analog_error, weighted * weighted_error))
+        self.assertLess(weighted_error, analog_error)
+        self.assertGreater(weighted_merit, analog_merit)
+
+    def test_equi_importance_sensors_share_one_term(self):
+        sensors = [
+            SensorPoint(1, 'BEHIND', np.array([60.0, 0, 0]), 'ambient_dose', 'automatic', equi_importance=True),
+            SensorPoint(2, 'FRONT', np.array([-30.0, 0, 0]), 'ambient_dose', 'automatic', equi_importance=True),
+            SensorPoint(3, 'SIDE', np.array([30.0, 80, 0]), 'ambient_dose', 'automatic'),
+        ]
+        self.assertEqual(sensor_groups(sensors), [[2], [0, 1]])
+
+        scene = self._slab_scene(*sensors)
+        shared = importance_map(scene)
+        balanced = importance_map(replace(scene, sensors=[replace(s, equi_importance=False) for s in sensors]))
+        # Sharing a term with the unshielded sensor, the one behind the slab no longer draws photons through it
+        back = shared.cells(np.array([[34.9, 0, 0]]))[0], -1
+        self.assertGreater(shared.targets[back], 10 * balanced.targets[back])
+
+    def test_computation_reports_variance_reduction(self):
+        self.configuration.method = 'monte_carlo'
+        self.configuration.number_of_samples = 10
+        self.configuration.save()
+        iron = Composition.objects.create(
+            project=self.project, name='Iron', density=7.87, color='#888888',
+            elements=[{'element': 'Fe', 'percentage': 100}]
+        )
+        self._add_volume('source', 'sphere', {'radius': 0.01}, is_source=True)
+        self._add_volume('slab', 'cube', {'width': 10, 'height': 100, 'depth': 100}, position={'x': 30, 'y': 0, 'z': 0}, composition=iron)
+        Sensor.objects.create(project=self.project, name='S', coordinates={'x': 60, 'y': 0, 'z': 0})
+
+        weighted = run_computation(self.project, self.configuration)[0]
+        self.assertTrue(weighted.log_data['variance_reduction'])
+        self.assertGreater(weighted.log_data['figure_of_merit'], 0)
+        self.assertIn('Generating importance map...', weighted.log_data['steps'])
+        self.configuration.variance_reduction = False
+        self.configuration.save()
+        analog = run_computation(self.project, self.configuration)[0]
+        self.assertFalse(analog.log_data['variance_reduction'])
+        self.assertNotEqual(analog.run_id, weighted.run_id)
+
+
+class BenchmarkTests(TestCase):
+    """The benchmark suite measures scaled example scenes and guards against regressions"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = f'{self.directory.name}/history.json'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _run(self, *arguments):
+        call_command(
+            'runbenchmarks', '--scenes', 'DUMTUTOR-PCS', '--scales', '1', '--repeat', '1', '--history', self.history,
+            *arguments, stdout=StringIO()
+        )
+        with open(self.history) as f:
+            return json.load(f)['runs']
+
+    def test_scaled_scene_repeats_the_example(self):
+        call_command('populate_example_scenes', stdout=StringIO())
+        example = ExampleScene.objects.get(name='DUMTUTOR-PCS')
+        payload = scene_payload(example, 10, isotopes=False)
+        self.assertEqual(len(payload['geometries']), 10 * example.geometries.count())
+        self.assertEqual(len(payload['volumes']), 10 * example.volumes.count())
+        self.assertEqual(len(payload['sensors']), 4)
+        drums = {(g['position']['x'], g['position']['z']) for g in payload['geometries'] if g['name'].startswith('drum')}
+        self.assertEqual(len(drums), 10)
+
+    def test_run_is_recorded_and_rolled_back(self):
+        runs = self._run()
+        self.assertEqual(len(runs), 1)
+        self.assertTrue(runs[0]['passed'])
+        measurements = runs[0]['measurements']
+        self.assertEqual([m['operation'] for m in measurements], ['save', 'load', 'duplicate', 'decay', 'dose'])
+        for measurement in measurements:
+            self.assertGreater(measurement['queries'], 0)
+            self.assertGreater(measurement['peak_memory'], 0)
+        self.assertFalse(Project.objects.exists())
+
+    def test_small_time_differences_are_noise(self):
+        baseline = {'A x1 load': {'seconds': 0.02, 'queries': 3, 'peak_memory': 1000}}
+        noisy = [Measurement('A', 1, 'load', 0.06, 3, 1000)]
+        self.assertEqual(regressions(noisy, baseline), [])
+        slow = [Measurement('A', 1, 'load', 0.08, 3, 1000)]
+        self.assertEqual(len(regressions(slow, baseline)), 1)
+
+    def test_regressions_fail_the_run(self):
+        runs = self._run('--operations', 'load')
+        runs[0]['measurements'][0]['queries'] -= 5
+        with open(self.history, 'w') as f:
+            json.dump({'runs': runs}, f)
+
+        with self.assertRaisesMessage(CommandError, 'DUMTUTOR-PCS x1 load'):
+            self._run('--operations', 'load', '--time-tolerance', '1000')
+        with open(self.history) as f:
+            runs = json.load(f)['runs']
+        self.assertFalse(runs[-1]['passed'])
+        # A failed run is not a baseline
+        with self.assertRaises(CommandError):
+            self._run('--operations', 'load', '--time-tolerance', '1000')
+        self._run('--operations', 'load', '--time-tolerance', '1000', '--query-tolerance', '5', '--memory-tolerance', '1000')
+
+
+class SyntheticProjectTests(TestCase):
+    """Synthetic projects are reproducible, complete and written in bulk"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='load@example.com', username='load', password='pw')
+
+    def _rows(self, project):
+        return (
+            list(project.geometries.order_by('name').values_list('geometry_type', 'position', 'geometry_parameters')),
+            list(project.compositions.order_by('name').values_list('density', 'elements')),
+            list(project.volumes.order_by('volume_name').values_list('composition__name', 'spectrum__name')),
+            list(project.history.order_by('sequence').values_list('scene_state', 'delta')),
+        )
+
+    def test_seed_reproduces_the_project(self):
+        first = generate_project(self.user, seed=3, geometries=30)
+        again = generate_project(self.user, seed=3, geometries=30)
+        other = generate_project(self.user, seed=4, geometries=30)
+        self.assertEqual(self._rows(first), self._rows(again))
+        self.assertNotEqual(self._rows(first), self._rows(other))
+
+    def test_counts_and_history(self):
+        project = generate_project(
+            self.user, geometries=40, volumes=30, compositions=4, spectra=5, sensors=6, compound_objects=3, history=45
+        )
+        self.assertEqual(project.geometries.count(), 40)
+        self.assertEqual(project.volumes.count(), 30)
+        self.assertEqual(project.sensors.count(), 6)
+        self.assertEqual(project.compound_objects.count(), 3)
+        self.assertEqual(project.history.filter(is_keyframe=True).count(), 3)
+
+        # Patches after the last keyframe replay up to the latest move
+        last = project.history.get(sequence=44)
+        state = reconstruct_state(last)
+        moved = last.action_name.removeprefix('Move ')
+        self.assertEqual(state['objects'][moved]['position'], last.delta[0]['value'])
+        self.assertEqual(len(state['objects']), 40)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('projects:load-complete-scene', args=[project.uuid]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rows_are_inserted_in_bulk(self):
+        with CaptureQueriesContext(connection) as small:
+            generate_project(self.user, geometries=10, sensors=2, compound_objects=1, history=5)
+        with CaptureQueriesContext(connection) as large:
+            generate_project(self.user, geometries=200, sensors=20, compound_objects=10, history=60)
+        # Over 500 more rows cost only the extra batches of geometries and volumes
+        self.assertLess(len(large), len(small) + 10)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_synthetic_project', '--user', 'load@example.com', '--geometries', '20',
+                     '--count', '2', '--seed', '7', stdout=out)
+        self.assertEqual(out.getvalue().count('Generated'), 2)
+        self.assertEqual(Project.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Geometry.objects.filter(project__user=self.user).count(), 40)
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_project', '--user', 'nobody@example.com', stdout=StringIO())
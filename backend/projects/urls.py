@@ -9,6 +9,7 @@ urlpatterns = [
     path('public/', views.PublicProjectListView.as_view(), name='public-project-list'),
     path('<uuid:uuid>/', views.ProjectDetailView.as_view(), name='project-detail'),
     path('<uuid:project_id>/duplicate/', views.duplicate_project, name='duplicate-project'),
+    path('example-scenes/<int:example_scene_id>/create-project/', views.create_project_from_example, name='create-project-from-example'),
     
     # Scene configuration
     path('<uuid:project_id>/scene-config/', views.SceneConfigurationView.as_view(), name='scene-config'),
@@ -33,6 +34,7 @@ urlpatterns = [
     
     # Scene history
     path('<uuid:project_id>/history/', views.SceneHistoryListView.as_view(), name='history-list'),
+    path('<uuid:project_id>/history/<int:pk>/', views.SceneHistoryDetailView.as_view(), name='history-detail'),
     
     # Sensors
     path('<uuid:project_id>/sensors/', views.SensorListView.as_view(), name='sensor-list'),
@@ -73,6 +75,18 @@ urlpatterns = [
     # Monte-Carlo computation URLs
     path('<int:project_id>/start-computation/', views.start_computation, name='start-computation'),
     path('<int:project_id>/computation-results/', views.get_computation_results, name='get-computation-results'),
+    path('<int:project_id>/computation-jobs/', views.ComputationJobView.as_view(), name='computation-job-list'),
+    path('computation-jobs/<int:pk>/', views.ComputationJobDetailView.as_view(), name='computation-job-detail'),
+    path('computation-jobs/<int:pk>/events/', views.computation_job_events, name='computation-job-events'),
+    path('computation-jobs/<int:pk>/stream-ticket/', views.computation_job_stream_ticket, name='computation-job-stream-ticket'),
+    path('<int:project_id>/dose-time-series/', views.dose_time_series_view, name='dose-time-series'),
+    
+    # Dose map URLs
+    path('<int:project_id>/dose-maps/', views.DoseMapView.as_view(), name='dose-map-list'),
+    path('dose-maps/<int:pk>/', views.DoseMapDetailView.as_view(), name='dose-map-detail'),
+    path('dose-maps/<int:pk>/compute/', views.compute_dose_map, name='compute-dose-map'),
+    path('dose-maps/<int:pk>/data/', views.dose_map_data, name='dose-map-data'),
+    path('dose-maps/<int:pk>/image/', views.dose_map_image, name='dose-map-image'),
     
     # Complete project management
     path('complete/', views.CompleteProjectCreateView.as_view(), name='complete-project-create'),
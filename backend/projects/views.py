@@ -3,42 +3,60 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
 
 from .models import (
     Project, SceneConfiguration, Geometry, Composition, 
     Spectrum, Volume, SceneHistory, CSGOperation, Sensor,
     CompoundObject, CompoundObjectGeometry, CompoundObjectComposition,
     CompoundObjectSpectrum, CompoundObjectSensor, CompoundObjectImport,
-    MeshConfiguration, ComputationConfiguration, ComputationResult, ToleranceConfiguration
+    MeshConfiguration, ComputationConfiguration, ComputationResult, ComputationJob, ToleranceConfiguration,
+    ExampleScene, DoseMap
 )
 from .serializers import (
     ProjectSerializer, ProjectDetailSerializer, SceneConfigurationSerializer,
     GeometrySerializer, CompositionSerializer, SpectrumSerializer,
-    VolumeSerializer, VolumeCreateSerializer, SceneHistorySerializer,
+    VolumeSerializer, VolumeCreateSerializer, SceneHistorySerializer, SceneHistoryDetailSerializer,
     CSGOperationSerializer, SensorSerializer, CompleteSceneSerializer,
     CompoundObjectSerializer, CompoundObjectListSerializer, CompoundObjectCreateSerializer,
     CompoundObjectImportSerializer, CompoundObjectImportRequestSerializer,
     CompoundObjectExportSerializer, MeshConfigurationSerializer, 
     ComputationConfigurationSerializer, ComputationResultSerializer, 
-    ToleranceConfigurationSerializer, CompleteProjectSerializer, CompleteProjectCreateSerializer
+    ToleranceConfigurationSerializer, CompleteProjectSerializer, CompleteProjectCreateSerializer,
+    ComputationJobSerializer, DoseMapSerializer
 )
+from elements.decay import SECONDS
+from .cloning import clone_project, instantiate_example_scene
+from .computation import ENGINES
+from .dose_maps import heatmap_png, map_array
+from .history import record_history
+from .jobs import (
+    MAX_TIMES, enqueue_computation, enqueue_dose_map, enqueue_time_series, issue_stream_ticket, job_events,
+    redeem_stream_ticket
+)
+from .pagination import ProjectCursorPagination
+from .snapshots import build_snapshots, get_snapshot, snapshot_response
 
 
 class ProjectListView(generics.ListCreateAPIView):
     """List and create projects"""
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProjectCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_public']
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'updated_at', 'name']
-    ordering = ['-updated_at']
+    ordering = ['-updated_at', '-id']
     
     def get_queryset(self):
         user = self.request.user
-        return Project.objects.filter(user=user)
+        return Project.objects.filter(user=user).with_counts()
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -52,20 +70,21 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return Project.objects.filter(user=user)
+        return Project.objects.filter(user=user).with_scene_graph()
 
 
 class PublicProjectListView(generics.ListAPIView):
     """List public projects"""
     serializer_class = ProjectSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = ProjectCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'updated_at', 'name']
-    ordering = ['-updated_at']
+    ordering = ['-updated_at', '-id']
     
     def get_queryset(self):
-        return Project.objects.filter(is_public=True)
+        return Project.objects.filter(is_public=True).with_counts()
 
 
 class SceneConfigurationView(generics.RetrieveUpdateAPIView):
@@ -198,11 +217,32 @@ class VolumeCreateView(generics.CreateAPIView):
         serializer.save(project=project)
 
 
-class SceneHistoryListView(generics.ListAPIView):
-    """List scene history for a project"""
+class SceneHistoryListView(generics.ListCreateAPIView):
+    """List scene history metadata and record new steps for a project"""
     serializer_class = SceneHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_queryset(self):
+        project_id = self.kwargs.get('project_id')
+        project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
+        # Only metadata is listed; keep the state columns out of the query
+        return SceneHistory.objects.filter(project=project).defer('scene_state', 'delta')
+    
+    def perform_create(self, serializer):
+        project_id = self.kwargs.get('project_id')
+        project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
+        serializer.instance = record_history(
+            project,
+            serializer.validated_data['action_name'],
+            serializer.validated_data['scene_state']
+        )
+
+
+class SceneHistoryDetailView(generics.RetrieveAPIView):
+    """Retrieve one history step with its reconstructed scene state"""
+    serializer_class = SceneHistoryDetailSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
         project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
@@ -223,6 +263,7 @@ class SaveCompleteSceneView(APIView):
             
             # Create the complete scene
             scene_data = serializer.save()
+            build_snapshots(scene_data['project'])
             
             return Response({
                 'message': 'Scene saved successfully',
@@ -238,28 +279,9 @@ class LoadCompleteSceneView(APIView):
     def get(self, request, project_id):
         project = get_object_or_404(Project, uuid=project_id, user=request.user)
         
-        # Get all related data
-        scene_config = SceneConfiguration.objects.get(project=project)
-        geometries = Geometry.objects.filter(project=project)
-        compositions = Composition.objects.filter(project=project)
-        spectra = Spectrum.objects.filter(project=project)
-        volumes = Volume.objects.filter(project=project)
-        history = SceneHistory.objects.filter(project=project)
-        csg_operations = CSGOperation.objects.filter(project=project)
-        
-        # Serialize the data
-        data = {
-            'project': ProjectSerializer(project).data,
-            'scene_config': SceneConfigurationSerializer(scene_config).data,
-            'geometries': GeometrySerializer(geometries, many=True).data,
-            'compositions': CompositionSerializer(compositions, many=True).data,
-            'spectra': SpectrumSerializer(spectra, many=True).data,
-            'volumes': VolumeSerializer(volumes, many=True).data,
-            'history': SceneHistorySerializer(history, many=True).data,
-            'csg_operations': CSGOperationSerializer(csg_operations, many=True).data,
-        }
-        
-        return Response(data, status=status.HTTP_200_OK)
+        # Serve the stored snapshot; it is rebuilt only after the scene changes
+        snapshot = get_snapshot(project, 'scene')
+        return snapshot_response(request, snapshot)
 
 
 class CSGOperationListView(generics.ListCreateAPIView):
@@ -311,94 +333,12 @@ def duplicate_project(request, project_id):
     """Duplicate a project"""
     original_project = get_object_or_404(Project, uuid=project_id, user=request.user)
     
-    with transaction.atomic():
-        # Create new project
-        new_project = Project.objects.create(
-            name=f"{original_project.name} (Copy)",
-            description=original_project.description,
-            user=request.user,
-            is_public=False
-        )
-        
-        # Copy scene configuration
-        if hasattr(original_project, 'scene_config'):
-            SceneConfiguration.objects.create(
-                project=new_project,
-                camera_position=original_project.scene_config.camera_position,
-                camera_rotation=original_project.scene_config.camera_rotation,
-                camera_type=original_project.scene_config.camera_type,
-                camera_fov=original_project.scene_config.camera_fov,
-                camera_near=original_project.scene_config.camera_near,
-                camera_far=original_project.scene_config.camera_far,
-                background_color=original_project.scene_config.background_color,
-                ambient_light_intensity=original_project.scene_config.ambient_light_intensity,
-                directional_light_intensity=original_project.scene_config.directional_light_intensity,
-                grid_size=original_project.scene_config.grid_size,
-                grid_divisions=original_project.scene_config.grid_divisions,
-                floor_constraint_enabled=original_project.scene_config.floor_constraint_enabled,
-                floor_level=original_project.scene_config.floor_level,
-            )
-        
-        # Copy compositions
-        composition_map = {}
-        for composition in original_project.compositions.all():
-            new_composition = Composition.objects.create(
-                project=new_project,
-                name=composition.name,
-                density=composition.density,
-                color=composition.color,
-                elements=composition.elements,
-            )
-            composition_map[composition.id] = new_composition
-        
-        # Copy spectra
-        spectrum_map = {}
-        for spectrum in original_project.spectra.all():
-            new_spectrum = Spectrum.objects.create(
-                project=new_project,
-                name=spectrum.name,
-                spectrum_type=spectrum.spectrum_type,
-                multiplier=spectrum.multiplier,
-                lines=spectrum.lines,
-                isotopes=spectrum.isotopes,
-            )
-            spectrum_map[spectrum.id] = new_spectrum
-        
-        # Copy geometries
-        geometry_map = {}
-        for geometry in original_project.geometries.all():
-            new_geometry = Geometry.objects.create(
-                project=new_project,
-                name=geometry.name,
-                geometry_type=geometry.geometry_type,
-                position=geometry.position,
-                rotation=geometry.rotation,
-                scale=geometry.scale,
-                color=geometry.color,
-                opacity=geometry.opacity,
-                transparent=geometry.transparent,
-                geometry_parameters=geometry.geometry_parameters,
-                user_data=geometry.user_data,
-                transform_controls_enabled=geometry.transform_controls_enabled,
-                transform_mode=geometry.transform_mode,
-            )
-            geometry_map[geometry.id] = new_geometry
-        
-        # Copy volumes
-        for volume in original_project.volumes.all():
-            Volume.objects.create(
-                project=new_project,
-                geometry=geometry_map[volume.geometry.id],
-                composition=composition_map.get(volume.composition.id) if volume.composition else None,
-                spectrum=spectrum_map.get(volume.spectrum.id) if volume.spectrum else None,
-                volume_name=volume.volume_name,
-                volume_type=volume.volume_type,
-                real_density=volume.real_density,
-                tolerance=volume.tolerance,
-                is_source=volume.is_source,
-                gamma_selection_mode=volume.gamma_selection_mode,
-                calculation_mode=volume.calculation_mode,
-            )
+    new_project = clone_project(
+        original_project,
+        user=request.user,
+        name=f"{original_project.name} (Copy)",
+        is_public=False
+    )
     
     return Response({
         'message': 'Project duplicated successfully',
@@ -406,6 +346,25 @@ def duplicate_project(request, project_id):
     }, status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_project_from_example(request, example_scene_id):
+    """Create a new project from a predefined example scene"""
+    example_scene = get_object_or_404(ExampleScene, id=example_scene_id, is_active=True)
+    
+    new_project = instantiate_example_scene(
+        example_scene,
+        user=request.user,
+        name=request.data.get('name') or example_scene.name
+    )
+    
+    return Response({
+        'message': 'Project created from example scene',
+        'new_project_id': new_project.id,
+        'new_project_uuid': new_project.uuid
+    }, status=status.HTTP_201_CREATED)
+
+
 class SensorListView(generics.ListCreateAPIView):
     """List and create sensors for a project"""
     serializer_class = SensorSerializer
@@ -824,12 +783,12 @@ class ComputationConfigurationView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
+        project = get_object_or_404(Project, id=project_id, user=self.request.user)
         return ComputationConfiguration.objects.filter(project=project)
     
     def perform_create(self, serializer):
         project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
+        project = get_object_or_404(Project, id=project_id, user=self.request.user)
         serializer.save(project=project)
 
 
@@ -850,12 +809,12 @@ class ComputationResultView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
+        project = get_object_or_404(Project, id=project_id, user=self.request.user)
         return ComputationResult.objects.filter(project=project)
     
     def perform_create(self, serializer):
         project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, uuid=project_id, user=self.request.user)
+        project = get_object_or_404(Project, id=project_id, user=self.request.user)
         serializer.save(project=project)
 
 
@@ -898,17 +857,26 @@ class ToleranceConfigurationDetailView(generics.RetrieveUpdateDestroyAPIView):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def start_computation(request, project_id):
-    """Start Monte-Carlo computation for a project"""
+    """Run the dose computation of a project"""
     try:
-        project = get_object_or_404(Project, uuid=project_id, user=request.user)
+        project = get_object_or_404(Project, id=project_id, user=request.user)
         
         # Get computation parameters
         convergence_criterion = request.data.get('convergence_criterion', 0.01)
         particles_per_sample = request.data.get('particles_per_sample', 10000)
         number_of_samples = request.data.get('number_of_samples', 100)
         configurations = request.data.get('configurations', ['nominal'])
+        method = request.data.get('method', 'point_kernel')
+        force = bool(request.data.get('force', False))
+        variance_reduction = bool(request.data.get('variance_reduction', True))
         
         # Validate parameters
+        if method not in ENGINES:
+            return Response(
+                {'error': f'Method must be one of: {", ".join(ENGINES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         if not 0.001 <= convergence_criterion <= 0.1:
             return Response(
                 {'error': 'Convergence criterion must be between 0.001 and 0.1'}, 
@@ -937,55 +905,29 @@ def start_computation(request, project_id):
                     'name': f'{config_type.title()} Configuration',
                     'convergence_criterion': convergence_criterion,
                     'particles_per_sample': particles_per_sample,
-                    'number_of_samples': number_of_samples
+                    'number_of_samples': number_of_samples,
+                    'method': method,
+                    'variance_reduction': variance_reduction,
                 }
             )
+            if not created:
+                # Run existing configurations with the requested settings
+                config.convergence_criterion = convergence_criterion
+                config.particles_per_sample = particles_per_sample
+                config.number_of_samples = number_of_samples
+                config.method = method
+                config.variance_reduction = variance_reduction
+                config.save()
             created_configs.append(config)
         
-        # Start computation (simulated for now)
-        # In real implementation, this would start the actual Monte-Carlo calculation
-        results = []
-        for config in created_configs:
-            # Simulate computation result
-            import random
-            import time
-            
-            dose_rate = random.uniform(1e-6, 1e-2)  # Random dose rate
-            uncertainty = random.uniform(0.01, 0.2)  # Random uncertainty
-            computation_time = random.randint(60, 300)  # Random computation time
-            converged = random.choice([True, True, True, False])  # 75% success rate
-            
-            result = ComputationResult.objects.create(
-                project=project,
-                configuration=config,
-                dose_rate=dose_rate,
-                uncertainty=uncertainty,
-                computation_time=computation_time,
-                converged=converged,
-                status='success' if converged else 'error',
-                log_data={
-                    'steps': [
-                        'Initializing geometry...',
-                        'Loading material libraries...',
-                        'Calculating importance of meshes...',
-                        'Generating source points...',
-                        'Running Monte-Carlo simulation...',
-                        'Calculating build-up factors...',
-                        'Computing dose rates...',
-                        'Validating convergence...',
-                        'Storing results...'
-                    ],
-                    'convergence_history': [random.uniform(0.1, 1.0) for _ in range(10)]
-                }
-            )
-            results.append(result)
+        # Queue one run of all configurations for the runcomputations worker
+        job = enqueue_computation(project, created_configs, force=force)
         
-        # Return results
-        serializer = ComputationResultSerializer(results, many=True)
+        serializer = ComputationJobSerializer(job)
         return Response({
-            'message': 'Computation started successfully',
-            'results': serializer.data
-        }, status=status.HTTP_201_CREATED)
+            'message': 'Computation queued',
+            'job': serializer.data
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response(
@@ -999,7 +941,7 @@ def start_computation(request, project_id):
 def get_computation_results(request, project_id):
     """Get computation results for a project"""
     try:
-        project = get_object_or_404(Project, uuid=project_id, user=request.user)
+        project = get_object_or_404(Project, id=project_id, user=request.user)
         results = ComputationResult.objects.filter(project=project).order_by('-created_at')
         
         serializer = ComputationResultSerializer(results, many=True)
@@ -1012,6 +954,161 @@ def get_computation_results(request, project_id):
         )
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def dose_time_series_view(request, project_id):
+    """Queue the sensor responses of a project's decaying sources at several times"""
+    project = get_object_or_404(Project, id=project_id, user=request.user)
+    try:
+        unit = request.data.get('time_unit', 'y')
+        if unit not in SECONDS:
+            raise ValueError(f'Unknown time unit {unit!r}')
+        times = [float(t) for t in request.data.get('times', [0])]
+        if not times or min(times) < 0:
+            raise ValueError('Times must be a non-empty list of non-negative values')
+        if len(times) > MAX_TIMES:
+            raise ValueError(f'At most {MAX_TIMES} times can be evaluated at once')
+        points_per_source = int(request.data.get('points_per_source', 1000))
+        if points_per_source < 1:
+            raise ValueError('Points per source must be at least 1')
+        seed = int(request.data.get('seed', 0))
+    except (TypeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    job = enqueue_time_series(project, times, unit, points_per_source, seed)
+    return Response({
+        'message': 'Dose time series queued',
+        'job': ComputationJobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class ComputationJobView(generics.ListAPIView):
+    """List computation jobs of a project"""
+    serializer_class = ComputationJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        project = get_object_or_404(Project, id=self.kwargs.get('project_id'), user=self.request.user)
+        return ComputationJob.objects.filter(project=project).prefetch_related('configurations', 'results')
+
+
+class ComputationJobDetailView(generics.RetrieveAPIView):
+    """Retrieve a computation job with its progress"""
+    serializer_class = ComputationJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ComputationJob.objects.filter(project__user=self.request.user)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def computation_job_stream_ticket(request, pk):
+    """Issue a single-use ticket opening the event stream of a job, for clients that cannot send headers"""
+    job = get_object_or_404(ComputationJob, pk=pk, project__user=request.user)
+    ticket = issue_stream_ticket(request.user, job)
+    url = reverse('projects:computation-job-events', args=[job.pk])
+    return Response({
+        'ticket': ticket.key,
+        'url': f'{url}?ticket={ticket.key}',
+        'expires_in': settings.STREAM_TICKET_LIFETIME,
+    }, status=status.HTTP_201_CREATED)
+
+
+async def _stream_user(request, pk):
+    """User of a session, of a token in the Authorization header, or of a stream ticket for job ``pk``"""
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    if 'ticket' in request.GET:
+        return await redeem_stream_ticket(request.GET['ticket'], pk)
+    key = request.headers.get('Authorization', '').removeprefix('Token ').strip()
+    token = await Token.objects.select_related('user').filter(key=key).afirst() if key else None
+    return token.user if token is not None and token.user.is_active else None
+
+
+async def computation_job_events(request, pk):
+    """Server-sent events with the progress of a computation job until it finishes"""
+    user = await _stream_user(request, pk)
+    if user is None:
+        return HttpResponse(status=401)
+    if not await ComputationJob.objects.filter(pk=pk, project__user=user).aexists():
+        raise Http404('No computation job matches the given query.')
+    response = StreamingHttpResponse(job_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Dose map views
+class DoseMapView(generics.ListCreateAPIView):
+    """List and create dose maps of a project"""
+    serializer_class = DoseMapSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        project = get_object_or_404(Project, id=self.kwargs.get('project_id'), user=self.request.user)
+        return DoseMap.objects.filter(project=project).defer('data')
+
+    def perform_create(self, serializer):
+        project = get_object_or_404(Project, id=self.kwargs.get('project_id'), user=self.request.user)
+        serializer.save(project=project)
+
+
+class DoseMapDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update, or delete a dose map"""
+    serializer_class = DoseMapSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return DoseMap.objects.filter(project__user=self.request.user).defer('data')
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def compute_dose_map(request, pk):
+    """Queue the computation of all points of a dose map in one pass"""
+    dose_map = get_object_or_404(DoseMap.objects.select_related('project'), pk=pk, project__user=request.user)
+    dose_map.status = 'pending'
+    dose_map.save(update_fields=['status', 'updated_at'])
+    job = enqueue_dose_map(dose_map)
+    return Response({
+        'message': 'Dose map queued',
+        'job': ComputationJobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dose_map_data(request, pk):
+    """Responses of a computed dose map as little-endian float32, shape in ``X-Dose-Map-Shape``"""
+    dose_map = get_object_or_404(DoseMap, pk=pk, project__user=request.user)
+    array = map_array(dose_map)
+    if array is None:
+        return Response({'error': 'The dose map has not been computed'}, status=status.HTTP_404_NOT_FOUND)
+    response = HttpResponse(array.tobytes(), content_type='application/octet-stream')
+    response['X-Dose-Map-Shape'] = ','.join(str(n) for n in array.shape)
+    response['X-Dose-Map-Unit'] = dose_map.unit
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dose_map_image(request, pk):
+    """PNG heatmap of a computed dose map (``?slice=`` picks the z slice of volume maps)"""
+    dose_map = get_object_or_404(DoseMap, pk=pk, project__user=request.user)
+    array = map_array(dose_map)
+    if array is None:
+        return Response({'error': 'The dose map has not been computed'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        index = request.query_params.get('slice')
+        image = heatmap_png(array, None if index is None else int(index))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return HttpResponse(image, content_type='image/png')
+
+
 class CompleteProjectCreateView(APIView):
     """Create a complete project with all scene data"""
     permission_classes = [permissions.IsAuthenticated]
@@ -1022,8 +1119,10 @@ class CompleteProjectCreateView(APIView):
             serializer = CompleteProjectCreateSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
                 project = serializer.save()
+                build_snapshots(project)
                 
                 # Return the complete project data
+                project = Project.objects.with_scene_graph().get(pk=project.pk)
                 complete_serializer = CompleteProjectSerializer(project)
                 return Response(complete_serializer.data, status=status.HTTP_201_CREATED)
             else:
@@ -1043,13 +1142,15 @@ class CompleteProjectUpdateView(APIView):
     def put(self, request, project_id):
         """Update a complete project with all related objects"""
         try:
-            project = get_object_or_404(Project, uuid=project_id, user=request.user)
+            project = get_object_or_404(Project, id=project_id, user=request.user)
             serializer = CompleteProjectCreateSerializer(project, data=request.data, context={'request': request})
             
             if serializer.is_valid():
                 updated_project = serializer.save()
+                build_snapshots(updated_project)
                 
                 # Return the complete project data
+                updated_project = Project.objects.with_scene_graph().get(pk=updated_project.pk)
                 complete_serializer = CompleteProjectSerializer(updated_project)
                 return Response(complete_serializer.data, status=status.HTTP_200_OK)
             else:
@@ -1069,9 +1170,9 @@ class CompleteProjectRetrieveView(APIView):
     def get(self, request, project_id):
         """Retrieve a complete project with all related objects"""
         try:
-            project = get_object_or_404(Project, uuid=project_id, user=request.user)
-            serializer = CompleteProjectSerializer(project)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            project = get_object_or_404(Project, id=project_id, user=request.user)
+            snapshot = get_snapshot(project, 'project')
+            return snapshot_response(request, snapshot)
             
         except Exception as e:
             return Response(